@@ -6,16 +6,27 @@
     'author': 'Syed Israr Ahmad',
     'website': 'https://www.linkedin.com/in/syed-israr-ahmad/',
     'license': 'LGPL-3',
-    'depends': ['base', 'web'],
+    'depends': ['base', 'web', 'bus'],
     
     'data': [
         'security/security.xml',
         'security/ir.model.access.csv',
         'views/server_metrics_views.xml',
+        'views/metrics_rollup_views.xml',
+        'views/metric_baseline_views.xml',
+        'views/worker_metrics_views.xml',
+        'views/storage_views.xml',
+        'views/table_health_views.xml',
         'views/slow_query_views.xml',
+        'views/query_family_views.xml',
+        'views/query_plan_views.xml',
+        'views/statement_stats_views.xml',
         'views/cron_log_views.xml',
+        'views/cron_stats_views.xml',
         'views/database_lock_views.xml',
+        'views/lock_edge_views.xml',
         'views/odoo_log_views.xml',
+        'views/collector_run_views.xml',
         'views/dashboard_form.xml',
         'views/dashboard_action.xml',
         'views/config_views.xml',
@@ -27,6 +38,8 @@
     'assets': {
         'web.assets_backend': [
             'odoo_erp_health_monitor/static/src/css/dashboard.css',
+            'odoo_erp_health_monitor/static/src/js/live_dashboard.js',
+            'odoo_erp_health_monitor/static/src/xml/live_dashboard.xml',
         ],
     },
 
@@ -0,0 +1,97 @@
+"""Micro-benchmark of the Odoo log parser on a synthetic log
+
+Usage: python benchmarks/bench_log_parser.py [--lines 1000000]
+
+Runs without Odoo; compares the previous split()/strptime() parser with
+tools.log_parser and prints lines/second for both.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+from log_parser import LogParser  # noqa: E402
+
+LOGGERS = [
+    'odoo.modules.registry', 'odoo.addons.base.models.ir_cron', 'werkzeug',
+    'odoo.http', 'odoo.sql_db', 'odoo.addons.mail.models.mail_mail',
+]
+TRACEBACK = [
+    'Traceback (most recent call last):',
+    '  File "/opt/odoo/odoo/http.py", line 2375, in __call__',
+    '    response = request._serve_db()',
+    '  File "/opt/odoo/odoo/sql_db.py", line 354, in execute',
+    '    res = self._obj.execute(query, params)',
+    'psycopg2.errors.SerializationFailure: could not serialize access due to concurrent update',
+]
+
+
+def synthetic_log(n_lines, seed=42):
+    """Build roughly n_lines of Odoo-formatted log with ~1% ERROR tracebacks"""
+    rng = random.Random(seed)
+    ts = datetime(2026, 1, 18, 21, 0, 0)
+    lines = []
+    while len(lines) < n_lines:
+        ts += timedelta(milliseconds=rng.randint(0, 200))
+        roll = rng.random()
+        level = 'ERROR' if roll < 0.01 else 'WARNING' if roll < 0.05 else 'INFO'
+        lines.append('%s,%03d %d %s production %s: request handled in %.3fs' % (
+            ts.strftime('%Y-%m-%d %H:%M:%S'), ts.microsecond // 1000, rng.randint(1000, 9999),
+            level, rng.choice(LOGGERS), rng.random(),
+        ))
+        if level == 'ERROR':
+            lines.extend(TRACEBACK)
+    return lines[:n_lines]
+
+
+def legacy_parse(line):
+    """The split()/strptime() parser this module used before"""
+    try:
+        parts = line.split(' ', 6)
+        if len(parts) < 6:
+            return None
+        date_str = f"{parts[0]} {parts[1].split(',')[0]}"
+        timestamp = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
+        level = parts[3]
+        logger = parts[5] if len(parts) > 5 else 'odoo'
+        message = parts[6] if len(parts) > 6 else line
+        return {
+            'timestamp': timestamp,
+            'level': level if level in ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'] else 'INFO',
+            'logger': logger.strip(),
+            'message': message.strip(),
+        }
+    except Exception:
+        return None
+
+
+def bench(label, func, lines, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(lines)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<10} {len(lines) / best:>14,.0f} lines/s  ({best:.3f}s, {result} records)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lines = synthetic_log(args.lines)
+    print(f"{len(lines):,} synthetic lines")
+    legacy = bench('legacy', lambda ls: sum(1 for line in ls if legacy_parse(line)), lines, args.repeat)
+    current = bench('parser', lambda ls: len(LogParser().parse_lines(ls)[0]), lines, args.repeat)
+    print(f"speedup    {legacy / current:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""End-to-end benchmark of the monitor's collectors against a local PostgreSQL
+
+Usage: python benchmarks/bench_monitor.py -d <scratch_db> [-c odoo.conf] [--rows 10000]
+       [--sessions 20] [--waiters 10] [--log-lines 100000] [--repeat 5] [--output report.json]
+
+Needs Odoo on the path and the module installed in <scratch_db>. Use a
+throwaway database: it seeds --rows rows per monitoring table, spread over the
+last 60 days, and the cleanup benchmark really deletes the expired half.
+
+Live inputs are real: --sessions backends sit in pg_sleep() so pg_stat_activity
+shows slow queries, and --waiters backends queue behind a session holding an
+ACCESS EXCLUSIVE lock. The log collector reads --log-lines synthetic lines
+appended to a temporary log file.
+
+Each collector runs --repeat times, every run in its own transaction that is
+rolled back, so all runs see the same seeded state. The cleanup commits its
+batches, so it runs once and last. The JSON report goes to stdout or --output.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_log_parser import synthetic_log  # noqa: E402
+
+# Seconds of history the seeded rows are spread over
+SEED_SPAN = 60 * 86400
+LOCK_TABLE = 'erp_health_bench_lock'
+SLEEP_MARKER = '/* erp_health_bench */'
+
+# table -> (columns, select expressions over generate_series g, n and ts)
+SEEDS = {
+    'erp_health_server_metrics': (
+        'timestamp, hour, cpu_percent, cpu_iowait_percent, cpu_steal_percent, ram_percent, ram_used_gb, '
+        'ram_total_gb, disk_percent, disk_used_gb, disk_total_gb, load_average_1m, load_average_5m, '
+        'load_average_15m',
+        "ts, EXTRACT(HOUR FROM ts)::int, random() * 100, random() * 10, 0, random() * 100, random() * 16, "
+        "16, random() * 100, random() * 500, 500, random() * 8, random() * 8, random() * 8",
+    ),
+    'erp_health_slow_query': (
+        'detected_at, query_text, duration, database_user, query_state, pid, query_start',
+        "ts, 'SELECT * FROM res_partner WHERE id = ' || (g % 500), random() * 30, 'odoo', 'active', "
+        "10000 + g % 5000, ts - INTERVAL '30 seconds'",
+    ),
+    'erp_health_database_lock': (
+        'detected_at, pid, lock_type, relation, mode, query, wait_time',
+        "ts, 10000 + g % 5000, 'relation', 'res_partner', 'RowExclusiveLock', "
+        "'UPDATE res_partner SET name = name WHERE id = ' || (g % 500), random() * 60",
+    ),
+    'erp_health_odoo_log': (
+        'timestamp, level, logger, pid, database, message',
+        "ts, CASE WHEN g % 100 = 0 THEN 'ERROR' WHEN g % 20 = 0 THEN 'WARNING' ELSE 'INFO' END, "
+        "'odoo.http', 1000 + g % 64, 'production', 'request handled in ' || round(random()::numeric, 3) || 's'",
+    ),
+    'erp_health_cron_log': (
+        'execution_date, cron_name, duration, status, query_count, rows_touched, memory_growth_mb, '
+        'baseline_p95, is_outlier',
+        "ts, 'Benchmark job ' || (g % 40), random() * 30, "
+        "CASE WHEN g % 50 = 0 THEN 'failed' ELSE 'success' END, (random() * 500)::int, "
+        "(random() * 1000)::int, random() * 50, 0, false",
+    ),
+}
+
+
+def seed(cr, rows):
+    """Insert `rows` rows per monitoring table with timestamps spread over SEED_SPAN"""
+    report = {}
+    for table, (columns, expressions) in SEEDS.items():
+        start = time.perf_counter()
+        cr.execute(f"""
+            INSERT INTO "{table}" ({columns})
+            SELECT {expressions}
+            FROM (
+                SELECT g, now() AT TIME ZONE 'UTC' - make_interval(secs => g * %(span)s / %(n)s) AS ts
+                FROM generate_series(1, %(n)s) AS g
+            ) AS s
+        """, {'n': rows, 'span': float(SEED_SPAN)})
+        cr.commit()
+        report[table] = {'rows': rows, 'seconds': round(time.perf_counter() - start, 3)}
+    for table in SEEDS:
+        cr.execute(f'ANALYZE "{table}"')
+    cr.commit()
+    return report
+
+
+class LiveLoad:
+    """Backends that show up in pg_stat_activity as slow queries and in pg_locks as lock waits"""
+
+    def __init__(self, psycopg2, connection_info, sessions, waiters):
+        self.psycopg2 = psycopg2
+        self.connection_info = connection_info
+        self.sessions = sessions
+        self.waiters = waiters
+        self.connections = []
+        self.threads = []
+        self.holder = None
+
+    def _connect(self):
+        conn = self.psycopg2.connect(**self.connection_info)
+        self.connections.append(conn)
+        return conn
+
+    def _run(self, conn, query):
+        def target():
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(query)
+            except self.psycopg2.Error:
+                # Cancelled on stop()
+                pass
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def start(self):
+        setup = self._connect()
+        setup.autocommit = True
+        with setup.cursor() as cur:
+            cur.execute(f'CREATE TABLE IF NOT EXISTS {LOCK_TABLE} (id int)')
+        self.holder = self._connect()
+        with self.holder.cursor() as cur:
+            cur.execute(f'LOCK TABLE {LOCK_TABLE} IN ACCESS EXCLUSIVE MODE')
+        for _ in range(self.sessions):
+            self._run(self._connect(), f'SELECT pg_sleep(3600) {SLEEP_MARKER}')
+        for _ in range(self.waiters):
+            self._run(self._connect(), f'SELECT count(*) FROM {LOCK_TABLE} {SLEEP_MARKER}')
+
+    def stop(self):
+        for conn in self.connections:
+            if conn is not self.holder:
+                conn.cancel()
+        if self.holder is not None:
+            self.holder.rollback()
+        for thread in self.threads:
+            thread.join(10)
+        for conn in self.connections:
+            conn.close()
+        conn = self.psycopg2.connect(**self.connection_info)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f'DROP TABLE IF EXISTS {LOCK_TABLE}')
+        conn.close()
+
+
+def _summarise(value):
+    if isinstance(value, dict):
+        return {key: val for key, val in value.items() if isinstance(val, (int, float, str, bool))}
+    return bool(value)
+
+
+def bench(registry, api, uid, label, func, repeat, rollback=True):
+    """Run func(env) `repeat` times, each in a fresh transaction; returns wall times and SQL counts"""
+    timings = []
+    queries = []
+    result = None
+    for _ in range(repeat):
+        with registry.cursor() as cr:
+            env = api.Environment(cr, uid, {})
+            start_queries = cr.sql_log_count
+            start = time.perf_counter()
+            result = func(env)
+            env.flush_all()
+            timings.append(time.perf_counter() - start)
+            queries.append(cr.sql_log_count - start_queries)
+            if rollback:
+                cr.rollback()
+    print(f"{label:<22} min {min(timings):8.4f}s  median {statistics.median(timings):8.4f}s  "
+          f"{queries[-1]:>6} queries", file=sys.stderr)
+    return {
+        'runs': len(timings),
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+        'queries': queries[-1],
+        'result': _summarise(result),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-d', '--database', required=True, help='Scratch database with the module installed')
+    parser.add_argument('-c', '--config', help='Odoo configuration file')
+    parser.add_argument('--rows', type=int, default=10000, help='Rows seeded per monitoring table')
+    parser.add_argument('--sessions', type=int, default=20, help='Backends kept busy in pg_sleep()')
+    parser.add_argument('--waiters', type=int, default=10, help='Backends waiting on a held table lock')
+    parser.add_argument('--log-lines', type=int, default=100000, help='Synthetic log lines to ingest')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-seed', action='store_true', help='Reuse the rows seeded by a previous run')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    import psycopg2
+    import odoo
+    from odoo import api, SUPERUSER_ID
+    from odoo.modules.registry import Registry
+
+    odoo.tools.config.parse_config(['-c', args.config] if args.config else [])
+    registry = Registry(args.database)
+    _dsn, connection_info = odoo.sql_db.connection_info_for(args.database)
+
+    report = {
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'database': args.database,
+        'odoo_version': odoo.release.version,
+        'python_version': platform.python_version(),
+        'rows': args.rows,
+        'sessions': args.sessions,
+        'waiters': args.waiters,
+        'log_lines': args.log_lines,
+        'benchmarks': {},
+    }
+
+    with registry.cursor() as cr:
+        cr.execute('SHOW server_version')
+        report['postgres_version'] = cr.fetchone()[0]
+        if not args.no_seed:
+            print(f"Seeding {args.rows:,} rows per table", file=sys.stderr)
+            report['seed'] = seed(cr, args.rows)
+
+    # Log input: the first read positions the tail cursor, the timed runs read what is appended after
+    log_dir = tempfile.mkdtemp(prefix='erp_health_bench_')
+    log_path = os.path.join(log_dir, 'odoo.log')
+    with open(log_path, 'w') as f:
+        f.write('\n'.join(synthetic_log(1000, seed=1)) + '\n')
+    odoo.tools.config['logfile'] = log_path
+    with registry.cursor() as cr:
+        api.Environment(cr, SUPERUSER_ID, {})['erp.health.odoo.log'].refresh_logs()
+    with open(log_path, 'a') as f:
+        f.write('\n'.join(synthetic_log(args.log_lines)) + '\n')
+
+    load = LiveLoad(psycopg2, connection_info, args.sessions, args.waiters)
+    load.start()
+    try:
+        with registry.cursor() as cr:
+            threshold = float(api.Environment(cr, SUPERUSER_ID, {})['ir.config_parameter'].get_param(
+                'odoo_erp_health_monitor.slow_query_threshold', '2.0'
+            ))
+        # The sleepers must have run longer than the slow query threshold
+        time.sleep(threshold + 1)
+
+        results = report['benchmarks']
+        results['collect_metrics'] = bench(
+            registry, api, SUPERUSER_ID, 'collect_metrics',
+            lambda env: env['erp.health.server.metrics'].collect_metrics(), args.repeat)
+        results['refresh_slow_queries'] = bench(
+            registry, api, SUPERUSER_ID, 'refresh_slow_queries',
+            lambda env: env['erp.health.slow.query'].refresh_slow_queries(), args.repeat)
+        results['refresh_locks'] = bench(
+            registry, api, SUPERUSER_ID, 'refresh_locks',
+            lambda env: env['erp.health.database.lock'].refresh_locks(), args.repeat)
+        results['refresh_logs'] = bench(
+            registry, api, SUPERUSER_ID, 'refresh_logs',
+            lambda env: env['erp.health.odoo.log'].refresh_logs(), args.repeat)
+        results['collect_storage'] = bench(
+            registry, api, SUPERUSER_ID, 'collect_storage',
+            lambda env: env['erp.health.storage'].collect_storage(), args.repeat)
+        results['collect_table_health'] = bench(
+            registry, api, SUPERUSER_ID, 'collect_table_health',
+            lambda env: env['erp.health.table.stats'].collect_table_health(), args.repeat)
+
+        def dashboard_cold(env):
+            dashboard = env['erp.health.dashboard']
+            dashboard._invalidate_stats_cache()
+            return dashboard._get_dashboard_stats()
+        results['dashboard_stats_cold'] = bench(
+            registry, api, SUPERUSER_ID, 'dashboard_stats_cold', dashboard_cold, args.repeat)
+        results['dashboard_stats_cached'] = bench(
+            registry, api, SUPERUSER_ID, 'dashboard_stats_cached',
+            lambda env: env['erp.health.dashboard']._get_dashboard_stats(), args.repeat)
+    finally:
+        load.stop()
+
+    # Commits its batches: once, after everything else
+    report['benchmarks']['cleanup_old_data'] = bench(
+        registry, api, SUPERUSER_ID, 'cleanup_old_data',
+        lambda env: env['erp.health.config'].cleanup_old_data(), 1, rollback=False)
+
+    os.unlink(log_path)
+    os.rmdir(log_dir)
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+from odoo import http
+from odoo.http import request
+import hashlib
+import hmac
+import os
+import logging
+
+from ..models.exporter import exposition_path
+from ..tools.openmetrics import CONTENT_TYPE
+
+_logger = logging.getLogger(__name__)
+
+# dbname -> (mtime of the exposition file, body, token hash)
+_EXPOSITIONS = {}
+
+
+class ErpHealthMetricsController(http.Controller):
+
+    def _load_exposition(self, dbname):
+        """Exposition rendered by the collectors, re-read only when the file changed"""
+        path = exposition_path(dbname)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = _EXPOSITIONS.get(dbname)
+        if cached and cached[0] == mtime:
+            return cached
+        try:
+            with open(path, encoding='utf-8') as f:
+                body = f.read()
+            with open(path + '.auth', encoding='utf-8') as f:
+                token_hash = f.read().strip()
+        except OSError:
+            return None
+        cached = _EXPOSITIONS[dbname] = (mtime, body, token_hash)
+        return cached
+
+    @http.route('/erp_health/metrics', type='http', auth='none', methods=['GET'], csrf=False, save_session=False)
+    def metrics(self, token=None, **kwargs):
+        """OpenMetrics exposition for Prometheus; no database query is made per scrape"""
+        dbname = request.db
+        exposition = dbname and self._load_exposition(dbname)
+        if not exposition:
+            return request.not_found()
+
+        # Bearer token, or ?token= for scrapers that cannot set headers
+        header = request.httprequest.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            token = header[len('Bearer '):].strip()
+        given = hashlib.sha256((token or '').encode()).hexdigest()
+        if not hmac.compare_digest(given, exposition[2]):
+            return request.make_response('Unauthorized', status=401, headers=[
+                ('WWW-Authenticate', 'Bearer'),
+                ('Content-Type', 'text/plain'),
+            ])
+
+        return request.make_response(exposition[1], headers=[('Content-Type', CONTENT_TYPE)])
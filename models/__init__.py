@@ -1,8 +1,26 @@
+from . import ingest_mixin
+from . import partitioning
+from . import collector_run
 from . import slow_query
+from . import query_family
+from . import query_plan
+from . import statement_stats
 from . import cron_log
+from . import cron_stats
 from . import server_metrics
+from . import metrics_rollup
+from . import metric_baseline
+from . import worker_metrics
+from . import storage
+from . import table_health
 from . import ir_cron
+from . import sampler
 from . import dashboard
+from . import exporter
+from . import ir_websocket
 from . import odoo_log
+from . import log_cursor
 from . import database_lock
+from . import lock_edge
+from . import agent_spool
 from . import erp_health_config
\ No newline at end of file
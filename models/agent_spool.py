@@ -0,0 +1,90 @@
+from odoo import models, fields, api, tools
+from datetime import datetime
+import os
+import logging
+
+from ..tools import spool
+
+_logger = logging.getLogger(__name__)
+
+
+class ErpHealthAgentSpool(models.AbstractModel):
+    _name = 'erp.health.agent.spool'
+    _description = 'ERP Health Agent Spool Importer'
+
+    @api.model
+    def _get_spool_path(self):
+        """Spool file written by tools/agent.py, as set in the agent's --spool option"""
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'odoo_erp_health_monitor.agent_spool_path'
+        ) or os.path.join(tools.config['data_dir'], 'erp_health_agent.spool')
+
+    @api.model
+    def import_spool(self):
+        """Bulk-load the samples the standalone agent spooled since the last import"""
+        config = self.env['erp.health.config'].get_config()
+        if config.agent_import:
+            # A module update re-enables Collect Server Metrics; this job's own cron is left alone
+            self.env['erp.health.sampler']._apply_sampling_mode(config.sampling_mode, driver=False)
+        with self.env['erp.health.collector.run']._track('import_spool') as run:
+            claimed = spool.claim(self._get_spool_path())
+            if not claimed:
+                return {'records': 0}
+            records, size = spool.read(claimed)
+
+            metrics_vals = []
+            lock_vals = []
+            sightings = {}
+            for record in records:
+                at = fields.Datetime.to_datetime(record['at'])
+                if record.get('server_metrics'):
+                    metrics_vals.append(dict(record['server_metrics'], timestamp=at))
+                for row in record.get('locks', ()):
+                    lock_vals.append(dict(row, detected_at=at))
+                for row in record.get('slow_queries', ()):
+                    # A query running across several ticks is one sighting, keep its longest duration
+                    # Not fields.Datetime.to_datetime(), which drops the microseconds the
+                    # in-process sampler keeps: the same execution would be stored twice
+                    row = dict(row, query_start=datetime.fromisoformat(row['query_start']), detected_at=at)
+                    key = (row['pid'], row['query_start'])
+                    if key not in sightings or row['duration'] >= sightings[key]['duration']:
+                        sightings[key] = row
+
+            # Oldest first, so that ids follow time as the prune by id expects
+            metrics_vals.sort(key=lambda vals: vals['timestamp'])
+
+            Metrics = self.env['erp.health.server.metrics']
+            SlowQuery = self.env['erp.health.slow.query']
+            Lock = self.env['erp.health.database.lock']
+            metrics = Metrics._bulk_insert(metrics_vals)
+            queries = SlowQuery._ingest_sightings(list(sightings.values()))
+            locks = Lock._bulk_insert(lock_vals)
+
+            if metrics:
+                # Baselines fold samples in time order
+                self.env['erp.health.metric.baseline']._observe(metrics.sorted('timestamp'))
+                # A backlog spooled while Odoo was down is older than the last rollup buckets
+                self.env['erp.health.metrics.rollup']._rollup_metrics(since=metrics_vals[0]['timestamp'])
+                Metrics._prune_rows(1000)
+            SlowQuery._prune_rows(1000)
+            Lock._prune_rows(500)
+            Metrics._notify_collected()
+
+            run['rows_written'] = len(metrics) + queries['ingested'] + queries['updated'] + len(locks)
+
+            # The claimed file goes only once the rows are committed, a failed import is retried
+            self.env.cr.postcommit.add(lambda: self._remove_claimed(claimed))
+
+            _logger.info(
+                f"Imported agent spool: {len(records)} records ({size} bytes), {len(metrics)} metrics, "
+                f"{queries['ingested']} slow queries, {len(locks)} locks"
+            )
+            return {'records': len(records), 'metrics': len(metrics), 'slow_queries': queries['ingested'],
+                    'locks': len(locks)}
+
+    @api.model
+    def _remove_claimed(self, path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,83 @@
+from odoo import models, fields, api
+from contextlib import contextmanager
+import threading
+import time
+import logging
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_logger = logging.getLogger(__name__)
+
+
+def _rss_mb():
+    if psutil is None:
+        return 0.0
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+class ErpHealthCollectorRun(models.Model):
+    _name = 'erp.health.collector.run'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'ERP Health Collector Run'
+    _order = 'started_at desc, id desc'
+    _rec_name = 'collector'
+
+    collector = fields.Char(string='Collector', required=True, readonly=True, index=True)
+    started_at = fields.Datetime(string='Started At', readonly=True, index=True)
+    duration = fields.Float(string='Wall Time (s)', readonly=True, digits=(16, 4))
+    sql_count = fields.Integer(string='SQL Queries', readonly=True)
+    sql_time = fields.Float(string='SQL Time (s)', readonly=True, digits=(16, 4))
+    rows_written = fields.Integer(string='Rows Written', readonly=True,
+                                  help='Rows inserted, updated or deleted, as reported by the collector')
+    memory_delta_mb = fields.Float(string='Memory Delta (MB)', readonly=True,
+                                   help='Change of the worker resident memory over the run')
+    status = fields.Selection([
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+    ], string='Status', readonly=True, default='success')
+    error_message = fields.Text(string='Error Message', readonly=True)
+
+    @contextmanager
+    def _track(self, collector):
+        """Record the cost of the enclosed collector run; the yielded dict takes `rows_written` and `error`"""
+        thread = threading.current_thread()
+        # Odoo only adds up query time on threads that opt in, as the HTTP workers do
+        if not hasattr(thread, 'query_count'):
+            thread.query_count = 0
+            thread.query_time = 0.0
+        run = {'rows_written': 0, 'error': None}
+        start_queries = thread.query_count
+        start_sql_time = thread.query_time
+        start_rss = _rss_mb()
+        started_at = fields.Datetime.now()
+        start = time.perf_counter()
+        try:
+            yield run
+        except Exception as e:
+            run['error'] = str(e)
+            raise
+        finally:
+            vals = {
+                'collector': collector,
+                'started_at': started_at,
+                'duration': time.perf_counter() - start,
+                'sql_count': thread.query_count - start_queries,
+                'sql_time': thread.query_time - start_sql_time,
+                'rows_written': run['rows_written'],
+                'memory_delta_mb': _rss_mb() - start_rss,
+                'status': 'failed' if run['error'] else 'success',
+                'error_message': run['error'],
+            }
+            try:
+                if run['error']:
+                    # The run's transaction is likely aborted or about to be rolled back: record it apart
+                    with self.env.registry.cursor() as cr:
+                        self.with_env(self.env(cr=cr))._bulk_insert([vals])
+                else:
+                    with self.env.cr.savepoint():
+                        self._bulk_insert([vals])
+            except Exception as e:
+                _logger.warning(f"Could not record the {collector} run: {e}")
@@ -1,26 +1,66 @@
 from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.osv import expression
 from datetime import datetime, timedelta
 
 class ErpHealthCronLog(models.Model):
     _name = 'erp.health.cron.log'
+    _inherit = ['erp.health.partitioned.mixin']
     _description = 'Cron Job Execution Log'
     _order = 'execution_date desc'
+    _partition_column = 'execution_date'
 
     cron_id = fields.Many2one('ir.cron', string='Cron Job', readonly=True, ondelete='cascade')
     cron_name = fields.Char(string='Job Name', readonly=True)
-    execution_date = fields.Datetime(string='Execution Date', readonly=True, default=fields.Datetime.now)
-    duration = fields.Float(string='Duration (seconds)', readonly=True)
+    execution_date = fields.Datetime(string='Execution Date', readonly=True, default=fields.Datetime.now, index=True)
+    duration = fields.Float(string='Duration (seconds)', readonly=True, index=True)
     status = fields.Selection([
         ('success', 'Success'),
         ('failed', 'Failed')
-    ], string='Status', readonly=True)
+    ], string='Status', readonly=True, index=True)
     error_message = fields.Text(string='Error Message', readonly=True)
-    is_slow = fields.Boolean(string='Slow Execution', compute='_compute_is_slow', store=True)
+    query_count = fields.Integer(string='SQL Queries', readonly=True)
+    rows_touched = fields.Integer(string='Rows Touched', readonly=True,
+                                  help='Rows inserted, updated or deleted by the job, across its own commits')
+    memory_growth_mb = fields.Float(string='Memory Growth (MB)', readonly=True,
+                                    help='Resident memory the worker process gained while running the job')
+    baseline_p95 = fields.Float(string='Job p95 (seconds)', readonly=True,
+                                help="The job's rolling p95 duration when this run finished")
+    is_outlier = fields.Boolean(string='Outlier', readonly=True, index=True,
+                                help="Slower than the job's own rolling p95")
+    # Evaluated against the current threshold at read/search time, so changing it never rewrites the table
+    is_slow = fields.Boolean(string='Slow Execution', compute='_compute_is_slow', search='_search_is_slow')
 
-    @api.depends('duration')
-    def _compute_is_slow(self):
-        threshold = float(self.env['ir.config_parameter'].sudo().get_param(
+    def init(self):
+        # is_slow used to be stored; peak_memory_mb held the process's lifetime peak, not the job's
+        self.env.cr.execute(f'ALTER TABLE "{self._table}" DROP COLUMN IF EXISTS is_slow, '
+                            f'DROP COLUMN IF EXISTS peak_memory_mb')
+
+    @api.model
+    def _get_slow_threshold(self):
+        """Seconds above which a run is slow; get_param is served from the registry cache"""
+        return float(self.env['ir.config_parameter'].sudo().get_param(
             'odoo_erp_health_monitor.slow_cron_threshold', '10.0'
         ))
+
+    @api.depends('duration')
+    def _compute_is_slow(self):
+        threshold = self._get_slow_threshold()
         for record in self:
-            record.is_slow = record.duration and record.duration > threshold
\ No newline at end of file
+            record.is_slow = bool(record.duration and record.duration > threshold)
+
+    def _search_is_slow(self, operator, value):
+        if operator in ('=', '!='):
+            wanted = {bool(value)} if operator == '=' else {not value}
+        elif operator in ('in', 'not in'):
+            wanted = {bool(v) for v in value}
+            if operator == 'not in':
+                wanted = {True, False} - wanted
+        else:
+            raise UserError(f'Unsupported operator {operator} for searching slow cron executions.')
+        if len(wanted) != 1:
+            return expression.TRUE_DOMAIN if wanted else expression.FALSE_DOMAIN
+        threshold = self._get_slow_threshold()
+        if True in wanted:
+            return [('duration', '>', threshold)]
+        return ['|', ('duration', '<=', threshold), ('duration', '=', False)]
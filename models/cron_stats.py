@@ -0,0 +1,128 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import base64
+import json
+
+from ..tools.ddsketch import DDSketch
+
+# Runs a job needs in its rolling window before its p95 is trusted for outliers
+MIN_RUNS_FOR_OUTLIER = 20
+
+# Upper bounds (seconds) of the cron duration histogram buckets
+CRON_DURATION_BUCKETS = [0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600]
+
+
+class ErpHealthCronStats(models.Model):
+    _name = 'erp.health.cron.stats'
+    _description = 'Cron Duration Percentiles'
+    _order = 'p95_duration desc, id desc'
+    _rec_name = 'cron_name'
+
+    cron_id = fields.Many2one('ir.cron', string='Cron Job', required=True, readonly=True, ondelete='cascade')
+    cron_name = fields.Char(string='Job Name', readonly=True)
+    # Two rotating windows: percentiles read from both, so they always cover 1 to 2 windows
+    current_sketch = fields.Binary(string='Current Window', attachment=False, readonly=True)
+    previous_sketch = fields.Binary(string='Previous Window', attachment=False, readonly=True)
+    window_start = fields.Datetime(string='Window Start', readonly=True)
+    run_count = fields.Integer(string='Runs', readonly=True, help='Runs in the rolling window')
+    p50_duration = fields.Float(string='p50 (s)', readonly=True, aggregator='max')
+    p95_duration = fields.Float(string='p95 (s)', readonly=True, aggregator='max')
+    p99_duration = fields.Float(string='p99 (s)', readonly=True, aggregator='max')
+    max_duration = fields.Float(string='Max (s)', readonly=True, aggregator='max')
+    last_duration = fields.Float(string='Last Run (s)', readonly=True)
+    last_run = fields.Datetime(string='Last Run', readonly=True)
+    outlier_count = fields.Integer(string='Outliers', readonly=True, help='Runs slower than the rolling p95')
+    # Monotonic counters behind the exported histogram: never reset, never pruned with the cron log
+    total_runs = fields.Integer(string='Total Runs', readonly=True)
+    total_failed = fields.Integer(string='Total Failures', readonly=True)
+    total_duration = fields.Float(string='Total Duration (s)', readonly=True)
+    duration_buckets = fields.Text(string='Duration Buckets', readonly=True,
+                                   help='Cumulative run counts per CRON_DURATION_BUCKETS bound, as JSON')
+
+    _sql_constraints = [
+        ('cron_unique', 'UNIQUE(cron_id)', 'There is one percentile summary per cron job.'),
+    ]
+
+    @api.model
+    def _load_sketch(self, value):
+        return DDSketch.from_bytes(base64.b64decode(value)) if value else DDSketch()
+
+    @api.model
+    def _record_run(self, cron_id, cron_name, duration, failed=False):
+        """Fold one run into the job's sketches; returns the p95 it is compared to, None while warming up"""
+        self.env.cr.execute(f"""
+            INSERT INTO "{self._table}" (cron_id, cron_name, window_start, run_count, outlier_count,
+                                         create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s, now() AT TIME ZONE 'UTC', 0, 0, %s, now() AT TIME ZONE 'UTC',
+                    %s, now() AT TIME ZONE 'UTC')
+            ON CONFLICT (cron_id) DO NOTHING
+        """, [cron_id, cron_name, self.env.uid, self.env.uid])
+        # Manual triggers can race the scheduler on the same job
+        self.env.cr.execute(f'SELECT id FROM "{self._table}" WHERE cron_id = %s FOR UPDATE', [cron_id])
+        stats = self.browse(self.env.cr.fetchone()[0])
+
+        now = fields.Datetime.now()
+        window_days = float(self.env['ir.config_parameter'].sudo().get_param(
+            'odoo_erp_health_monitor.cron_stats_window_days', '7'
+        ))
+        current = self._load_sketch(stats.current_sketch)
+        previous = self._load_sketch(stats.previous_sketch)
+        vals = {}
+        window_start = stats.window_start or now
+        if now - window_start >= timedelta(days=window_days):
+            # An idle job restarts from scratch instead of keeping a stale window
+            previous = current if now - window_start < timedelta(days=2 * window_days) else DDSketch()
+            current = DDSketch()
+            vals['previous_sketch'] = base64.b64encode(previous.to_bytes())
+            vals['window_start'] = now
+
+        rolling = DDSketch().merge(previous).merge(current)
+        baseline_p95 = rolling.quantile(0.95) if rolling.count >= MIN_RUNS_FOR_OUTLIER else None
+        is_outlier = baseline_p95 is not None and duration > baseline_p95
+
+        current.add(duration)
+        rolling.add(duration)
+        buckets = json.loads(stats.duration_buckets) if stats.duration_buckets else [0] * len(CRON_DURATION_BUCKETS)
+        buckets = [count + int(duration <= bound) for bound, count in zip(CRON_DURATION_BUCKETS, buckets)]
+        vals.update({
+            'cron_name': cron_name,
+            'current_sketch': base64.b64encode(current.to_bytes()),
+            'run_count': rolling.count,
+            'p50_duration': rolling.quantile(0.5),
+            'p95_duration': rolling.quantile(0.95),
+            'p99_duration': rolling.quantile(0.99),
+            'max_duration': rolling.max,
+            'last_duration': duration,
+            'last_run': now,
+            'outlier_count': stats.outlier_count + int(is_outlier),
+            'total_runs': stats.total_runs + 1,
+            'total_failed': stats.total_failed + int(failed),
+            'total_duration': stats.total_duration + duration,
+            'duration_buckets': json.dumps(buckets),
+        })
+        stats.write(vals)
+        return baseline_p95
+
+    def action_view_runs(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f'Runs: {self.cron_name}',
+            'res_model': 'erp.health.cron.log',
+            'view_mode': 'list,form',
+            'domain': [('cron_id', '=', self.cron_id.id)],
+        }
+
+    def action_reset(self):
+        """Forget the recorded durations, e.g. after a job was reworked"""
+        self.write({
+            'current_sketch': False,
+            'previous_sketch': False,
+            'window_start': fields.Datetime.now(),
+            'run_count': 0,
+            'p50_duration': 0.0,
+            'p95_duration': 0.0,
+            'p99_duration': 0.0,
+            'max_duration': 0.0,
+            'outlier_count': 0,
+        })
@@ -1,9 +1,109 @@
 from odoo import models, fields, api
 from datetime import datetime, timedelta
+from decimal import Decimal
+import time
 import logging
 
+from ..tools import health
+
 _logger = logging.getLogger(__name__)
 
+# dbname -> (expires at, stats generation, day, stats)
+_STATS_CACHE = {}
+
+# Bus channel of the live dashboard, restricted to ERP Health managers in ir.websocket
+LIVE_CHANNEL = 'erp_health_dashboard'
+
+# Stats a collector's data can change: only those are published after it runs
+LIVE_STATS_KEYS = {
+    'erp.health.server.metrics': ('cpu_percent', 'ram_percent', 'disk_percent', 'last_update',
+                                  'cpu_status', 'ram_status', 'disk_status'),
+    'erp.health.slow.query': ('total_queries', 'queries_today'),
+    'erp.health.statement': ('total_queries', 'queries_today'),
+    'erp.health.database.lock': ('total_locks', 'head_blocker_pid', 'head_blocked_count', 'head_blocker_query',
+                                 'head_blocker_state', 'head_blocker_xact_age'),
+    'erp.health.odoo.log': ('error_logs',),
+    'erp.health.storage': ('disk_full_mount', 'disk_full_days'),
+    'erp.health.table.stats': ('tables_attention', 'top_attention_table', 'unused_indexes'),
+}
+# Every collector run changes these
+MONITOR_STATS_KEYS = ('monitor_runs', 'monitor_seconds', 'monitor_sql_seconds', 'monitor_overhead_percent',
+                      'monitor_top_collector')
+# Any cron of the database changes these: too often to publish on their own, they ride along every collector run
+CRON_STATS_KEYS = ('total_crons', 'failed_crons', 'slow_crons', 'outlier_crons')
+
+STATS_QUERY = """
+    WITH latest AS (
+        SELECT cpu_percent, ram_percent, disk_percent, cpu_anomaly_score, ram_anomaly_score, timestamp
+        FROM erp_health_server_metrics
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ),
+    head_blocker AS (
+        SELECT root_pid, COUNT(DISTINCT waiter_pid) AS blocked_count
+        FROM erp_health_lock_edge
+        WHERE is_current AND snapshot_at >= now() AT TIME ZONE 'UTC' - INTERVAL '15 minutes'
+        GROUP BY root_pid
+        ORDER BY blocked_count DESC, root_pid
+        LIMIT 1
+    ),
+    head_blocker_info AS (
+        SELECT blocker_query, blocker_state, blocker_xact_age
+        FROM erp_health_lock_edge
+        WHERE is_current AND blocker_pid = (SELECT root_pid FROM head_blocker)
+        LIMIT 1
+    ),
+    storage_forecast AS (
+        SELECT name, EXTRACT(EPOCH FROM full_date - now() AT TIME ZONE 'UTC')::float / 86400 AS days
+        FROM erp_health_storage
+        WHERE kind = 'mount' AND full_date IS NOT NULL
+        ORDER BY full_date
+        LIMIT 1
+    ),
+    monitor_overhead AS (
+        SELECT collector, COUNT(*) AS runs, SUM(duration) AS seconds, SUM(sql_time) AS sql_seconds
+        FROM erp_health_collector_run
+        WHERE started_at >= now() AT TIME ZONE 'UTC' - INTERVAL '24 hours'
+        GROUP BY collector
+    )
+    SELECT
+        (SELECT cpu_percent FROM latest) AS cpu_percent,
+        (SELECT ram_percent FROM latest) AS ram_percent,
+        (SELECT disk_percent FROM latest) AS disk_percent,
+        (SELECT cpu_anomaly_score FROM latest) AS cpu_anomaly_score,
+        (SELECT ram_anomaly_score FROM latest) AS ram_anomaly_score,
+        (SELECT timestamp FROM latest) AS last_update,
+        (SELECT name FROM storage_forecast) AS disk_full_mount,
+        (SELECT GREATEST(days, 0) FROM storage_forecast) AS disk_full_days,
+        (SELECT COUNT(*) FROM erp_health_cron_log) AS total_crons,
+        (SELECT COUNT(*) FROM erp_health_cron_log
+          WHERE status = 'failed' AND execution_date >= %(today)s) AS failed_crons,
+        (SELECT COUNT(*) FROM erp_health_cron_log
+          WHERE duration > %(slow_cron_threshold)s AND execution_date >= %(today)s) AS slow_crons,
+        (SELECT COUNT(*) FROM erp_health_cron_log
+          WHERE is_outlier AND execution_date >= %(today)s) AS outlier_crons,
+        (SELECT COUNT(*) FROM erp_health_slow_query) AS total_queries,
+        (SELECT COUNT(*) FROM erp_health_slow_query
+          WHERE detected_at >= %(today)s) AS queries_today,
+        (SELECT COUNT(*) FROM erp_health_database_lock
+          WHERE detected_at >= %(today)s) AS total_locks,
+        (SELECT root_pid FROM head_blocker) AS head_blocker_pid,
+        (SELECT blocked_count FROM head_blocker) AS head_blocked_count,
+        (SELECT blocker_query FROM head_blocker_info) AS head_blocker_query,
+        (SELECT blocker_state FROM head_blocker_info) AS head_blocker_state,
+        (SELECT blocker_xact_age FROM head_blocker_info) AS head_blocker_xact_age,
+        (SELECT COUNT(*) FROM erp_health_table_stats WHERE attention_score > 0) AS tables_attention,
+        (SELECT name FROM erp_health_table_stats WHERE attention_score > 0
+          ORDER BY attention_score DESC LIMIT 1) AS top_attention_table,
+        (SELECT COUNT(*) FROM erp_health_index_stats WHERE is_unused) AS unused_indexes,
+        (SELECT COUNT(*) FROM erp_health_odoo_log
+          WHERE level IN ('ERROR', 'CRITICAL') AND timestamp >= %(today)s) AS error_logs,
+        (SELECT SUM(runs)::int FROM monitor_overhead) AS monitor_runs,
+        (SELECT SUM(seconds) FROM monitor_overhead) AS monitor_seconds,
+        (SELECT SUM(sql_seconds) FROM monitor_overhead) AS monitor_sql_seconds,
+        (SELECT collector FROM monitor_overhead ORDER BY seconds DESC LIMIT 1) AS monitor_top_collector
+"""
+
 
 class ErpHealthDashboard(models.Model):
     _name = 'erp.health.dashboard'
@@ -14,16 +114,36 @@ class ErpHealthDashboard(models.Model):
     cpu_percent = fields.Float(string='CPU Usage %', compute='_compute_dashboard_stats')
     ram_percent = fields.Float(string='RAM Usage %', compute='_compute_dashboard_stats')
     disk_percent = fields.Float(string='Disk Usage %', compute='_compute_dashboard_stats')
+    disk_full_mount = fields.Char(string='First Filesystem to Fill', compute='_compute_dashboard_stats')
+    disk_full_days = fields.Float(string='Days to Full', compute='_compute_dashboard_stats')
     
     total_crons = fields.Integer(string='Total Cron Jobs', compute='_compute_dashboard_stats')
     failed_crons = fields.Integer(string='Failed Crons', compute='_compute_dashboard_stats')
     slow_crons = fields.Integer(string='Slow Crons', compute='_compute_dashboard_stats')
+    outlier_crons = fields.Integer(string='Cron Outliers', compute='_compute_dashboard_stats')
     
     total_queries = fields.Integer(string='Total Slow Queries', compute='_compute_dashboard_stats')
     queries_today = fields.Integer(string='Queries Today', compute='_compute_dashboard_stats')
     
     total_locks = fields.Integer(string='Database Locks', compute='_compute_dashboard_stats')
+    head_blocker_pid = fields.Integer(string='Head Blocker PID', compute='_compute_dashboard_stats')
+    head_blocked_count = fields.Integer(string='Sessions Blocked', compute='_compute_dashboard_stats')
+    head_blocker_query = fields.Text(string='Head Blocker Query', compute='_compute_dashboard_stats')
+    head_blocker_state = fields.Char(string='Head Blocker State', compute='_compute_dashboard_stats')
+    head_blocker_xact_age = fields.Float(string='Head Blocker Transaction Age (s)', compute='_compute_dashboard_stats')
     error_logs = fields.Integer(string='Error Logs', compute='_compute_dashboard_stats')
+
+    tables_attention = fields.Integer(string='Tables Needing Attention', compute='_compute_dashboard_stats')
+    top_attention_table = fields.Char(string='Worst Table', compute='_compute_dashboard_stats')
+    unused_indexes = fields.Integer(string='Unused Indexes', compute='_compute_dashboard_stats')
+
+    # Cost of the monitor itself over the last 24 hours
+    monitor_runs = fields.Integer(string='Collector Runs (24h)', compute='_compute_dashboard_stats')
+    monitor_seconds = fields.Float(string='Collector Time (24h, s)', compute='_compute_dashboard_stats')
+    monitor_sql_seconds = fields.Float(string='Collector SQL Time (24h, s)', compute='_compute_dashboard_stats')
+    monitor_overhead_percent = fields.Float(string='Monitor Overhead %', compute='_compute_dashboard_stats',
+                                            help='Share of the last 24 hours spent running collectors')
+    monitor_top_collector = fields.Char(string='Costliest Collector', compute='_compute_dashboard_stats')
     
     last_update = fields.Datetime(string='Last Update', compute='_compute_dashboard_stats')
     
@@ -66,74 +186,187 @@ class ErpHealthDashboard(models.Model):
             return existing
         return super().create(vals_list)
 
+    def init(self):
+        # Bumped by the collectors; lets every worker see that its cached stats are stale
+        self.env.cr.execute("CREATE SEQUENCE IF NOT EXISTS erp_health_stats_generation")
+
+    @api.model
+    def _invalidate_stats_cache(self):
+        """Mark cached dashboard stats stale in every worker, called when collectors write data
+
+        The generation is bumped once the collector's transaction commits: nextval() is not
+        transactional, and bumped earlier a reader could cache the old rows under the new generation.
+        """
+        cr = self.env.cr
+        dbname = cr.dbname
+        _STATS_CACHE.pop(dbname, None)
+        cr.precommit.data.pop('erp_health_stats', None)
+        if cr.postcommit.data.get('erp_health_stats_generation'):
+            return
+        cr.postcommit.data['erp_health_stats_generation'] = True
+
+        @cr.postcommit.add
+        def bump_generation():
+            _STATS_CACHE.pop(dbname, None)
+            try:
+                with self.env.registry.cursor() as bump_cr:
+                    bump_cr.execute("SELECT nextval('erp_health_stats_generation')")
+            except Exception as e:
+                # Other workers then serve their cached stats until the TTL expires
+                _logger.warning(f"Could not bump the dashboard stats generation: {e}")
+
+    @api.model
+    def _get_dashboard_stats(self, use_cache=True):
+        """Return dashboard statistics from one aggregated query, cached per database for a short TTL
+
+        Collectors pass `use_cache=False`: their own rows are not committed yet, so they must
+        neither be served stats cached before them nor leave stats with them in the cache.
+        Those stats are only shared within the transaction, by the live dashboard and the exporter.
+        """
+        ttl = float(self.env['ir.config_parameter'].sudo().get_param(
+            'odoo_erp_health_monitor.dashboard_cache_ttl', '15'
+        ))
+        params = {
+            'today': datetime.combine(fields.Date.today(), datetime.min.time()),
+            'slow_cron_threshold': self.env['erp.health.cron.log']._get_slow_threshold(),
+        }
+        now = time.monotonic()
+
+        if not use_cache:
+            # Cleared on commit and rollback
+            cached = self.env.cr.precommit.data.get('erp_health_stats')
+            if cached and cached[0] == params:
+                return cached[1]
+
+        self.env.cr.execute("SELECT last_value FROM erp_health_stats_generation")
+        generation = self.env.cr.fetchone()[0]
+
+        cached = _STATS_CACHE.get(self.env.cr.dbname) if use_cache else None
+        if cached and cached[0] > now and cached[1] == generation and cached[2] == params:
+            return cached[3]
+
+        for model in ('erp.health.server.metrics', 'erp.health.cron.log', 'erp.health.slow.query',
+                      'erp.health.database.lock', 'erp.health.lock.edge', 'erp.health.odoo.log',
+                      'erp.health.collector.run', 'erp.health.storage', 'erp.health.table.stats',
+                      'erp.health.index.stats'):
+            self.env[model].flush_model()
+        self.env.cr.execute(STATS_QUERY, params)
+        stats = self.env.cr.dictfetchone()
+
+        if not use_cache:
+            self.env.cr.precommit.data['erp_health_stats'] = (params, stats)
+        elif ttl > 0:
+            _STATS_CACHE[self.env.cr.dbname] = (now + ttl, generation, params, stats)
+        return stats
+
     @api.depends_context('uid')
     def _compute_dashboard_stats(self):
         """Compute all dashboard statistics"""
+        stats = self._get_dashboard_stats()
         for record in self:
-            today_start = datetime.combine(fields.Date.today(), datetime.min.time())
-            
             # Server Metrics Stats
-            latest_metric = self.env['erp.health.server.metrics'].search([], order='id desc', limit=1)
-            record.cpu_percent = latest_metric.cpu_percent if latest_metric else 0
-            record.ram_percent = latest_metric.ram_percent if latest_metric else 0
-            record.disk_percent = latest_metric.disk_percent if latest_metric else 0
-            record.last_update = latest_metric.timestamp if latest_metric else False
+            record.cpu_percent = stats['cpu_percent'] or 0
+            record.ram_percent = stats['ram_percent'] or 0
+            record.disk_percent = stats['disk_percent'] or 0
+            record.disk_full_mount = stats['disk_full_mount'] or False
+            record.disk_full_days = stats['disk_full_days'] or 0.0
+            record.last_update = stats['last_update'] or False
             
             # Cron Stats
-            record.total_crons = self.env['erp.health.cron.log'].search_count([])
-            record.failed_crons = self.env['erp.health.cron.log'].search_count([
-                ('status', '=', 'failed'),
-                ('execution_date', '>=', today_start)
-            ])
-            record.slow_crons = self.env['erp.health.cron.log'].search_count([
-                ('is_slow', '=', True),
-                ('execution_date', '>=', today_start)
-            ])
+            record.total_crons = stats['total_crons']
+            record.failed_crons = stats['failed_crons']
+            record.slow_crons = stats['slow_crons']
+            record.outlier_crons = stats['outlier_crons']
             
             # Slow Query Stats
-            record.total_queries = self.env['erp.health.slow.query'].search_count([])
-            record.queries_today = self.env['erp.health.slow.query'].search_count([
-                ('detected_at', '>=', today_start)
-            ])
+            record.total_queries = stats['total_queries']
+            record.queries_today = stats['queries_today']
             
             # Database Locks
-            record.total_locks = self.env['erp.health.database.lock'].search_count([
-                ('detected_at', '>=', today_start)
-            ])
+            record.total_locks = stats['total_locks']
+            record.head_blocker_pid = stats['head_blocker_pid'] or 0
+            record.head_blocked_count = stats['head_blocked_count'] or 0
+            record.head_blocker_query = stats['head_blocker_query'] or False
+            record.head_blocker_state = stats['head_blocker_state'] or False
+            record.head_blocker_xact_age = stats['head_blocker_xact_age'] or 0
             
             # Error Logs
-            record.error_logs = self.env['erp.health.odoo.log'].search_count([
-                ('level', 'in', ['ERROR', 'CRITICAL']),
-                ('timestamp', '>=', today_start)
-            ])
+            record.error_logs = stats['error_logs']
+
+            # Table Health
+            record.tables_attention = stats['tables_attention']
+            record.top_attention_table = stats['top_attention_table'] or False
+            record.unused_indexes = stats['unused_indexes']
+
+            # Monitor Overhead
+            record.monitor_runs = stats['monitor_runs'] or 0
+            record.monitor_seconds = stats['monitor_seconds'] or 0.0
+            record.monitor_sql_seconds = stats['monitor_sql_seconds'] or 0.0
+            record.monitor_overhead_percent = self._overhead_percent(record.monitor_seconds)
+            record.monitor_top_collector = stats['monitor_top_collector'] or False
+
+    @api.model
+    def _overhead_percent(self, seconds):
+        """Share of a day spent in `seconds` of collector time"""
+        return round((seconds or 0.0) / 86400 * 100, 3)
+
+    @api.model
+    def _live_stats(self, keys=None, use_cache=True):
+        """Dashboard stats as sent to the live dashboard, JSON-ready; all of them unless `keys` is given"""
+        stats = dict(self._get_dashboard_stats(use_cache))
+        stats.update(self._health_levels(stats))
+        stats['monitor_overhead_percent'] = self._overhead_percent(stats['monitor_seconds'])
+        payload = {}
+        for key in keys or stats:
+            value = stats[key]
+            if isinstance(value, datetime):
+                value = fields.Datetime.to_string(value)
+            elif isinstance(value, Decimal):
+                value = float(value)
+            payload[key] = value
+        return payload
+
+    @api.model
+    def get_live_stats(self):
+        """Initial state of the live dashboard, patched afterwards by bus notifications"""
+        self.check_access('read')
+        return self._live_stats()
+
+    @api.model
+    def _publish_live_stats(self, source=None):
+        """Send the stats `source` (a model name) can have changed to the live dashboards, once per run
+
+        However many people watch, a collector run costs one stats query and one bus message.
+        """
+        keys = LIVE_STATS_KEYS.get(source)
+        try:
+            # Never let publishing abort the collector's transaction
+            with self.env.cr.savepoint():
+                payload = self._live_stats(keys + MONITOR_STATS_KEYS + CRON_STATS_KEYS if keys else None,
+                                           use_cache=False)
+                self.env['bus.bus']._sendone(LIVE_CHANNEL, 'erp_health_stats', payload)
+        except Exception as e:
+            _logger.warning(f"Could not publish live dashboard stats: {e}")
+
+    def action_open_live_dashboard(self):
+        """Open the bus-driven live dashboard"""
+        return self.env['ir.actions.actions']._for_xml_id('odoo_erp_health_monitor.action_erp_health_live_dashboard')
+
+    @api.model
+    def _health_levels(self, stats):
+        """CPU and RAM against their hourly baseline once it is warm, disk against fixed thresholds"""
+        return {
+            'cpu_status': health.metric_level('cpu', stats['cpu_percent'] or 0, stats['cpu_anomaly_score']),
+            'ram_status': health.metric_level('ram', stats['ram_percent'] or 0, stats['ram_anomaly_score']),
+            'disk_status': health.classify('disk', stats['disk_percent'] or 0),
+        }
 
     @api.depends('cpu_percent', 'ram_percent', 'disk_percent')
     def _compute_health_status(self):
-        """Compute health status based on usage percentages"""
+        """Compute health status from the latest sample"""
+        levels = self._health_levels(self._get_dashboard_stats())
         for record in self:
-            # CPU Status
-            if record.cpu_percent < 60:
-                record.cpu_status = 'good'
-            elif record.cpu_percent < 80:
-                record.cpu_status = 'warning'
-            else:
-                record.cpu_status = 'critical'
-            
-            # RAM Status
-            if record.ram_percent < 70:
-                record.ram_status = 'good'
-            elif record.ram_percent < 85:
-                record.ram_status = 'warning'
-            else:
-                record.ram_status = 'critical'
-            
-            # Disk Status
-            if record.disk_percent < 75:
-                record.disk_status = 'good'
-            elif record.disk_percent < 90:
-                record.disk_status = 'warning'
-            else:
-                record.disk_status = 'critical'
+            record.update(levels)
 
     # Action buttons
     def action_collect_metrics(self):
@@ -255,6 +488,17 @@ class ErpHealthDashboard(models.Model):
             'target': 'current',
         }
 
+    def action_view_top_statements(self):
+        """Open pg_stat_statements intervals ranked by cumulative execution time"""
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Top Statements',
+            'res_model': 'erp.health.statement.interval',
+            'view_mode': 'pivot,list,graph',
+            'context': {'search_default_today': 1},
+            'target': 'current',
+        }
+
     def action_view_cron_logs(self):
         """Open cron logs view"""
         return {
@@ -266,6 +510,27 @@ class ErpHealthDashboard(models.Model):
             'target': 'current',
         }
 
+    def action_view_cron_percentiles(self):
+        """Open the per-job duration percentiles"""
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Cron Percentiles',
+            'res_model': 'erp.health.cron.stats',
+            'view_mode': 'list,form',
+            'target': 'current',
+        }
+
+    def action_view_collector_runs(self):
+        """Open the cost of the monitor's own collector runs"""
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Monitor Overhead',
+            'res_model': 'erp.health.collector.run',
+            'view_mode': 'pivot,list,graph',
+            'context': {'search_default_today': 1},
+            'target': 'current',
+        }
+
     def action_view_server_metrics(self):
         """Open server metrics view"""
         return {
@@ -276,6 +541,37 @@ class ErpHealthDashboard(models.Model):
             'target': 'current',
         }
 
+    def action_view_storage(self):
+        """Open filesystem, database and table sizes with their forecast"""
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Storage',
+            'res_model': 'erp.health.storage',
+            'view_mode': 'list,form',
+            'target': 'current',
+        }
+
+    def action_view_table_health(self):
+        """Open the tables needing attention, worst first"""
+        return self.env['ir.actions.actions']._for_xml_id('odoo_erp_health_monitor.action_table_stats')
+
+    def action_view_metric_trends(self):
+        """Open server metric trends from the rollup tier matching the period"""
+        period = self.env.context.get('trend_period', 'day')
+        return self.env['erp.health.metrics.rollup'].action_view_trends(period)
+
+    def action_view_heaviest_workers(self):
+        """Open the Odoo processes of the latest sample, heaviest first"""
+        latest = self.env['erp.health.worker.metrics'].search([], order='id desc', limit=1)
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Heaviest Workers',
+            'res_model': 'erp.health.worker.metrics',
+            'view_mode': 'list,form',
+            'domain': [('metrics_id', '=', latest.metrics_id)],
+            'target': 'current',
+        }
+
     def action_view_database_locks(self):
         """Open database locks view"""
         return {
@@ -286,6 +582,17 @@ class ErpHealthDashboard(models.Model):
             'target': 'current',
         }
 
+    def action_view_lock_graph(self):
+        """Open the current lock wait graph, chains of the head blocker first"""
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Lock Wait Graph',
+            'res_model': 'erp.health.lock.edge',
+            'view_mode': 'list,form',
+            'context': {'search_default_current': 1, 'search_default_group_root': 1},
+            'target': 'current',
+        }
+
     def action_view_odoo_logs(self):
         """Open Odoo logs view"""
         return {
@@ -6,10 +6,13 @@ _logger = logging.getLogger(__name__)
 
 class ErpHealthDatabaseLock(models.Model):
     _name = 'erp.health.database.lock'
+    # Partitioning first so its _prune_rows() takes precedence
+    _inherit = ['erp.health.partitioned.mixin', 'erp.health.ingest.mixin']
     _description = 'Database Lock Monitor'
     _order = 'detected_at desc'
+    _partition_column = 'detected_at'
 
-    detected_at = fields.Datetime(string='Detected At', readonly=True, default=fields.Datetime.now)
+    detected_at = fields.Datetime(string='Detected At', readonly=True, default=fields.Datetime.now, index=True)
     pid = fields.Integer(string='Process ID', readonly=True)
     lock_type = fields.Char(string='Lock Type', readonly=True)
     relation = fields.Char(string='Table/Relation', readonly=True)
@@ -24,10 +27,11 @@ class ErpHealthDatabaseLock(models.Model):
             SELECT 
                 l.pid,
                 l.locktype,
-                l.relation::regclass::text as relation,
+                COALESCE(l.relation::regclass::text, 'N/A'),
                 l.mode,
-                a.query,
-                EXTRACT(EPOCH FROM (now() - a.query_start)) as wait_time
+                LEFT(a.query, 5000),
+                COALESCE(EXTRACT(EPOCH FROM (now() - a.query_start)), 0) as wait_time,
+                now() AT TIME ZONE 'UTC'
             FROM pg_locks l
             LEFT JOIN pg_stat_activity a ON l.pid = a.pid
             WHERE NOT l.granted
@@ -36,29 +40,29 @@ class ErpHealthDatabaseLock(models.Model):
             LIMIT 50
         """
 
-        try:
-            self.env.cr.execute(query)
-            results = self.env.cr.dictfetchall()
+        with self.env['erp.health.collector.run']._track('refresh_locks') as run:
+            try:
+                # Store new locks straight from pg_locks
+                records = self._ingest_select(
+                    ['pid', 'lock_type', 'relation', 'mode', 'query', 'wait_time', 'detected_at'],
+                    query,
+                )
 
-            # Clear old records
-            old_records = self.search([], order='id desc', offset=500)
-            if old_records:
-                old_records.unlink()
+                # Who blocks whom, so the culprit of a pile-up is known
+                graph = self.env['erp.health.lock.edge']._collect_lock_graph()
 
-            # Store new locks
-            for row in results:
-                self.create({
-                    'pid': row['pid'],
-                    'lock_type': row['locktype'],
-                    'relation': row['relation'] or 'N/A',
-                    'mode': row['mode'],
-                    'query': row['query'][:5000] if row['query'] else '',
-                    'wait_time': row['wait_time'] or 0,
-                })
+                # Clear old records
+                pruned = self._prune_rows(500)
+                run['rows_written'] = len(records) + graph['edges'] + pruned
+                self._notify_collected()
 
-            _logger.info(f"Detected {len(results)} database locks")
-            return True
+                _logger.info(
+                    f"Detected {len(records)} database locks, {graph['edges']} wait edges "
+                    f"behind {graph['roots']} root blockers, pruned {pruned}"
+                )
+                return {'ingested': len(records), 'pruned': pruned, 'graph': graph}
 
-        except Exception as e:
-            _logger.error(f"Error detecting locks: {e}")
-            return False
\ No newline at end of file
+            except Exception as e:
+                run['error'] = str(e)
+                _logger.error(f"Error detecting locks: {e}")
+                return False
@@ -1,6 +1,10 @@
 from odoo import models, fields, api
+from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
 import logging
+import time
+
+from .partitioning import partition_bounds
 
 _logger = logging.getLogger(__name__)
 
@@ -34,6 +38,14 @@ class ErpHealthConfig(models.Model):
         ('90', 'Last 3 Months'),
         ('all', 'All Time'),
     ], string='Server Metrics Retention', default='30', required=True)
+
+    metrics_rollup_retention = fields.Selection([
+        ('90', 'Last 3 Months'),
+        ('365', 'Last Year'),
+        ('1825', 'Last 5 Years'),
+        ('all', 'All Time'),
+    ], string='Metric Trends Retention', default='1825', required=True,
+        help='How long the minute, hour and day rollups behind the trend graphs are kept')
     
     database_locks_retention = fields.Selection([
         ('7', 'Last 7 Days'),
@@ -57,6 +69,66 @@ class ErpHealthConfig(models.Model):
     
     last_cleanup = fields.Datetime(string='Last Cleanup', readonly=True)
 
+    # Storage
+    partition_period = fields.Selection([
+        ('none', 'Not Partitioned'),
+        ('day', 'Daily Partitions'),
+        ('week', 'Weekly Partitions'),
+    ], string='Time Partitioning', default='none', required=True,
+        help='Store metrics, slow queries, locks, cron and system logs in PostgreSQL range partitions. '
+             'Retention then drops whole partitions. Tables are converted by the partition maintenance '
+             'job and are never converted back.')
+
+    # Sampling
+    sampling_mode = fields.Selection([
+        ('fixed', 'Fixed Intervals'),
+        ('adaptive', 'Adaptive'),
+    ], string='Sampling', default='fixed', required=True,
+        help='Adaptive replaces the metrics, slow query and lock crons by one driver that samples every '
+             'few seconds while CPU, RAM or lock waits are critical and backs off while healthy.')
+    agent_import = fields.Boolean(string='Import Agent Samples', default=False,
+                                  help='Host metrics come from the standalone agent (tools/agent.py): its spool '
+                                       'is imported every 5 minutes and Odoo stops sampling the host itself.')
+    adaptive_min_interval = fields.Integer(string='Fastest Interval (s)', default=15)
+    adaptive_max_interval = fields.Integer(string='Slowest Interval (s)', default=600)
+    adaptive_budget_percent = fields.Float(string='Monitor Time Budget (%)', default=2.0,
+                                           help='Share of each hour the collectors may run in adaptive mode')
+    adaptive_level = fields.Selection([
+        ('good', 'Good'),
+        ('warning', 'Warning'),
+        ('critical', 'Critical'),
+        ('throttled', 'Over Budget'),
+    ], string='Current Level', readonly=True)
+    adaptive_interval = fields.Integer(string='Current Interval (s)', readonly=True)
+    adaptive_last_sample = fields.Datetime(string='Last Sample', readonly=True)
+    adaptive_next_sample = fields.Datetime(string='Next Sample', readonly=True)
+
+    # Query plans
+    plan_capture = fields.Boolean(string='Capture Query Plans', default=False,
+                                  help='EXPLAIN new or regressed slow query shapes in a read-only transaction')
+    plan_capture_per_hour = fields.Integer(string='Plans per Hour', default=6,
+                                           help='At most this many plans are captured in any hour')
+    plan_capture_analyze = fields.Boolean(string='Execute Read-Only Queries (ANALYZE)', default=False,
+                                          help='Run EXPLAIN ANALYZE on queries that only read, for actual row '
+                                               'counts and spills; this executes them again, within the capture '
+                                               'timeout. Writes are never executed.')
+
+    @api.constrains('adaptive_min_interval', 'adaptive_max_interval', 'adaptive_budget_percent')
+    def _check_adaptive_settings(self):
+        for config in self:
+            if config.adaptive_min_interval < 5 or config.adaptive_max_interval < config.adaptive_min_interval:
+                raise ValidationError(
+                    'Sampling intervals must be at least 5 seconds, the slowest not below the fastest.'
+                )
+            if not 0 < config.adaptive_budget_percent <= 100:
+                raise ValidationError('The monitor time budget must be between 0 and 100%.')
+
+    @api.constrains('plan_capture_per_hour')
+    def _check_plan_capture(self):
+        for config in self:
+            if config.plan_capture_per_hour < 1:
+                raise ValidationError('At least one query plan per hour must be allowed.')
+
     @api.model
     def default_get(self, fields_list):
         """Override to ensure only one config exists"""
@@ -77,6 +149,12 @@ class ErpHealthConfig(models.Model):
             return existing
         return super().create(vals_list)
 
+    def write(self, vals):
+        res = super().write(vals)
+        if 'sampling_mode' in vals or 'agent_import' in vals:
+            self.env['erp.health.sampler']._apply_sampling_mode(self.get_config().sampling_mode)
+        return res
+
     @api.model
     def get_config(self):
         """Get or create singleton config record"""
@@ -94,81 +172,186 @@ class ErpHealthConfig(models.Model):
         return datetime.now() - timedelta(days=days)
 
     @api.model
-    def cleanup_old_data(self):
-        """Clean up old data based on retention settings"""
+    def _get_cleanup_targets(self):
+        """Return (model, time column, retention field) for every table the cleanup prunes"""
+        # Children first so cascades never delete more than one batch worth of rows
+        return [
+            ('erp.health.odoo.log', 'timestamp', 'system_logs_retention'),
+            ('erp.health.slow.query', 'detected_at', 'slow_queries_retention'),
+            ('erp.health.query.plan', 'captured_at', 'slow_queries_retention'),
+            ('erp.health.query.family', 'last_seen', 'slow_queries_retention'),
+            ('erp.health.statement.interval', 'interval_end', 'slow_queries_retention'),
+            ('erp.health.worker.metrics', 'timestamp', 'server_metrics_retention'),
+            ('erp.health.server.metrics', 'timestamp', 'server_metrics_retention'),
+            ('erp.health.metrics.rollup', 'bucket_start', 'metrics_rollup_retention'),
+            ('erp.health.lock.edge', 'snapshot_at', 'database_locks_retention'),
+            ('erp.health.database.lock', 'detected_at', 'database_locks_retention'),
+            ('erp.health.cron.log', 'execution_date', 'cron_logs_retention'),
+            ('erp.health.collector.run', 'started_at', 'server_metrics_retention'),
+        ]
+
+    @api.model
+    def _drop_expired_partitions(self, cr, table, cutoff):
+        """Drop the range partitions of `table` holding only rows older than `cutoff`; no-op on plain tables"""
+        dropped = 0
+        for partition, _lower, upper in partition_bounds(cr, table):
+            if upper > cutoff:
+                break
+            cr.execute(f'DROP TABLE "{partition}"')
+            cr.commit()
+            dropped += 1
+        return dropped
+
+    @api.model
+    def _get_partitioned_models(self):
+        """Monitoring models that support time-partitioned storage"""
+        return [
+            name for name in self.env.registry
+            if getattr(self.env.registry[name], '_partition_column', None) and not self.env[name]._abstract
+        ]
+
+    @api.model
+    def maintain_partitions(self):
+        """Partition the monitoring tables when enabled and keep partitions ready ahead of time"""
         config = self.get_config()
+        period = config.partition_period
+        done = {}
+        for model_name in self._get_partitioned_models():
+            model = self.env[model_name]
+            try:
+                with self.env.cr.savepoint():
+                    if model._is_partitioned():
+                        bounds = partition_bounds(self.env.cr, model._table)
+                        if period == 'none':
+                            # Turning the option off never un-partitions, keep the current width
+                            last = bounds[-1] if bounds else None
+                            period = 'day' if last and last[2] - last[1] <= timedelta(days=1) else 'week'
+                        done[model_name] = len(model._create_partitions(period))
+                    elif period != 'none':
+                        model._convert_to_partitioned(period)
+                        done[model_name] = 'converted'
+            except Exception as e:
+                _logger.error(f"Error maintaining partitions of {model_name}: {e}")
+            period = config.partition_period
+        _logger.info(f"Partition maintenance: {done}")
+        return done
+
+    @api.model
+    def _delete_in_batches(self, cr, table, column, cutoff, batch_size, deadline):
+        """Delete rows older than `cutoff` in bounded batches, committing after each one
+
+        Returns (rows deleted, finished) where finished is False when the deadline was hit.
+        """
+        deleted = 0
+        while True:
+            if time.monotonic() >= deadline:
+                return deleted, False
+            cr.execute(f"""
+                DELETE FROM "{table}"
+                WHERE id IN (
+                    SELECT id FROM "{table}"
+                    WHERE "{column}" < %s
+                    LIMIT %s
+                )
+            """, (cutoff, batch_size))
+            count = cr.rowcount
+            cr.commit()
+            deleted += count
+            if count < batch_size:
+                return deleted, True
+
+    @api.model
+    def cleanup_old_data(self):
+        """Clean up old data based on retention settings
+
+        Rows are deleted in batches on a dedicated cursor committed after each
+        batch, so no long transaction holds locks or piles up WAL. When the time
+        budget runs out the cleanup stops and the cron is triggered again.
+        """
+        with self.env['erp.health.collector.run']._track('cleanup_old_data') as run:
+            config = self.get_config()
         
-        if not config.auto_cleanup:
-            _logger.info("Auto cleanup is disabled")
-            return
-        
-        # System Logs cleanup
-        cutoff = config._get_cutoff_date(config.system_logs_retention)
-        if cutoff:
-            old_logs = self.env['erp.health.odoo.log'].search([
-                ('timestamp', '<', cutoff)
-            ])
-            count = len(old_logs)
-            old_logs.unlink()
-            _logger.info(f"Deleted {count} old system logs")
-        
-        # Slow Queries cleanup
-        cutoff = config._get_cutoff_date(config.slow_queries_retention)
-        if cutoff:
-            old_queries = self.env['erp.health.slow.query'].search([
-                ('detected_at', '<', cutoff)
-            ])
-            count = len(old_queries)
-            old_queries.unlink()
-            _logger.info(f"Deleted {count} old slow queries")
-        
-        # Server Metrics cleanup
-        cutoff = config._get_cutoff_date(config.server_metrics_retention)
-        if cutoff:
-            old_metrics = self.env['erp.health.server.metrics'].search([
-                ('timestamp', '<', cutoff)
-            ])
-            count = len(old_metrics)
-            old_metrics.unlink()
-            _logger.info(f"Deleted {count} old server metrics")
-        
-        # Database Locks cleanup
-        cutoff = config._get_cutoff_date(config.database_locks_retention)
-        if cutoff:
-            old_locks = self.env['erp.health.database.lock'].search([
-                ('detected_at', '<', cutoff)
-            ])
-            count = len(old_locks)
-            old_locks.unlink()
-            _logger.info(f"Deleted {count} old database locks")
-        
-        # Cron Logs cleanup
-        cutoff = config._get_cutoff_date(config.cron_logs_retention)
-        if cutoff:
-            old_crons = self.env['erp.health.cron.log'].search([
-                ('execution_date', '<', cutoff)
-            ])
-            count = len(old_crons)
-            old_crons.unlink()
-            _logger.info(f"Deleted {count} old cron logs")
-        
-        # Update last cleanup time
-        config.write({'last_cleanup': fields.Datetime.now()})
-        
-        _logger.info("Data cleanup completed successfully")
-        
-        return True
+            if not config.auto_cleanup:
+                _logger.info("Auto cleanup is disabled")
+                return
+
+            params = self.env['ir.config_parameter'].sudo()
+            batch_size = int(params.get_param('odoo_erp_health_monitor.cleanup_batch_size', '10000'))
+            budget = float(params.get_param('odoo_erp_health_monitor.cleanup_time_budget', '300'))
+            started = time.monotonic()
+            deadline = started + budget
+
+            self.env.flush_all()
+            summary = {}
+            finished = True
+            with self.env.registry.cursor() as cr:
+                for model_name, column, retention_field in self._get_cleanup_targets():
+                    cutoff = config._get_cutoff_date(config[retention_field])
+                    if not cutoff:
+                        continue
+                    model_start = time.monotonic()
+                    model = self.env[model_name]
+                    table = model._table
+                    partitions = self._drop_expired_partitions(cr, table, cutoff)
+                    if getattr(model, '_partition_column', None) and model._is_partitioned():
+                        # Rows of the partition straddling the cutoff go when the whole partition expires
+                        deleted = 0
+                    else:
+                        deleted, finished = self._delete_in_batches(cr, table, column, cutoff, batch_size, deadline)
+                    summary[model_name] = deleted
+                    _logger.info(
+                        f"Cleanup {model_name}: deleted {deleted} rows, dropped {partitions} partitions "
+                        f"in {time.monotonic() - model_start:.2f}s"
+                    )
+                    if not finished:
+                        break
+
+            # Rows went away behind the ORM's back
+            for model_name, _column, _retention in self._get_cleanup_targets():
+                self.env[model_name].invalidate_model()
+
+            elapsed = time.monotonic() - started
+            if finished:
+                # Update last cleanup time
+                config.write({'last_cleanup': fields.Datetime.now()})
+                _logger.info(f"Data cleanup completed: {sum(summary.values())} rows in {elapsed:.2f}s")
+            else:
+                _logger.warning(
+                    f"Data cleanup stopped after its {budget:.0f}s budget ({sum(summary.values())} rows), "
+                    f"continuing in a later run"
+                )
+                cron = self.env.ref('odoo_erp_health_monitor.ir_cron_cleanup_old_data', raise_if_not_found=False)
+                if cron:
+                    cron._trigger(fields.Datetime.now() + timedelta(minutes=5))
+
+            run['rows_written'] = sum(summary.values())
+            self.env['erp.health.dashboard']._invalidate_stats_cache()
+            return summary
+
+    def action_maintain_partitions(self):
+        """Manual partition maintenance trigger"""
+        done = self.maintain_partitions()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Partitions',
+                'message': f'Partition maintenance done for {len(done)} tables',
+                'type': 'success',
+                'sticky': False,
+            }
+        }
 
     def action_cleanup_now(self):
         """Manual cleanup trigger"""
         try:
-            self.cleanup_old_data()
+            summary = self.cleanup_old_data() or {}
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
                 'params': {
                     'title': 'Success',
-                    'message': 'Old data cleaned up successfully based on retention settings',
+                    'message': f'Old data cleaned up based on retention settings: {sum(summary.values())} records deleted',
                     'type': 'success',
                     'sticky': False,
                 }
@@ -0,0 +1,174 @@
+from odoo import models, api, tools
+import hashlib
+import json
+import os
+import time
+import logging
+
+from ..tools import openmetrics
+from .cron_stats import CRON_DURATION_BUCKETS
+
+_logger = logging.getLogger(__name__)
+
+# Minimum seconds between two renders of the same database, across all processes
+RENDER_INTERVAL = 10
+
+# dbname -> monotonic time of the last render by this process
+_LAST_RENDER = {}
+
+
+def _rendered_recently(path):
+    """Whether any process rendered the exposition at `path` less than RENDER_INTERVAL ago"""
+    try:
+        return time.time() - os.path.getmtime(path) < RENDER_INTERVAL
+    except OSError:
+        return False
+
+
+def exposition_path(dbname):
+    """File the exposition of `dbname` is rendered to; the token hash sits next to it in .auth"""
+    return os.path.join(tools.config['data_dir'], 'erp_health_monitor', f'{dbname}.prom')
+
+
+class ErpHealthExporter(models.AbstractModel):
+    _name = 'erp.health.exporter'
+    _description = 'ERP Health Prometheus Exporter'
+
+    @api.model
+    def _get_token(self):
+        return self.env['ir.config_parameter'].sudo().get_param('odoo_erp_health_monitor.prometheus_token')
+
+    @api.model
+    def _metric_families(self):
+        """Build the OpenMetrics families from the latest sample, the dashboard counters and the cron logs"""
+        families = []
+
+        self.env['erp.health.server.metrics'].flush_model()
+        self.env.cr.execute("""
+            SELECT * FROM erp_health_server_metrics
+            ORDER BY timestamp DESC
+            LIMIT 1
+        """)
+        latest = self.env.cr.dictfetchone()
+        gb = 1024 ** 3
+        if latest:
+            for name, column, help_text, scale in [
+                ('erp_health_cpu_percent', 'cpu_percent', 'Host CPU utilisation', 1),
+                ('erp_health_cpu_iowait_percent', 'cpu_iowait_percent', 'Share of CPU time waiting on I/O', 1),
+                ('erp_health_cpu_steal_percent', 'cpu_steal_percent', 'Share of CPU time stolen by the hypervisor', 1),
+                ('erp_health_ram_percent', 'ram_percent', 'Host memory utilisation', 1),
+                ('erp_health_ram_used_bytes', 'ram_used_gb', 'Host memory in use', gb),
+                ('erp_health_ram_total_bytes', 'ram_total_gb', 'Host memory size', gb),
+                ('erp_health_disk_percent', 'disk_percent', 'Disk utilisation', 1),
+                ('erp_health_disk_used_bytes', 'disk_used_gb', 'Disk space in use', gb),
+                ('erp_health_disk_total_bytes', 'disk_total_gb', 'Disk size', gb),
+                ('erp_health_disk_read_bytes_per_second', 'disk_read_mb_s', 'Host disk read throughput', 1024 ** 2),
+                ('erp_health_disk_write_bytes_per_second', 'disk_write_mb_s', 'Host disk write throughput', 1024 ** 2),
+                ('erp_health_disk_read_iops', 'disk_read_iops', 'Host disk reads per second', 1),
+                ('erp_health_disk_write_iops', 'disk_write_iops', 'Host disk writes per second', 1),
+            ]:
+                families.append((name, 'gauge', help_text, [('', {}, (latest[column] or 0.0) * scale)]))
+            families.append(('erp_health_load_average', 'gauge', 'Host load average', [
+                ('', {'window': window}, latest[f'load_average_{window}'] or 0.0)
+                for window in ('1m', '5m', '15m')
+            ]))
+            families.append(('erp_health_last_sample_timestamp_seconds', 'gauge',
+                             'Unix time of the latest server metrics sample', [
+                                 ('', {}, latest['timestamp'].timestamp() if latest['timestamp'] else None)
+                             ]))
+
+        stats = self.env['erp.health.dashboard']._get_dashboard_stats(use_cache=False)
+        for name, key, help_text in [
+            ('erp_health_failed_crons_today', 'failed_crons', 'Cron runs that failed today'),
+            ('erp_health_slow_crons_today', 'slow_crons', 'Cron runs slower than the threshold today'),
+            ('erp_health_slow_queries_today', 'queries_today', 'Slow queries detected today'),
+            ('erp_health_slow_queries_stored', 'total_queries', 'Slow queries kept in the database'),
+            ('erp_health_database_locks_today', 'total_locks', 'Ungranted locks detected today'),
+            ('erp_health_error_logs_today', 'error_logs', 'ERROR and CRITICAL log lines today'),
+            ('erp_health_head_blocker_blocked_sessions', 'head_blocked_count',
+             'Sessions stuck behind the head-of-line lock blocker'),
+            ('erp_health_monitor_collector_runs', 'monitor_runs',
+             'Collector runs of the monitor in the last 24 hours'),
+            ('erp_health_monitor_collector_seconds', 'monitor_seconds',
+             'Wall time spent by the monitor collectors in the last 24 hours'),
+        ]:
+            families.append((name, 'gauge', help_text, [('', {}, stats.get(key) or 0)]))
+
+        # Counters kept by cron.stats, so cleaning the cron log never makes them go down
+        histogram = []
+        failures = []
+        for cron_stats in self.env['erp.health.cron.stats'].search([('total_runs', '>', 0)], order='cron_name'):
+            labels = {'cron': cron_stats.cron_name}
+            buckets = json.loads(cron_stats.duration_buckets)
+            histogram += openmetrics.histogram_samples(labels, CRON_DURATION_BUCKETS, buckets,
+                                                       cron_stats.total_duration, cron_stats.total_runs)
+            failures.append(('_total', labels, cron_stats.total_failed))
+        families.append(('erp_health_cron_duration_seconds', 'histogram',
+                         'Duration of the cron runs since the monitor was installed', histogram))
+        families.append(('erp_health_cron_failed_runs', 'counter',
+                         'Failed cron runs since the monitor was installed', failures))
+
+        storage = self.env['erp.health.storage'].search([('kind', '=', 'mount')], order='name')
+        families.append(('erp_health_filesystem_used_bytes', 'gauge',
+                         'Space used on the filesystems holding the filestore, the database and the logs', [
+                             ('', {'mountpoint': mount.name}, mount.size_gb * gb) for mount in storage
+                         ]))
+        families.append(('erp_health_filesystem_days_to_full', 'gauge',
+                         'Days until the filesystem fills up at its current growth rate', [
+                             ('', {'mountpoint': mount.name}, mount.days_to_full)
+                             for mount in storage if mount.full_date
+                         ]))
+        databases = self.env['erp.health.storage'].search([('kind', '=', 'database')])
+        families.append(('erp_health_database_size_bytes', 'gauge', 'Size of the database', [
+            ('', {'database': database.name}, database.size_gb * gb) for database in databases
+        ]))
+
+        attention = self.env['erp.health.table.stats'].search([('attention_score', '>', 0)], limit=20)
+        families.append(('erp_health_table_attention_score', 'gauge',
+                         'Attention score of the tables with dead rows, vacuum lag, sequential scans or cache misses', [
+                             ('', {'table': table.name}, table.attention_score) for table in attention
+                         ]))
+        families.append(('erp_health_unused_indexes', 'gauge', 'Indexes never scanned that enforce no constraint', [
+            ('', {}, self.env['erp.health.index.stats'].search_count([('is_unused', '=', True)]))
+        ]))
+
+        quantiles = []
+        for cron_stats in self.env['erp.health.cron.stats'].search([('run_count', '>', 0)], order='cron_name'):
+            for quantile, value in (('0.5', cron_stats.p50_duration), ('0.95', cron_stats.p95_duration),
+                                    ('0.99', cron_stats.p99_duration)):
+                quantiles.append(('', {'cron': cron_stats.cron_name, 'quantile': quantile}, value))
+        families.append(('erp_health_cron_duration_quantile_seconds', 'gauge',
+                         'Rolling duration percentiles per cron from the streaming sketches', quantiles))
+        return families
+
+    @api.model
+    def _refresh_exposition(self, force=False):
+        """Render the exposition to disk for the metrics endpoint; called by the collectors, throttled"""
+        token = self._get_token()
+        if not token:
+            # Exporter disabled
+            return False
+        dbname = self.env.cr.dbname
+        now = time.monotonic()
+        last = _LAST_RENDER.get(dbname)
+        path = exposition_path(dbname)
+        if not force and ((last is not None and now - last < RENDER_INTERVAL) or _rendered_recently(path)):
+            return False
+        _LAST_RENDER[dbname] = now
+
+        try:
+            # Never let a rendering error abort the collector's transaction
+            with self.env.cr.savepoint():
+                families = self._metric_families()
+            body = openmetrics.render(families)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Readers only ever see complete files
+            for target, content in ((path + '.auth', hashlib.sha256(token.encode()).hexdigest()), (path, body)):
+                tmp = f'{target}.{os.getpid()}.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(tmp, target)
+            return True
+        except Exception as e:
+            _logger.warning(f"Could not render the metrics exposition: {e}")
+            return False
@@ -0,0 +1,129 @@
+from odoo import models, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class ErpHealthIngestMixin(models.AbstractModel):
+    _name = 'erp.health.ingest.mixin'
+    _description = 'ERP Health Bulk Ingestion'
+
+    # Rows kept by _prune_rows() when no explicit limit is given
+    _ingest_keep_rows = 1000
+    # Max rows sent in a single INSERT statement
+    _ingest_batch_size = 1000
+
+    _LOG_COLUMNS = ('create_uid', 'create_date', 'write_uid', 'write_date')
+
+    @api.model
+    def _bulk_insert(self, vals_list):
+        """Insert rows with one multi-row INSERT per batch instead of one create() per row"""
+        if not vals_list:
+            return self.browse()
+
+        columns = sorted({key for vals in vals_list for key in vals})
+        missing = [
+            name for name, field in self._fields.items()
+            if field.store and field.default and not field.compute
+            and name not in columns and name != 'id' and name not in self._LOG_COLUMNS
+        ]
+        defaults = self.default_get(missing) if missing else {}
+        columns += sorted(defaults)
+
+        now = self.env.cr.now()
+        uid = self.env.uid
+        all_columns = columns + list(self._LOG_COLUMNS)
+        placeholders = '(%s)' % ', '.join(['%s'] * len(all_columns))
+        column_sql = ', '.join(f'"{name}"' for name in all_columns)
+
+        self.flush_model()
+        ids = []
+        for start in range(0, len(vals_list), self._ingest_batch_size):
+            batch = vals_list[start:start + self._ingest_batch_size]
+            params = []
+            for vals in batch:
+                params.extend(vals.get(name, defaults.get(name)) for name in columns)
+                params.extend((uid, now, uid, now))
+            self.env.cr.execute(
+                f'INSERT INTO "{self._table}" ({column_sql}) VALUES '
+                + ', '.join([placeholders] * len(batch))
+                + ' RETURNING id',
+                params,
+            )
+            ids.extend(row[0] for row in self.env.cr.fetchall())
+
+        return self._after_bulk_insert(ids)
+
+    @api.model
+    def _ingest_select(self, columns, select_query, params=()):
+        """Insert the rows of `select_query` (one column per name in `columns`) in a single INSERT ... SELECT"""
+        column_sql = ', '.join(f'"{name}"' for name in columns + list(self._LOG_COLUMNS))
+        self.flush_model()
+        self.env.cr.execute(f"""
+            INSERT INTO "{self._table}" ({column_sql})
+            SELECT src.*, %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC'
+            FROM ({select_query}) src
+            RETURNING id
+        """, tuple(params) + (self.env.uid, self.env.uid))
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        return self._after_bulk_insert(ids)
+
+    @api.model
+    def _bulk_update(self, rows, columns):
+        """Update `columns` of many rows with one UPDATE ... FROM (VALUES ...) per batch; rows are (id, vals)"""
+        if not rows:
+            return 0
+        fields_ = [self._fields[name] for name in columns]
+        casts = ', '.join(f'%s::{field.column_type[1]}' for field in fields_)
+        set_sql = ', '.join(f'"{name}" = v."{name}"' for name in columns)
+        column_sql = ', '.join(f'"{name}"' for name in columns)
+
+        self.flush_model()
+        for start in range(0, len(rows), self._ingest_batch_size):
+            batch = rows[start:start + self._ingest_batch_size]
+            params = [self.env.uid]
+            for rec_id, vals in batch:
+                params.append(rec_id)
+                params.extend(field.convert_to_column(vals.get(field.name), self) for field in fields_)
+            self.env.cr.execute(f"""
+                UPDATE "{self._table}" t
+                SET {set_sql}, write_uid = %s, write_date = now() AT TIME ZONE 'UTC'
+                FROM (VALUES {', '.join([f'(%s::int4, {casts})'] * len(batch))}) AS v(id, {column_sql})
+                WHERE t.id = v.id
+            """, params)
+        self.invalidate_model(columns)
+        return len(rows)
+
+    def _after_bulk_insert(self, ids):
+        """Schedule stored computed fields of rows inserted behind the ORM's back"""
+        records = self.browse(ids)
+        if records:
+            for field in self._fields.values():
+                if field.store and field.compute:
+                    self.env.add_to_compute(field, records)
+        return records
+
+    @api.model
+    def _notify_collected(self):
+        """Hook called by collectors once a run has written new data"""
+        self.env['erp.health.dashboard']._invalidate_stats_cache()
+        self.env['erp.health.dashboard']._publish_live_stats(self._name)
+        self.env['erp.health.exporter']._refresh_exposition()
+
+    @api.model
+    def _prune_rows(self, keep=None):
+        """Delete everything but the newest `keep` rows in a single statement"""
+        keep = self._ingest_keep_rows if keep is None else keep
+        self.flush_model()
+        self.env.cr.execute(f"""
+            DELETE FROM "{self._table}"
+            WHERE id <= (
+                SELECT id FROM "{self._table}"
+                ORDER BY id DESC
+                OFFSET %s LIMIT 1
+            )
+        """, (keep,))
+        pruned = self.env.cr.rowcount
+        if pruned:
+            self.invalidate_model()
+        return pruned
@@ -1,41 +1,152 @@
-from odoo import models, fields
+from odoo import models, fields, api, SUPERUSER_ID
+import os
+import threading
 import time
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Ids of the crons whose run this thread is already tracking: Odoo replaces the
+# context when Run Manually goes through _callback(), so a context key is lost
+_tracking = threading.local()
+
+
+def _tracked_cron_ids():
+    if not hasattr(_tracking, 'cron_ids'):
+        _tracking.cron_ids = set()
+    return _tracking.cron_ids
+
+
+def _rss_mb():
+    """Resident memory of this process, None where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024.0 ** 2
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class CronRunTracker:
+    """Cheap per-run probe: wall time, query count, rows touched and memory growth"""
+
+    # Rows inserted/updated/deleted by the current transaction, reset by every commit
+    ROWS_TOUCHED_QUERY = """
+        SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)
+        FROM pg_stat_xact_user_tables
+    """
+
+    def __init__(self, cr):
+        self.cr = cr
+        self.running = True
+        self.probes = 0
+        self.start = time.perf_counter()
+        self.start_queries = cr.sql_log_count
+        self.start_rss = _rss_mb()
+        # Not the rows the transaction wrote before the job started
+        self.rows_touched = -(self._xact_rows() or 0)
+        cr.precommit.add(self._before_commit)
+
+    def _xact_rows(self):
+        self.probes += 1
+        try:
+            self.cr.execute(self.ROWS_TOUCHED_QUERY)
+            return self.cr.fetchone()[0]
+        except Exception:
+            return None
+
+    def _before_commit(self):
+        # Jobs may commit on their own: add up every transaction before its counters reset
+        if self.running:
+            self.rows_touched += self._xact_rows() or 0
+            self.cr.postcommit.add(self._after_commit)
+
+    def _after_commit(self):
+        if self.running:
+            self.cr.precommit.add(self._before_commit)
+
+    def stop(self, failed=False):
+        """Return the measured values, ready to be written on a cron log"""
+        self.running = False
+        duration = time.perf_counter() - self.start
+        # A failed job's pending writes are rolled back
+        if not failed:
+            self.rows_touched += self._xact_rows() or 0
+        end_rss = _rss_mb()
+        memory_growth = 0.0
+        if self.start_rss is not None and end_rss is not None:
+            memory_growth = max(end_rss - self.start_rss, 0.0)
+        return {
+            'duration': duration,
+            'query_count': max(self.cr.sql_log_count - self.start_queries - self.probes, 0),
+            'rows_touched': max(self.rows_touched, 0),
+            'memory_growth_mb': memory_growth,
+        }
+
 
 class IrCronInherit(models.Model):
     _inherit = 'ir.cron'
 
+    def _callback(self, cron_name, server_action_id, *args, **kwargs):
+        """Override scheduled execution to track every run of the cron worker"""
+        cron_id = self.id if len(self) == 1 else (args[0] if args else self.env.context.get('cron_id'))
+        tracked = _tracked_cron_ids()
+        if cron_id in tracked:
+            # Run Manually, already tracked by method_direct_trigger()
+            return super()._callback(cron_name, server_action_id, *args, **kwargs)
+        tracked.add(cron_id)
+        tracker = CronRunTracker(self.env.cr)
+        error_msg = None
+        try:
+            return super()._callback(cron_name, server_action_id, *args, **kwargs)
+        except Exception as e:
+            error_msg = str(e)
+            raise
+        finally:
+            tracked.discard(cron_id)
+            self._log_cron_run(cron_id, cron_name, tracker.stop(failed=bool(error_msg)), error_msg)
+
     def method_direct_trigger(self):
         """Override direct trigger to track execution"""
-        start_time = time.time()
+        cron = self[:1]
+        tracked = _tracked_cron_ids()
+        tracked.add(cron.id)
+        tracker = CronRunTracker(self.env.cr)
         error_msg = None
-        status = 'success'
-        
+
         try:
-            # Call original method
-            result = super(IrCronInherit, self).method_direct_trigger()
-            return result
+            # Call original method, which may go through _callback()
+            return super().method_direct_trigger()
         except Exception as e:
-            status = 'failed'
             error_msg = str(e)
             raise
         finally:
-            duration = time.time() - start_time
-            
-            # Log execution
-            try:
-                self.env['erp.health.cron.log'].sudo().create({
-                    'cron_id': self.id,
-                    'cron_name': self.name,
-                    'execution_date': fields.Datetime.now(),
-                    'duration': duration,
-                    'status': status,
-                    'error_message': error_msg,
-                })
-                self.env.cr.commit()
-                _logger.info(f"✅ Cron log saved: {self.name}")
-            except Exception as log_error:
-                _logger.error(f"Failed to log cron execution: {log_error}")
+            tracked.discard(cron.id)
+            self._log_cron_run(cron.id, cron.name, tracker.stop(failed=bool(error_msg)), error_msg)
+
+    @api.model
+    def _log_cron_run(self, cron_id, cron_name, stats, error_msg=None):
+        """Write the cron log in its own cursor, leaving the job's transaction untouched
+
+        Runs after every cron of the database, so it stays a couple of inserts: the
+        dashboard picks cron runs up when its cache expires, the live dashboard and
+        the exporter on the next collector run.
+        """
+        try:
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                baseline_p95 = None
+                if cron_id:
+                    baseline_p95 = env['erp.health.cron.stats']._record_run(
+                        cron_id, cron_name, stats['duration'], failed=bool(error_msg))
+                env['erp.health.cron.log'].create(dict(
+                    stats,
+                    baseline_p95=baseline_p95 or 0.0,
+                    is_outlier=baseline_p95 is not None and stats['duration'] > baseline_p95,
+                    cron_id=cron_id or False,
+                    cron_name=cron_name,
+                    execution_date=fields.Datetime.now(),
+                    status='failed' if error_msg else 'success',
+                    error_message=error_msg,
+                ))
+        except Exception as log_error:
+            _logger.error(f"Failed to log cron execution: {log_error}")
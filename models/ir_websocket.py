@@ -0,0 +1,15 @@
+from odoo import models
+
+from .dashboard import LIVE_CHANNEL
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        """Only ERP Health managers may listen to the live dashboard channel"""
+        if LIVE_CHANNEL in channels and not self.env.user.has_group(
+            'odoo_erp_health_monitor.group_erp_health_manager'
+        ):
+            channels = [channel for channel in channels if channel != LIVE_CHANNEL]
+        return super()._build_bus_channel_list(channels)
@@ -0,0 +1,100 @@
+from odoo import models, fields, api
+import logging
+
+from ..tools import lock_graph
+
+_logger = logging.getLogger(__name__)
+
+
+class ErpHealthLockEdge(models.Model):
+    _name = 'erp.health.lock.edge'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'Lock Wait Graph Edge'
+    _order = 'snapshot_at desc, depth, blocker_pid'
+
+    # Edges of a few hundred snapshots taken during pile-ups
+    _ingest_keep_rows = 5000
+
+    snapshot_at = fields.Datetime(string='Snapshot', readonly=True, index=True)
+    is_current = fields.Boolean(string='Current', readonly=True,
+                                help='Edge belongs to the latest lock graph snapshot')
+    blocker_pid = fields.Integer(string='Blocker PID', readonly=True,
+                                 help='0 is a prepared transaction holding the lock')
+    waiter_pid = fields.Integer(string='Waiter PID', readonly=True)
+    root_pid = fields.Integer(string='Root Blocker PID', readonly=True, index=True,
+                              help='Head of the chain this waiter is stuck behind')
+    depth = fields.Integer(string='Depth', readonly=True, help='1 when the waiter is blocked by the root itself')
+    in_cycle = fields.Boolean(string='In Cycle', readonly=True)
+    waited_lock = fields.Char(string='Waiting For', readonly=True)
+    waiter_query = fields.Text(string='Waiter Query', readonly=True)
+    waiter_wait_time = fields.Float(string='Waiting (seconds)', readonly=True, aggregator='max')
+    blocker_state = fields.Char(string='Blocker State', readonly=True)
+    blocker_query = fields.Text(string='Blocker Query', readonly=True)
+    blocker_xact_age = fields.Float(string='Blocker Transaction Age (seconds)', readonly=True, aggregator='max')
+    blocker_user = fields.Char(string='Blocker User', readonly=True)
+    blocker_application = fields.Char(string='Blocker Application', readonly=True)
+
+    def init(self):
+        # The dashboard only ever reads the latest snapshot
+        self.env.cr.execute(f"""
+            CREATE INDEX IF NOT EXISTS erp_health_lock_edge_current_index
+            ON "{self._table}" (root_pid) WHERE is_current
+        """)
+
+    @api.model
+    def _collect_lock_graph(self):
+        """Snapshot blocker -> waiter edges from pg_blocking_pids() and resolve roots, depths and cycles"""
+        # pg_blocking_pids() is costly, only call it for sessions waiting on a heavyweight lock
+        self.env.cr.execute("""
+            WITH waiting AS (
+                SELECT pid, pg_blocking_pids(pid) AS blockers
+                FROM pg_stat_activity
+                WHERE wait_event_type = 'Lock'
+            )
+            SELECT
+                w.pid AS waiter_pid,
+                bp.pid AS blocker_pid,
+                (SELECT string_agg(DISTINCT l.mode || ' on ' || COALESCE(l.relation::regclass::text, l.locktype), ', ')
+                   FROM pg_locks l WHERE l.pid = w.pid AND NOT l.granted) AS waited_lock,
+                LEFT(a.query, 5000) AS waiter_query,
+                COALESCE(EXTRACT(EPOCH FROM (now() - a.state_change)), 0) AS waiter_wait_time,
+                COALESCE(b.state, 'prepared') AS blocker_state,
+                LEFT(b.query, 5000) AS blocker_query,
+                COALESCE(EXTRACT(EPOCH FROM (now() - b.xact_start)), 0) AS blocker_xact_age,
+                b.usename AS blocker_user,
+                b.application_name AS blocker_application
+            FROM waiting w
+            CROSS JOIN LATERAL unnest(w.blockers) AS bp(pid)
+            JOIN pg_stat_activity a ON a.pid = w.pid
+            LEFT JOIN pg_stat_activity b ON b.pid = bp.pid
+        """)
+        rows = self.env.cr.dictfetchall()
+        graph = lock_graph.analyze([(row['blocker_pid'], row['waiter_pid']) for row in rows])
+
+        # Retire the previous snapshot before storing the new one
+        self.flush_model()
+        self.env.cr.execute(f'UPDATE "{self._table}" SET is_current = FALSE WHERE is_current')
+
+        now = fields.Datetime.now()
+        vals_list = []
+        for row in rows:
+            node = graph['nodes'][row['waiter_pid']]
+            vals_list.append(dict(
+                row,
+                snapshot_at=now,
+                is_current=True,
+                root_pid=node['root'],
+                depth=node['depth'] or 1,
+                in_cycle=node['in_cycle'],
+            ))
+        records = self._bulk_insert(vals_list)
+        self.invalidate_model(['is_current'])
+
+        if graph['cycles']:
+            _logger.warning(f"Lock wait cycles detected: {graph['cycles']}")
+        return {
+            'edges': len(records),
+            'roots': len(graph['roots']),
+            'cycles': len(graph['cycles']),
+            'pruned': self._prune_rows(),
+        }
@@ -0,0 +1,25 @@
+from odoo import models, fields, api
+
+
+class ErpHealthLogCursor(models.Model):
+    _name = 'erp.health.log.cursor'
+    _description = 'Log File Read Position'
+    _rec_name = 'path'
+
+    path = fields.Char(string='Log File', required=True, readonly=True)
+    # Inode and offset can exceed a 32-bit integer on large log volumes
+    inode = fields.Char(string='Inode', readonly=True)
+    offset = fields.Float(string='Byte Offset', digits=(20, 0), readonly=True)
+    last_read = fields.Datetime(string='Last Read', readonly=True)
+
+    _sql_constraints = [
+        ('path_unique', 'UNIQUE(path)', 'A log file can only be tracked once.'),
+    ]
+
+    @api.model
+    def _get_for_path(self, path):
+        """Get or create the read position of a log file"""
+        cursor = self.search([('path', '=', path)], limit=1)
+        if not cursor:
+            cursor = self.create({'path': path})
+        return cursor
@@ -0,0 +1,109 @@
+from odoo import models, fields, api
+
+from ..tools import anomaly, health
+
+# metric -> (server metrics field, score field, smallest deviation worth a score of 1)
+BASELINE_METRICS = {
+    'cpu': ('cpu_percent', 'cpu_anomaly_score', 2.0),
+    'ram': ('ram_percent', 'ram_anomaly_score', 1.0),
+    'load': ('load_average_1m', 'load_anomaly_score', 0.2),
+}
+
+
+class ErpHealthMetricBaseline(models.Model):
+    _name = 'erp.health.metric.baseline'
+    _description = 'Metric Baseline per Hour of Day'
+    _order = 'metric, hour'
+
+    metric = fields.Selection([
+        ('cpu', 'CPU'),
+        ('ram', 'RAM'),
+        ('load', 'Load Average (1m)'),
+    ], string='Metric', required=True, readonly=True)
+    hour = fields.Integer(string='Hour (UTC)', required=True, readonly=True)
+    sample_count = fields.Integer(string='Samples', readonly=True)
+    mean = fields.Float(string='Typical Value', readonly=True, help='Exponentially weighted mean')
+    mad = fields.Float(string='Typical Deviation', readonly=True, help='Exponentially weighted mean absolute deviation')
+    is_warm = fields.Boolean(string='Warm', compute='_compute_is_warm',
+                             help='Enough samples for the baseline to be used')
+    last_value = fields.Float(string='Last Value', readonly=True)
+    last_score = fields.Float(string='Last Score', readonly=True)
+    last_update = fields.Datetime(string='Last Update', readonly=True)
+
+    _sql_constraints = [
+        ('metric_hour_unique', 'UNIQUE(metric, hour)', 'There is one baseline per metric and hour of day.'),
+    ]
+
+    @api.depends('sample_count')
+    def _compute_is_warm(self):
+        for baseline in self:
+            baseline.is_warm = anomaly.is_warm((baseline.sample_count, baseline.mean, baseline.mad))
+
+    @api.model
+    def _sample_scores(self, sample):
+        """{metric: score} of a server metrics sample, None where the baseline was still warming up"""
+        score_fields = [score_field for _field, score_field, _scale in BASELINE_METRICS.values()]
+        sample.flush_recordset(score_fields)
+        self.env.cr.execute(
+            f'SELECT {", ".join(score_fields)} FROM "{sample._table}" WHERE id = %s', [sample.id]
+        )
+        return dict(zip(BASELINE_METRICS, self.env.cr.fetchone()))
+
+    @api.model
+    def _write_scores(self, samples, rows):
+        """Store (id, *scores, is_anomaly) rows in SQL: the ORM would turn a missing score into 0.0"""
+        if not rows:
+            return
+        score_fields = [score_field for _field, score_field, _scale in BASELINE_METRICS.values()]
+        samples.flush_model()
+        casts = ', '.join(['%s::numeric'] * len(score_fields))
+        self.env.cr.execute(f"""
+            UPDATE "{samples._table}" m
+            SET {', '.join(f'{name} = v.{name}' for name in score_fields)}, is_anomaly = v.is_anomaly
+            FROM (VALUES {', '.join([f'(%s, {casts}, %s)'] * len(rows))})
+                AS v(id, {', '.join(score_fields)}, is_anomaly)
+            WHERE m.id = v.id
+        """, [value for row in rows for value in row])
+        samples.invalidate_model(score_fields + ['is_anomaly'])
+
+    @api.model
+    def _observe(self, samples):
+        """Score server metrics samples against their hour's baselines, then fold them in
+
+        Samples must come in time order. Scores stay NULL while a baseline warms up,
+        so that readers fall back to the fixed thresholds.
+        """
+        hours = list(set(samples.mapped('hour')))
+        baselines = {(b.metric, b.hour): b for b in self.search([('hour', 'in', hours)])}
+        states = {key: (b.sample_count, b.mean, b.mad) for key, b in baselines.items()}
+        last = {}
+        rows = []
+        for sample in samples:
+            scores = []
+            for metric, (field_name, _score_field, min_scale) in BASELINE_METRICS.items():
+                key = (metric, sample.hour)
+                value = sample[field_name] or 0.0
+                state = states.get(key, anomaly.EMPTY)
+                score = anomaly.score(state, value, min_scale)
+                scores.append(score)
+                states[key] = anomaly.update(state, value, min_scale=min_scale)
+                last[key] = (value, score or 0.0, sample.timestamp)
+            is_anomaly = any(
+                score is not None and health.classify('anomaly', score) != 'good' for score in scores
+            )
+            rows.append((sample.id, *scores, is_anomaly))
+        self._write_scores(samples, rows)
+
+        new_vals = []
+        for key, (count, mean, mad) in states.items():
+            value, score, at = last.get(key, (None, None, None))
+            if value is None:
+                continue
+            vals = {'sample_count': count, 'mean': mean, 'mad': mad,
+                    'last_value': value, 'last_score': score, 'last_update': at}
+            if key in baselines:
+                baselines[key].write(vals)
+            else:
+                new_vals.append(dict(vals, metric=key[0], hour=key[1]))
+        if new_vals:
+            self.create(new_vals)
@@ -0,0 +1,189 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Rollup prefix -> column of erp.health.server.metrics
+ROLLUP_METRICS = {
+    'cpu': 'cpu_percent',
+    'ram': 'ram_percent',
+    'disk': 'disk_percent',
+    'load': 'load_average_1m',
+}
+
+# Tier -> (tier it is computed from, how long it is kept at that resolution); 'minute' is
+# computed from raw samples. The day tier is only pruned by the configured trends retention.
+ROLLUP_TIERS = {
+    'minute': (None, timedelta(days=2)),
+    'hour': ('minute', timedelta(days=90)),
+    'day': ('hour', None),
+}
+
+# Trend period -> (tier, time range, graph granularity)
+TREND_PERIODS = {
+    'day': ('minute', timedelta(days=1), 'hour'),
+    'month': ('hour', timedelta(days=30), 'hour'),
+    'year': ('day', timedelta(days=365), 'day'),
+}
+
+
+class ErpHealthMetricsRollup(models.Model):
+    _name = 'erp.health.metrics.rollup'
+    _description = 'Server Metrics Rollup'
+    _order = 'bucket_start desc'
+    _rec_name = 'bucket_start'
+
+    resolution = fields.Selection([
+        ('minute', '1 Minute'),
+        ('hour', '1 Hour'),
+        ('day', '1 Day'),
+    ], string='Resolution', required=True, readonly=True, index=True)
+    bucket_start = fields.Datetime(string='Period Start', required=True, readonly=True, index=True)
+    sample_count = fields.Integer(string='Samples', readonly=True, aggregator='sum')
+
+    cpu_min = fields.Float(string='CPU Min (%)', readonly=True, aggregator='min')
+    cpu_avg = fields.Float(string='CPU Avg (%)', readonly=True, aggregator='avg')
+    cpu_max = fields.Float(string='CPU Max (%)', readonly=True, aggregator='max')
+    cpu_p95 = fields.Float(string='CPU P95 (%)', readonly=True, aggregator='max')
+    ram_min = fields.Float(string='RAM Min (%)', readonly=True, aggregator='min')
+    ram_avg = fields.Float(string='RAM Avg (%)', readonly=True, aggregator='avg')
+    ram_max = fields.Float(string='RAM Max (%)', readonly=True, aggregator='max')
+    ram_p95 = fields.Float(string='RAM P95 (%)', readonly=True, aggregator='max')
+    disk_min = fields.Float(string='Disk Min (%)', readonly=True, aggregator='min')
+    disk_avg = fields.Float(string='Disk Avg (%)', readonly=True, aggregator='avg')
+    disk_max = fields.Float(string='Disk Max (%)', readonly=True, aggregator='max')
+    disk_p95 = fields.Float(string='Disk P95 (%)', readonly=True, aggregator='max')
+    load_min = fields.Float(string='Load Min (1m)', readonly=True, aggregator='min')
+    load_avg = fields.Float(string='Load Avg (1m)', readonly=True, aggregator='avg')
+    load_max = fields.Float(string='Load Max (1m)', readonly=True, aggregator='max')
+    load_p95 = fields.Float(string='Load P95 (1m)', readonly=True, aggregator='max')
+
+    _sql_constraints = [
+        ('bucket_unique', 'UNIQUE(resolution, bucket_start)', 'Only one rollup per resolution and period.'),
+    ]
+
+    @api.model
+    def _rollup_metrics(self, since=None):
+        """Refresh the minute, hour and day tiers from the newest data and downsample old buckets
+
+        `since` is the oldest of samples stored late, e.g. an agent backlog: their buckets are
+        recomputed even when older than the last bucket of a tier.
+        """
+        self.env['erp.health.server.metrics'].flush_model()
+        self.flush_model()
+        for resolution, (source, _retention) in ROLLUP_TIERS.items():
+            self._rollup_tier(resolution, source, since)
+        # Only once every tier is computed: a late minute bucket still counts in its hour and day
+        for resolution, (_source, retention) in ROLLUP_TIERS.items():
+            if retention is None:
+                continue
+            self.env.cr.execute(f"""
+                DELETE FROM "{self._table}"
+                WHERE resolution = %s AND bucket_start < (now() AT TIME ZONE 'UTC') - %s
+            """, (resolution, retention))
+        self.invalidate_model()
+
+    def _rollup_tier(self, resolution, source, late_since=None):
+        """Upsert the buckets of one tier, recomputing from its last bucket (or `late_since`) onwards"""
+        self.env.cr.execute(
+            f'SELECT MAX(bucket_start) FROM "{self._table}" WHERE resolution = %s', (resolution,)
+        )
+        since = self.env.cr.fetchone()[0]
+        if since and late_since:
+            since = min(since, self._bucket_start(resolution, late_since))
+
+        columns = []
+        aggregates = []
+        for prefix, column in ROLLUP_METRICS.items():
+            columns += [f'{prefix}_min', f'{prefix}_avg', f'{prefix}_max', f'{prefix}_p95']
+            if source is None:
+                aggregates += [
+                    f'MIN({column})',
+                    f'AVG({column})',
+                    f'MAX({column})',
+                    f'PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY {column})',
+                ]
+            else:
+                # p95 of a coarser tier is approximated from the p95 of its finer buckets
+                aggregates += [
+                    f'MIN({prefix}_min)',
+                    f'SUM({prefix}_avg * sample_count) / NULLIF(SUM(sample_count), 0)',
+                    f'MAX({prefix}_max)',
+                    f'PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY {prefix}_p95)',
+                ]
+
+        if source is None:
+            source_sql = 'FROM erp_health_server_metrics WHERE timestamp >= %s'
+            bucket_sql = "DATE_TRUNC('minute', timestamp)"
+            count_sql = 'COUNT(*)'
+            params = [since or '-infinity']
+        else:
+            source_sql = f'FROM "{self._table}" WHERE resolution = %s AND bucket_start >= %s'
+            bucket_sql = f"DATE_TRUNC('{resolution}', bucket_start)"
+            count_sql = 'SUM(sample_count)'
+            params = [source, since or '-infinity']
+
+        self.env.cr.execute(f"""
+            INSERT INTO "{self._table}" (
+                resolution, bucket_start, sample_count, {', '.join(columns)},
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT %s, {bucket_sql}, {count_sql}, {', '.join(aggregates)},
+                   %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC'
+            {source_sql}
+            GROUP BY 2
+            ON CONFLICT (resolution, bucket_start) DO UPDATE SET
+                sample_count = EXCLUDED.sample_count,
+                {', '.join(f'{name} = EXCLUDED.{name}' for name in columns)},
+                write_date = EXCLUDED.write_date
+        """, [resolution, self.env.uid, self.env.uid] + params)
+
+    @api.model
+    def _bucket_start(self, resolution, moment):
+        """Start of the bucket of the given tier holding `moment`"""
+        moment = moment.replace(second=0, microsecond=0)
+        if resolution in ('hour', 'day'):
+            moment = moment.replace(minute=0)
+        if resolution == 'day':
+            moment = moment.replace(hour=0)
+        return moment
+
+    @api.model
+    def _get_resolution_for_range(self, date_from, date_to):
+        """Pick the coarsest tier that still gives a readable series for the range"""
+        span = date_to - date_from
+        if span <= timedelta(days=2):
+            return 'minute'
+        if span <= timedelta(days=90):
+            return 'hour'
+        return 'day'
+
+    @api.model
+    def read_series(self, date_from, date_to, metrics=('cpu', 'ram', 'disk')):
+        """Return rollup points for the range, read from the matching tier"""
+        resolution = self._get_resolution_for_range(date_from, date_to)
+        field_names = ['bucket_start', 'sample_count']
+        for prefix in metrics:
+            field_names += [f'{prefix}_min', f'{prefix}_avg', f'{prefix}_max', f'{prefix}_p95']
+        return self.search_read([
+            ('resolution', '=', resolution),
+            ('bucket_start', '>=', date_from),
+            ('bucket_start', '<=', date_to),
+        ], field_names, order='bucket_start asc')
+
+    @api.model
+    def action_view_trends(self, period='day'):
+        """Open the rollup graph for the last day, month or year on the matching tier"""
+        resolution, span, granularity = TREND_PERIODS.get(period, TREND_PERIODS['day'])
+        date_from = fields.Datetime.now() - span
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Server Metric Trends',
+            'res_model': self._name,
+            'view_mode': 'graph,list',
+            'views': [(self.env.ref('odoo_erp_health_monitor.view_metrics_rollup_graph').id, 'graph'), (False, 'list')],
+            'domain': [('resolution', '=', resolution), ('bucket_start', '>=', date_from)],
+            'context': {'graph_groupbys': [f'bucket_start:{granularity}']},
+            'target': 'current',
+        }
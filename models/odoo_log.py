@@ -1,54 +1,77 @@
 import os
 from odoo import models, fields, api
-from datetime import datetime
+import logging
+
+from ..tools import log_tailer
+from ..tools.log_parser import LogParser
+
+_logger = logging.getLogger(__name__)
 
 
 class ErpHealthOdooLog(models.Model):
     _name = 'erp.health.odoo.log'
+    # Partitioning first so its _prune_rows() takes precedence
+    _inherit = ['erp.health.partitioned.mixin', 'erp.health.ingest.mixin']
     _description = 'Odoo Server Logs'
     _order = 'timestamp desc'
+    _partition_column = 'timestamp'
 
-    timestamp = fields.Datetime(string='Timestamp', readonly=True)
+    timestamp = fields.Datetime(string='Timestamp', readonly=True, index=True)
     level = fields.Selection([
         ('DEBUG', 'Debug'),
         ('INFO', 'Info'),
         ('WARNING', 'Warning'),
         ('ERROR', 'Error'),
         ('CRITICAL', 'Critical'),
-    ], string='Level', readonly=True)
+    ], string='Level', readonly=True, index=True)
     logger = fields.Char(string='Logger', readonly=True)
+    pid = fields.Integer(string='Process ID', readonly=True)
+    database = fields.Char(string='Database', readonly=True)
     message = fields.Text(string='Message', readonly=True)
 
     @api.model
     def refresh_logs(self, lines=500):
-        """Read last N lines from Odoo log file"""
-        try:
-            # Find Odoo log file
-            log_file = self._get_log_file_path()
+        """Append the log lines written since the last run (last N lines on first run)"""
+        with self.env['erp.health.collector.run']._track('refresh_logs') as run:
+            try:
+                # Find Odoo log file
+                log_file = self._get_log_file_path()
             
-            if not log_file or not os.path.exists(log_file):
-                _logger.warning(f"Log file not found: {log_file}")
-                return False
+                if not log_file or not os.path.exists(log_file):
+                    _logger.warning(f"Log file not found: {log_file}")
+                    return False
 
-            # Read last N lines
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                all_lines = f.readlines()
-                last_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
+                # Read only the bytes appended since the stored position
+                cursor = self.env['erp.health.log.cursor'].sudo()._get_for_path(log_file)
+                new_lines, inode, offset = log_tailer.read_new_lines(
+                    log_file,
+                    inode=cursor.inode or None,
+                    offset=cursor.offset if cursor.inode else None,
+                    initial_lines=lines,
+                )
 
-            # Clear old logs
-            self.search([]).unlink()
+                # Parse and store logs, tracebacks folded into their record
+                vals_list, orphans = LogParser().parse_lines(new_lines)
+                if orphans:
+                    self._append_to_last_record(orphans)
+                records = self._bulk_insert(vals_list)
+                run['rows_written'] = len(records) + bool(orphans)
 
-            # Parse and store logs
-            for line in last_lines:
-                log_data = self._parse_log_line(line)
-                if log_data:
-                    self.create(log_data)
+                cursor.write({
+                    'inode': inode,
+                    'offset': offset,
+                    'last_read': fields.Datetime.now(),
+                })
+                if records:
+                    self._notify_collected()
 
-            return True
+                _logger.info(f"Read {len(new_lines)} new log lines from {log_file}, stored {len(records)}")
+                return {'ingested': len(records), 'pruned': 0}
 
-        except Exception as e:
-            _logger.error(f"Error reading logs: {e}")
-            return False
+            except Exception as e:
+                run['error'] = str(e)
+                _logger.error(f"Error reading logs: {e}")
+                return False
 
     def _get_log_file_path(self):
         """Get Odoo log file path"""
@@ -67,25 +90,12 @@ class ErpHealthOdooLog(models.Model):
         
         return None
 
-    def _parse_log_line(self, line):
-        """Parse Odoo log line format"""
-        try:
-            # Odoo log format: 2026-01-18 21:05:42,573 8816 INFO production odoo.addons...
-            parts = line.split(' ', 6)
-            if len(parts) < 6:
-                return None
-
-            date_str = f"{parts[0]} {parts[1].split(',')[0]}"
-            timestamp = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-            level = parts[3]
-            logger = parts[5] if len(parts) > 5 else 'odoo'
-            message = parts[6] if len(parts) > 6 else line
-
-            return {
-                'timestamp': timestamp,
-                'level': level if level in ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'] else 'INFO',
-                'logger': logger.strip(),
-                'message': message.strip(),
-            }
-        except Exception:
-            return None
\ No newline at end of file
+    def _append_to_last_record(self, lines):
+        """Attach continuation lines read after their header to the last stored record"""
+        self.flush_model(['message'])
+        self.env.cr.execute(f"""
+            UPDATE "{self._table}"
+            SET message = CONCAT_WS(E'\\n', message, %s)
+            WHERE id = (SELECT MAX(id) FROM "{self._table}")
+        """, ('\n'.join(lines),))
+        self.invalidate_model(['message'])
@@ -0,0 +1,223 @@
+from odoo import models, api, fields, tools
+from odoo.exceptions import UserError
+from odoo.tools import sql
+from datetime import datetime, time, timedelta
+import logging
+import re
+
+_logger = logging.getLogger(__name__)
+
+PARTITION_PERIODS = {
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+
+_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+_LOWER_BOUND_RE = re.compile(r"FROM \('([^']+)'\)")
+
+
+def partition_bounds(cr, table):
+    """Return [(partition, lower, upper)] for the range partitions of `table`, oldest first
+
+    The default partition and plain tables yield nothing.
+    """
+    cr.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+    """, (table,))
+    bounds = []
+    for partition, bound in cr.fetchall():
+        lower = _LOWER_BOUND_RE.search(bound or '')
+        upper = _UPPER_BOUND_RE.search(bound or '')
+        if lower and upper:
+            bounds.append((
+                partition,
+                fields.Datetime.to_datetime(lower.group(1)[:19]),
+                fields.Datetime.to_datetime(upper.group(1)[:19]),
+            ))
+    return sorted(bounds, key=lambda bound: bound[1])
+
+
+class ErpHealthPartitionedMixin(models.AbstractModel):
+    _name = 'erp.health.partitioned.mixin'
+    _description = 'ERP Health Time-Partitioned Storage'
+
+    # Time column the table is range partitioned on, when partitioning is enabled
+    _partition_column = None
+    # Partitions created ahead of the current one
+    _partitions_ahead = 3
+
+    def _is_partitioned(self):
+        self.env.cr.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (self._table,))
+        row = self.env.cr.fetchone()
+        return bool(row) and row[0] == 'p'
+
+    def _auto_init(self):
+        if self._partition_column and self._is_partitioned():
+            # Odoo does not manage partitioned tables, keep columns, indexes and constraints in sync ourselves
+            self._sync_partitioned_schema()
+            return
+        return super()._auto_init()
+
+    def _sync_partitioned_schema(self):
+        """Columns, indexes and foreign keys of fields added since the table was partitioned"""
+        cr = self.env.cr
+        columns = sql.table_columns(cr, self._table)
+        for name, field in self._fields.items():
+            if not field.store or not field.column_type:
+                continue
+            if name not in columns:
+                sql.create_column(cr, self._table, name, field.column_type[1], field.string)
+                _logger.info(f"Added column {name} to partitioned table {self._table}")
+
+            # Created on the parent, indexes cascade to every partition
+            index_name = sql.make_index_name(self._table, name)
+            if field.index and field.index != 'trigram' and not sql.index_exists(cr, index_name):
+                where = f'"{name}" IS NOT NULL' if field.index == 'btree_not_null' else ''
+                sql.create_index(cr, index_name, self._table, [f'"{name}"'], where=where)
+
+            if field.type == 'many2one' and field.ondelete:
+                comodel = self.env[field.comodel_name]
+                if not comodel._abstract and not comodel._transient \
+                        and not sql.get_foreign_keys(cr, self._table, name, comodel._table, 'id', field.ondelete):
+                    sql.add_foreign_key(cr, self._table, name, comodel._table, 'id', field.ondelete)
+        # Logged and skipped by Odoo when a unique constraint lacks the partition key
+        self._add_sql_constraints()
+
+    @api.model
+    def _prune_rows(self, keep=None):
+        # Partitioned tables are kept in check by dropping whole partitions at cleanup
+        if self._partition_column and self._is_partitioned():
+            return 0
+        return super()._prune_rows(keep)
+
+    @api.model
+    def _period_start(self, period, moment):
+        """Start of the day or ISO week containing `moment`"""
+        day = moment.date()
+        if period == 'week':
+            day -= timedelta(days=day.weekday())
+        return datetime.combine(day, time.min)
+
+    @api.model
+    def _create_partition(self, lower, upper):
+        """Create the partition for [lower, upper), moving matching rows out of the default partition"""
+        cr = self.env.cr
+        table = self._table
+        column = self._partition_column
+        name = f'{table}_p{lower:%Y%m%d}'
+        default = f'{table}_pdefault'
+
+        cr.execute("SELECT to_regclass(%s) IS NOT NULL", (default,))
+        has_default = cr.fetchone()[0]
+        moved = False
+        if has_default:
+            # Attaching a range fails while the default partition still holds rows of it
+            cr.execute(f"""
+                CREATE TEMP TABLE erp_health_partition_move ON COMMIT DROP AS
+                SELECT * FROM "{default}" WHERE "{column}" >= %s AND "{column}" < %s
+            """, (lower, upper))
+            moved = cr.rowcount
+            if moved:
+                cr.execute(f'DELETE FROM "{default}" WHERE "{column}" >= %s AND "{column}" < %s', (lower, upper))
+        cr.execute(f"""
+            CREATE TABLE "{name}" PARTITION OF "{table}"
+            FOR VALUES FROM (%s) TO (%s)
+        """, (lower, upper))
+        if has_default:
+            if moved:
+                cr.execute(f'INSERT INTO "{table}" SELECT * FROM erp_health_partition_move')
+            cr.execute('DROP TABLE erp_health_partition_move')
+        return name
+
+    @api.model
+    def _create_partitions(self, period, since=None):
+        """Make sure partitions exist from the last one (or `since`) up to a few periods ahead"""
+        cr = self.env.cr
+        step = PARTITION_PERIODS[period]
+        bounds = partition_bounds(cr, self._table)
+        now = fields.Datetime.now()
+        start = bounds[-1][2] if bounds else self._period_start(period, since or now)
+        horizon = now + step * self._partitions_ahead
+
+        created = []
+        while start <= horizon:
+            # Aligned on period boundaries, even right after switching from day to week
+            end = self._period_start(period, start) + step
+            created.append(self._create_partition(start, end))
+            start = end
+        # Catches rows outside every partition so collectors never fail on insert
+        cr.execute(f'CREATE TABLE IF NOT EXISTS "{self._table}_pdefault" PARTITION OF "{self._table}" DEFAULT')
+        return created
+
+    @api.model
+    def _convert_to_partitioned(self, period):
+        """Rebuild the table as a range partitioned table on `_partition_column`, keeping its rows"""
+        cr = self.env.cr
+        table = self._table
+        column = self._partition_column
+        legacy = f'{table}_unpartitioned'
+
+        self.flush_model()
+        cr.execute(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE')
+        # The partition key is part of the primary key, so it cannot be NULL
+        cr.execute(f"""
+            UPDATE "{table}" SET "{column}" = COALESCE(create_date, now() AT TIME ZONE 'UTC')
+            WHERE "{column}" IS NULL
+        """)
+
+        # A partitioned table cannot have a unique id alone, so nothing may reference it: dropping
+        # the foreign keys would lose their cascades, and Odoo would fail to re-add them on update
+        cr.execute("""
+            SELECT conrelid::regclass::text, conname FROM pg_constraint
+            WHERE contype = 'f' AND confrelid = %s::regclass
+        """, (table,))
+        references = [f'{referencing}.{constraint}' for referencing, constraint in cr.fetchall()]
+        if references:
+            raise UserError(f"Cannot partition {table}, foreign keys reference it: {', '.join(references)}")
+
+        cr.execute("""
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE contype = 'f' AND conrelid = %s::regclass
+        """, (table,))
+        foreign_keys = cr.fetchall()
+        cr.execute("""
+            SELECT pg_get_indexdef(indexrelid) FROM pg_index
+            WHERE indrelid = %s::regclass AND NOT indisprimary AND NOT indisunique
+        """, (table,))
+        indexes = [row[0] for row in cr.fetchall()]
+        cr.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table,))
+        sequence = cr.fetchone()[0]
+
+        # Keep the id sequence alive when the old table is dropped
+        cr.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+        cr.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        cr.execute(f"""
+            CREATE TABLE "{table}" (
+                LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS
+            ) PARTITION BY RANGE ("{column}")
+        """)
+        cr.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" SET NOT NULL, ADD PRIMARY KEY (id, "{column}")')
+        cr.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id')
+
+        cr.execute(f'SELECT MIN("{column}") FROM "{legacy}"')
+        oldest = cr.fetchone()[0]
+        self._create_partitions(period, since=oldest)
+        cr.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+        copied = cr.rowcount
+        cr.execute(f'DROP TABLE "{legacy}"')
+
+        # Indexes and foreign keys go on the parent and cascade to every partition
+        for definition in indexes:
+            cr.execute(definition.replace(legacy, table))
+        for constraint, definition in foreign_keys:
+            cr.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{constraint}" {definition}')
+        tools.create_index(cr, f'{table}__{column}_index', table, [f'"{column}"'])
+        # Tiny, and lets range scans skip blocks inside the partitions as they grow
+        tools.create_index(cr, f'{table}__{column}_brin', table, [f'"{column}"'], method='brin')
+
+        self.invalidate_model()
+        _logger.info(f"Partitioned {table} by {period} on {column}, {copied} rows copied")
+        return copied
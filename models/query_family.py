@@ -0,0 +1,110 @@
+from odoo import models, fields, api
+
+
+class ErpHealthQueryFamily(models.Model):
+    _name = 'erp.health.query.family'
+    _description = 'Slow Query Family'
+    _order = 'total_duration desc, id desc'
+    _rec_name = 'fingerprint'
+
+    fingerprint = fields.Char(string='Fingerprint', required=True, readonly=True, index=True)
+    normalized_query = fields.Text(string='Query Shape', readonly=True)
+    sample_query = fields.Text(string='Slowest Sample', readonly=True)
+    sighting_count = fields.Integer(string='Sightings', readonly=True)
+    total_duration = fields.Float(string='Total Duration (s)', readonly=True)
+    mean_duration = fields.Float(string='Mean Duration (s)', readonly=True, aggregator='avg')
+    max_duration = fields.Float(string='Max Duration (s)', readonly=True, aggregator='max')
+    distinct_pids = fields.Integer(string='Distinct PIDs', readonly=True,
+                                   help='Backends that ran this query shape since it was first seen')
+    first_seen = fields.Datetime(string='First Seen', readonly=True)
+    last_seen = fields.Datetime(string='Last Seen', readonly=True, index=True)
+    slow_query_ids = fields.One2many('erp.health.slow.query', 'family_id', string='Sightings')
+    plan_ids = fields.One2many('erp.health.query.plan', 'family_id', string='Plans')
+
+    _sql_constraints = [
+        ('fingerprint_unique', 'UNIQUE(fingerprint)', 'Query fingerprints must be unique.'),
+    ]
+
+    @api.model
+    def _upsert_families(self, families):
+        """Fold aggregated sightings into their families with one statement; returns {fingerprint: id}
+
+        `families` maps a fingerprint to a dict with the normalised query, the
+        slowest sample, the number of new sightings, the added duration and the
+        max duration seen in this run.
+        """
+        if not families:
+            return {}
+        self.flush_model()
+        rows = []
+        params = []
+        for fp, family in families.items():
+            rows.append("(%s, %s, %s, %s, %s, %s, %s, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC', "
+                        "%s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC')")
+            params += [
+                fp, family['normalized'], family['sample'], family['count'],
+                family['duration'], family['duration'] / family['count'] if family['count'] else 0.0,
+                family['max'], self.env.uid, self.env.uid,
+            ]
+        self.env.cr.execute(f"""
+            INSERT INTO "{self._table}" AS f (
+                fingerprint, normalized_query, sample_query, sighting_count,
+                total_duration, mean_duration, max_duration, first_seen, last_seen,
+                create_uid, create_date, write_uid, write_date
+            )
+            VALUES {', '.join(rows)}
+            ON CONFLICT (fingerprint) DO UPDATE SET
+                sighting_count = f.sighting_count + EXCLUDED.sighting_count,
+                total_duration = f.total_duration + EXCLUDED.total_duration,
+                mean_duration = (f.total_duration + EXCLUDED.total_duration)
+                                / GREATEST(f.sighting_count + EXCLUDED.sighting_count, 1),
+                max_duration = GREATEST(f.max_duration, EXCLUDED.max_duration),
+                sample_query = CASE WHEN EXCLUDED.max_duration > f.max_duration
+                                    THEN EXCLUDED.sample_query ELSE f.sample_query END,
+                last_seen = EXCLUDED.last_seen,
+                write_date = EXCLUDED.write_date
+            RETURNING id, fingerprint
+        """, params)
+        result = {fp: family_id for family_id, fp in self.env.cr.fetchall()}
+        self.invalidate_model()
+        return result
+
+    @api.model
+    def _record_pids(self, pairs):
+        """Remember the (family id, pid) pairs sighted and recount the families' distinct backends"""
+        pairs = {(family_id, pid) for family_id, pid in pairs if family_id and pid}
+        if not pairs:
+            return
+        Pid = self.env['erp.health.query.family.pid']
+        self.env.cr.execute(f"""
+            INSERT INTO "{Pid._table}" (family_id, pid)
+            VALUES {', '.join(['(%s, %s)'] * len(pairs))}
+            ON CONFLICT (family_id, pid) DO NOTHING
+        """, [value for pair in pairs for value in pair])
+        # Pairs outlive the pruned sightings, so the count is over the family's whole history
+        self.env.cr.execute(f"""
+            UPDATE "{self._table}" f
+            SET distinct_pids = sub.pids
+            FROM (
+                SELECT family_id, COUNT(*) AS pids
+                FROM "{Pid._table}"
+                WHERE family_id IN %s
+                GROUP BY family_id
+            ) sub
+            WHERE f.id = sub.family_id
+        """, (tuple({family_id for family_id, pid in pairs}),))
+        self.invalidate_model(['distinct_pids'])
+
+
+class ErpHealthQueryFamilyPid(models.Model):
+    _name = 'erp.health.query.family.pid'
+    _description = 'Slow Query Family Backend'
+    _log_access = False
+
+    family_id = fields.Many2one('erp.health.query.family', string='Family', required=True, readonly=True,
+                                ondelete='cascade')
+    pid = fields.Integer(string='PID', required=True, readonly=True)
+
+    _sql_constraints = [
+        ('family_pid_unique', 'UNIQUE(family_id, pid)', 'A backend is recorded once per query family.'),
+    ]
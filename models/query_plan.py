@@ -0,0 +1,189 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import base64
+import json
+import zlib
+import logging
+
+from ..tools import plan_analysis
+
+_logger = logging.getLogger(__name__)
+
+# Captures per collector run, on top of the hourly limit of the configuration
+MAX_CAPTURES_PER_RUN = 2
+# A family is planned again when it runs this many times slower than when it was last planned
+REGRESSION_FACTOR = 2.0
+# ... but not more often than this
+MIN_RECAPTURE_INTERVAL = timedelta(hours=1)
+
+
+class ErpHealthQueryPlan(models.Model):
+    _name = 'erp.health.query.plan'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'Slow Query Plan'
+    _order = 'captured_at desc, id desc'
+    _rec_name = 'family_id'
+
+    family_id = fields.Many2one('erp.health.query.family', string='Query Family', required=True, readonly=True,
+                                ondelete='cascade', index=True)
+    captured_at = fields.Datetime(string='Captured At', readonly=True, index=True)
+    reason = fields.Selection([
+        ('new', 'New Query Shape'),
+        ('regressed', 'Regressed'),
+    ], string='Reason', readonly=True)
+    query_text = fields.Text(string='Query', readonly=True)
+    query_duration = fields.Float(string='Sighting Duration (s)', readonly=True,
+                                  help='How long the query had been running when it was planned')
+    status = fields.Selection([
+        ('captured', 'Captured'),
+        ('failed', 'Failed'),
+    ], string='Status', readonly=True, index=True)
+    error_message = fields.Text(string='Error Message', readonly=True)
+    analyzed = fields.Boolean(string='Executed (ANALYZE)', readonly=True,
+                              help='The plan carries actual row counts and spills, not only estimates')
+    plan_data = fields.Binary(string='Plan (compressed)', attachment=False, readonly=True)
+    plan_bytes = fields.Integer(string='Plan Size (bytes)', readonly=True)
+    plan_json = fields.Text(string='Plan', compute='_compute_plan_json')
+    total_cost = fields.Float(string='Total Cost', readonly=True)
+    plan_rows = fields.Float(string='Estimated Rows', readonly=True)
+    seq_scan_count = fields.Integer(string='Large Seq Scans', readonly=True)
+    estimate_miss_count = fields.Integer(string='Estimate Misses', readonly=True)
+    spill_count = fields.Integer(string='Spills', readonly=True)
+    findings = fields.Text(string='Findings', readonly=True)
+
+    @api.depends('plan_data')
+    def _compute_plan_json(self):
+        for plan in self:
+            plan.plan_json = json.dumps(self._load_plan(plan.plan_data), indent=2) if plan.plan_data else False
+
+    @api.model
+    def _load_plan(self, value):
+        return json.loads(zlib.decompress(base64.b64decode(value)))
+
+    @api.model
+    def _captures_last_hour(self):
+        self.flush_model()
+        self.env.cr.execute(f"""
+            SELECT COUNT(*) FROM "{self._table}"
+            WHERE captured_at >= now() AT TIME ZONE 'UTC' - INTERVAL '1 hour'
+        """)
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _capture_for_sightings(self, families, family_ids):
+        """Plan the slowest new or regressed query families of a slow query run, within the rate limits
+
+        `families` and `family_ids` are those of erp.health.slow.query._ingest_sightings().
+        """
+        config = self.env['erp.health.config'].get_config()
+        if not config.plan_capture or not family_ids:
+            return self.browse()
+        budget = min(MAX_CAPTURES_PER_RUN, config.plan_capture_per_hour - self._captures_last_hour())
+        if budget <= 0:
+            return self.browse()
+
+        self.env.cr.execute(f"""
+            SELECT DISTINCT ON (family_id) family_id, captured_at, query_duration
+            FROM "{self._table}"
+            WHERE family_id IN %s
+            ORDER BY family_id, captured_at DESC
+        """, (tuple(family_ids.values()),))
+        latest = {family_id: (at, duration) for family_id, at, duration in self.env.cr.fetchall()}
+
+        now = fields.Datetime.now()
+        candidates = []
+        for fp, family in families.items():
+            family_id = family_ids.get(fp)
+            # pg_stat_activity shows every database: other databases' statements are not ours to run
+            if not family_id or family.get('database') != self.env.cr.dbname \
+                    or not plan_analysis.is_explainable(family['sample']):
+                continue
+            last = latest.get(family_id)
+            if last is None:
+                reason = 'new'
+            elif family['max'] >= REGRESSION_FACTOR * (last[1] or 0.0) and now - last[0] >= MIN_RECAPTURE_INTERVAL:
+                reason = 'regressed'
+            else:
+                continue
+            candidates.append((family['max'], family_id, family['sample'], reason))
+
+        # Slowest first
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        vals_list = [
+            self._capture(query, analyze=config.plan_capture_analyze, family_id=family_id,
+                          query_duration=duration, reason=reason, captured_at=now)
+            for duration, family_id, query, reason in candidates[:budget]
+        ]
+        return self._bulk_insert(vals_list)
+
+    @api.model
+    def _explain(self, cr, query, analyze, timeout):
+        """(plan, {relation: rows}, work_mem bytes) in a read-only transaction that is rolled back"""
+        # A second statement would run outside the EXPLAIN, after a COMMIT ending the read-only transaction
+        if not plan_analysis.is_explainable(query) or (analyze and not plan_analysis.is_read_only(query)):
+            raise ValueError("Refusing to explain a statement that is not a single plannable query")
+        cr.execute('SET TRANSACTION READ ONLY')
+        cr.execute('SET LOCAL statement_timeout = %s', (int(timeout * 1000),))
+        # Never queue behind the locks of the workload being diagnosed
+        cr.execute("SET LOCAL lock_timeout = '100ms'")
+        options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+        cr.execute(f'EXPLAIN ({options}) {query}')
+        result = cr.fetchone()[0]
+        plan = (json.loads(result) if isinstance(result, str) else result)[0]
+
+        table_rows = {}
+        names = plan_analysis.relations(plan['Plan'])
+        if names:
+            cr.execute("""
+                SELECT relname, MAX(reltuples) FROM pg_class
+                WHERE relname IN %s AND relkind IN ('r', 'p', 'm')
+                GROUP BY relname
+            """, (tuple(names),))
+            table_rows = dict(cr.fetchall())
+        cr.execute("SELECT setting::bigint * 1024 FROM pg_settings WHERE name = 'work_mem'")
+        work_mem = cr.fetchone()[0]
+        cr.rollback()
+        return plan, table_rows, work_mem
+
+    @api.model
+    def _capture(self, query, analyze=False, **vals):
+        """Values of a plan record for `query`, planned on a separate cursor
+
+        ANALYZE only runs for queries that only read, and falls back to a plain EXPLAIN on timeout.
+        """
+        timeout = float(self.env['ir.config_parameter'].sudo().get_param(
+            'odoo_erp_health_monitor.plan_capture_timeout', '3'
+        ))
+        analyze = analyze and plan_analysis.is_read_only(query)
+        vals.update(query_text=query, analyzed=analyze)
+        try:
+            with self.env.registry.cursor() as cr:
+                try:
+                    plan, table_rows, work_mem = self._explain(cr, query, analyze, timeout)
+                except Exception as e:
+                    if not analyze:
+                        raise
+                    _logger.info(f"EXPLAIN ANALYZE gave up ({e}), planning without executing")
+                    cr.rollback()
+                    vals['analyzed'] = False
+                    plan, table_rows, work_mem = self._explain(cr, query, False, timeout)
+        except Exception as e:
+            # Truncated query text, another database's tables, timeout...
+            _logger.info(f"Could not capture a query plan: {e}")
+            return dict(vals, status='failed', error_message=str(e))
+
+        found = plan_analysis.findings(plan['Plan'], table_rows, work_mem)
+        raw = json.dumps(plan).encode()
+        _logger.info(f"Captured a query plan ({vals.get('reason')}): {len(found)} findings")
+        return dict(
+            vals,
+            status='captured',
+            plan_data=base64.b64encode(zlib.compress(raw, 9)),
+            plan_bytes=len(raw),
+            total_cost=plan['Plan'].get('Total Cost', 0.0),
+            plan_rows=plan['Plan'].get('Plan Rows', 0.0),
+            seq_scan_count=sum(1 for kind, _text in found if kind == 'seq_scan'),
+            estimate_miss_count=sum(1 for kind, _text in found if kind == 'estimate_miss'),
+            spill_count=sum(1 for kind, _text in found if kind == 'spill'),
+            findings='\n'.join(text for _kind, text in found) or False,
+        )
@@ -0,0 +1,164 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import time
+import logging
+
+from ..tools import health
+
+_logger = logging.getLogger(__name__)
+
+# Fixed-interval crons the adaptive driver takes over from
+FIXED_SAMPLING_CRONS = (
+    'odoo_erp_health_monitor.cron_collect_server_metrics',
+    'odoo_erp_health_monitor.cron_refresh_slow_queries',
+    'odoo_erp_health_monitor.cron_refresh_locks',
+)
+ADAPTIVE_CRON = 'odoo_erp_health_monitor.cron_adaptive_sampler'
+# Host metrics the standalone agent takes over when its spool is imported
+SERVER_METRICS_CRON = 'odoo_erp_health_monitor.cron_collect_server_metrics'
+AGENT_IMPORT_CRON = 'odoo_erp_health_monitor.cron_import_agent_spool'
+
+# Seconds of its one-minute tick the driver may spend sampling, under the cron time limit
+DRIVER_WINDOW = 50
+# Sampling interval (seconds) while some signal is in warning
+WARNING_INTERVAL = 60
+
+
+class ErpHealthSampler(models.AbstractModel):
+    _name = 'erp.health.sampler'
+    _description = 'ERP Health Adaptive Sampler'
+
+    @api.model
+    def _apply_sampling_mode(self, mode, driver=True):
+        """Enable either the fixed-interval collector crons or the adaptive driver, and the agent import
+
+        The driver itself must not call this with `driver` set: the cron runner holds
+        a lock on the driver's ir_cron row while it runs, so writing it would wait forever.
+        """
+        adaptive = mode == 'adaptive'
+        agent = self.env['erp.health.config'].get_config().agent_import
+        wanted = {xmlid: not adaptive for xmlid in FIXED_SAMPLING_CRONS}
+        if agent:
+            wanted[SERVER_METRICS_CRON] = False
+        # Unchanged while the import runs, so never written from its own job
+        wanted[AGENT_IMPORT_CRON] = agent
+        if driver:
+            wanted[ADAPTIVE_CRON] = adaptive
+        for xmlid, active in wanted.items():
+            cron = self.env.ref(xmlid, raise_if_not_found=False)
+            if cron and cron.active != active:
+                cron.sudo().active = active
+
+    @api.model
+    def _run_collector(self, collect):
+        """Run one collector under a savepoint, returning False when it failed
+
+        Collectors log and swallow their own errors, which after an SQL error leaves
+        the transaction aborted: the rest of the tick could not run, nor record itself.
+        """
+        try:
+            with self.env.cr.savepoint():
+                result = collect()
+                # Fails on an aborted transaction, rolling back to the savepoint
+                self.env.cr.execute('SELECT 1')
+                return result
+        except Exception as e:
+            _logger.warning(f"Adaptive sampling: a collector failed, carrying on with the others: {e}")
+            return False
+
+    @api.model
+    def _sample(self):
+        """Run the fast-moving collectors once; returns the worst health level they show"""
+        Metrics = self.env['erp.health.server.metrics']
+        if self.env['erp.health.config'].get_config().agent_import:
+            # The agent samples the host, rate the latest of its samples
+            metrics = Metrics.search([], order='timestamp desc', limit=1)
+        else:
+            metrics = self._run_collector(Metrics.collect_metrics)
+        locks = self._run_collector(self.env['erp.health.database.lock'].refresh_locks)
+        self._run_collector(self.env['erp.health.slow.query'].refresh_slow_queries)
+
+        # Disk usage moves too slowly for sampling faster to help
+        levels = []
+        if metrics:
+            scores = self.env['erp.health.metric.baseline']._sample_scores(metrics)
+            levels.append(health.metric_level('cpu', metrics.cpu_percent, scores['cpu']))
+            levels.append(health.metric_level('ram', metrics.ram_percent, scores['ram']))
+        if locks:
+            levels.append(health.classify('lock_waits', locks['ingested']))
+        return health.worst(levels)
+
+    @api.model
+    def _budget_left(self, budget_percent):
+        """Seconds the collectors may still spend within the trailing hour"""
+        self.env['erp.health.collector.run'].flush_model()
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(duration), 0) FROM erp_health_collector_run
+            WHERE started_at >= now() AT TIME ZONE 'UTC' - INTERVAL '1 hour'
+        """)
+        return 3600 * budget_percent / 100 - self.env.cr.fetchone()[0]
+
+    @api.model
+    def _next_interval(self, config, level, cost):
+        """Seconds until the next sample: fast when critical, backing off while healthy"""
+        if level == 'critical':
+            interval = config.adaptive_min_interval
+        elif level == 'warning':
+            interval = WARNING_INTERVAL
+        else:
+            interval = (config.adaptive_interval or WARNING_INTERVAL) * 2
+        # A sample costing `cost` seconds every `interval` must stay within the budget share
+        interval = max(interval, cost * 100 / config.adaptive_budget_percent)
+        return int(min(max(interval, config.adaptive_min_interval), config.adaptive_max_interval))
+
+    @api.model
+    def run_adaptive_sampling(self):
+        """Cron driver, ticking every minute: sample when due, several times per tick when critical"""
+        config = self.env['erp.health.config'].get_config()
+        if config.sampling_mode != 'adaptive':
+            # Activated by hand while sampling is fixed: keep the fixed crons running, and
+            # leave deactivating the driver to the configuration
+            _logger.warning("Adaptive sampling driver ran while the sampling mode is fixed, nothing sampled")
+            self._apply_sampling_mode(config.sampling_mode, driver=False)
+            return False
+        # A module update re-enables the fixed crons
+        self._apply_sampling_mode('adaptive', driver=False)
+
+        deadline = time.monotonic() + DRIVER_WINDOW
+        samples = 0
+        while time.monotonic() < deadline:
+            if config.adaptive_next_sample:
+                wait = (config.adaptive_next_sample - fields.Datetime.now()).total_seconds()
+                if wait > 0:
+                    if time.monotonic() + wait > deadline:
+                        break
+                    time.sleep(wait)
+
+            sampled_at = fields.Datetime.now()
+            if self._budget_left(config.adaptive_budget_percent) <= 0:
+                level = 'throttled'
+                interval = config.adaptive_max_interval
+                _logger.warning(
+                    f"Adaptive sampling paused for {interval}s: collectors used their "
+                    f"{config.adaptive_budget_percent}% budget over the last hour"
+                )
+            else:
+                started = time.monotonic()
+                level = self._sample()
+                interval = self._next_interval(config, level, time.monotonic() - started)
+                samples += 1
+
+            config.write({
+                'adaptive_level': level,
+                'adaptive_interval': interval,
+                'adaptive_last_sample': sampled_at,
+                'adaptive_next_sample': sampled_at + timedelta(seconds=interval),
+            })
+            # Every sample shows up right away instead of at the end of the tick
+            self.env.cr.commit()
+
+        _logger.info(
+            f"Adaptive sampling: {samples} samples this tick, level {config.adaptive_level}, "
+            f"next in {config.adaptive_interval}s"
+        )
+        return samples
@@ -1,26 +1,50 @@
 from odoo import models, fields, api
+import json
 import logging
 
+from ..tools import system_sampler
+
 _logger = logging.getLogger(__name__)
 
+# dbname -> last CPU times snapshot taken by this process
+_CPU_SNAPSHOTS = {}
+
 
 class ErpHealthServerMetrics(models.Model):
     _name = 'erp.health.server.metrics'
+    # Partitioning first so its _prune_rows() takes precedence
+    _inherit = ['erp.health.partitioned.mixin', 'erp.health.ingest.mixin']
     _description = 'Server Health Metrics'
     _order = 'timestamp desc'
+    _partition_column = 'timestamp'
 
-    timestamp = fields.Datetime(string='Timestamp', readonly=True, default=fields.Datetime.now)
+    timestamp = fields.Datetime(string='Timestamp', readonly=True, default=fields.Datetime.now, index=True)
     cpu_percent = fields.Float(string='CPU Usage (%)', readonly=True)
+    cpu_iowait_percent = fields.Float(string='CPU I/O Wait (%)', readonly=True)
+    cpu_steal_percent = fields.Float(string='CPU Steal (%)', readonly=True)
+    cpu_per_core = fields.Char(string='CPU per Core (%)', readonly=True)
+    cpu_window = fields.Float(string='CPU Sample Window (s)', readonly=True,
+                              help='Time covered by the CPU figures, since the previous sample')
+    cpu_times_snapshot = fields.Text(string='CPU Times Snapshot', readonly=True)
     ram_percent = fields.Float(string='RAM Usage (%)', readonly=True)
     ram_used_gb = fields.Float(string='RAM Used (GB)', readonly=True)
     ram_total_gb = fields.Float(string='RAM Total (GB)', readonly=True)
     disk_percent = fields.Float(string='Disk Usage (%)', readonly=True)
     disk_used_gb = fields.Float(string='Disk Used (GB)', readonly=True)
     disk_total_gb = fields.Float(string='Disk Total (GB)', readonly=True)
+    disk_read_mb_s = fields.Float(string='Disk Read (MB/s)', readonly=True)
+    disk_write_mb_s = fields.Float(string='Disk Write (MB/s)', readonly=True)
+    disk_read_iops = fields.Float(string='Disk Read IOPS', readonly=True)
+    disk_write_iops = fields.Float(string='Disk Write IOPS', readonly=True)
     load_average_1m = fields.Float(string='Load Avg (1m)', readonly=True)
     load_average_5m = fields.Float(string='Load Avg (5m)', readonly=True)
     load_average_15m = fields.Float(string='Load Avg (15m)', readonly=True)
     hour = fields.Integer(compute='_compute_hour', store=True)
+    # Standard deviations from the baseline of the same hour of day, empty while it warms up
+    cpu_anomaly_score = fields.Float(string='CPU Anomaly Score', readonly=True, digits=(16, 2))
+    ram_anomaly_score = fields.Float(string='RAM Anomaly Score', readonly=True, digits=(16, 2))
+    load_anomaly_score = fields.Float(string='Load Anomaly Score', readonly=True, digits=(16, 2))
+    is_anomaly = fields.Boolean(string='Anomaly', readonly=True, index=True)
 
     @api.depends('timestamp')
     def _compute_hour(self):
@@ -29,82 +53,83 @@ class ErpHealthServerMetrics(models.Model):
                 rec.hour = rec.timestamp.hour
 
     @api.model
-    def collect_metrics(self):
-        """Collect server metrics using psutil - Windows compatible"""
+    def _get_previous_cpu_snapshot(self):
+        """CPU snapshot of the previous sample: the newer of this process's and the last stored row's"""
+        cached = _CPU_SNAPSHOTS.get(self.env.cr.dbname)
+        # Other workers sample the same host too, so this process's cache can be hours old
+        self.env.cr.execute(f"""
+            SELECT cpu_times_snapshot FROM "{self._table}"
+            WHERE cpu_times_snapshot IS NOT NULL
+            ORDER BY timestamp DESC LIMIT 1
+        """)
+        row = self.env.cr.fetchone()
         try:
-            import psutil
-            
-            # CPU
-            cpu_percent = psutil.cpu_percent(interval=1)
+            stored = json.loads(row[0]) if row else None
+        except ValueError:
+            stored = None
+        candidates = [snapshot for snapshot in (cached, stored) if snapshot]
+        return max(candidates, key=lambda snapshot: snapshot.get('at') or 0) if candidates else None
 
-            # RAM
-            ram = psutil.virtual_memory()
-            ram_percent = ram.percent
-            ram_used_gb = ram.used / (1024 ** 3)
-            ram_total_gb = ram.total / (1024 ** 3)
+    @api.model
+    def _prune_rows(self, keep=None):
+        pruned = super()._prune_rows(keep)
+        if pruned:
+            # Worker rows hold no foreign key to cascade from
+            self.env['erp.health.worker.metrics']._prune_orphans()
+        return pruned
 
-            # Disk (Windows compatible - use C: drive)
+    @api.model
+    def collect_metrics(self):
+        """Collect server metrics using psutil"""
+        with self.env['erp.health.collector.run']._track('collect_metrics') as run:
             try:
-                disk = psutil.disk_usage('C:\\')
-            except Exception as disk_error:
-                _logger.warning(f"Could not get C:\\ disk usage: {disk_error}, trying /")
-                try:
-                    disk = psutil.disk_usage('/')
-                except Exception as disk_error2:
-                    _logger.error(f"Could not get disk usage: {disk_error2}")
-                    disk = None
-            
-            if disk:
-                disk_percent = disk.percent
-                disk_used_gb = disk.used / (1024 ** 3)
-                disk_total_gb = disk.total / (1024 ** 3)
-            else:
-                disk_percent = 0.0
-                disk_used_gb = 0.0
-                disk_total_gb = 0.0
-
-            # Load average - Skip on Windows (causes the error)
-            # Windows doesn't support getloadavg properly
-            load_1m = load_5m = load_15m = 0.0
+                import psutil
             
-            # Try to get load average, but don't fail if it doesn't work
-            try:
-                load_avg = psutil.getloadavg()
-                load_1m, load_5m, load_15m = load_avg
-            except (AttributeError, OSError, RuntimeError) as e:
-                # Expected on Windows - Performance counters issue
-                _logger.debug(f"Load average not available (Windows): {e}")
-                pass
-
-            # Store metrics
-            record = self.create({
-                'cpu_percent': cpu_percent,
-                'ram_percent': ram_percent,
-                'ram_used_gb': ram_used_gb,
-                'ram_total_gb': ram_total_gb,
-                'disk_percent': disk_percent,
-                'disk_used_gb': disk_used_gb,
-                'disk_total_gb': disk_total_gb,
-                'load_average_1m': load_1m,
-                'load_average_5m': load_5m,
-                'load_average_15m': load_15m,
-            })
-
-            _logger.info(f"✅ Server metrics collected successfully: CPU={cpu_percent}%, RAM={ram_percent}%, Disk={disk_percent}%")
-
-            # Keep only last 1000 records
-            old_records = self.search([], order='id desc', offset=1000)
-            if old_records:
-                old_records.unlink()
+                # CPU and disk I/O as deltas against the previous snapshot (no blocking interval)
+                # Disk: the fullest of the filesystems holding the filestore, the database and the logs
+                disk_paths = tuple(self.env['erp.health.storage']._monitored_paths().values())
+                values, snapshot = system_sampler.host_sample(
+                    psutil, self._get_previous_cpu_snapshot(), disk_paths=disk_paths,
+                )
+                _CPU_SNAPSHOTS[self.env.cr.dbname] = snapshot
+
+                # Store metrics
+                record = self.create(dict(values, cpu_times_snapshot=json.dumps(snapshot)))
+                run['rows_written'] = 1
+
+                try:
+                    with self.env.cr.savepoint():
+                        self.env['erp.health.metric.baseline']._observe(record)
+                except Exception as baseline_error:
+                    _logger.warning(f"Could not update metric baselines: {baseline_error}")
+
+                # Per-process figures of the Odoo master and its workers
+                try:
+                    workers = self.env['erp.health.worker.metrics']._collect_worker_metrics(record)
+                    run['rows_written'] += len(workers)
+                except Exception as worker_error:
+                    _logger.warning(f"Could not collect worker metrics: {worker_error}")
+
+                _logger.info(
+                    f"✅ Server metrics collected successfully: CPU={values['cpu_percent']}%, "
+                    f"RAM={values['ram_percent']}%, Disk={values['disk_percent']}%"
+                )
+
+                # Keep only last 1000 records, history lives in the rollup tiers
+                self.env['erp.health.metrics.rollup']._rollup_metrics()
+                self._prune_rows(1000)
+                self._notify_collected()
                 
-            return record
-
-        except ImportError as e:
-            _logger.error(f"psutil not installed: {e}")
-            _logger.error("Install with: pip install psutil")
-            return False
-        except Exception as e:
-            _logger.error(f"Error collecting server metrics: {e}")
-            import traceback
-            _logger.error(traceback.format_exc())
-            return False
\ No newline at end of file
+                return record
+
+            except ImportError as e:
+                run['error'] = str(e)
+                _logger.error(f"psutil not installed: {e}")
+                _logger.error("Install with: pip install psutil")
+                return False
+            except Exception as e:
+                run['error'] = str(e)
+                _logger.error(f"Error collecting server metrics: {e}")
+                import traceback
+                _logger.error(traceback.format_exc())
+                return False
\ No newline at end of file
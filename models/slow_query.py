@@ -1,24 +1,37 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 import logging
 
+from ..tools import sql_fingerprint
+
 _logger = logging.getLogger(__name__)
 
 
 class ErpHealthSlowQuery(models.Model):
     _name = 'erp.health.slow.query'
+    # Partitioning first so its _prune_rows() takes precedence
+    _inherit = ['erp.health.partitioned.mixin', 'erp.health.ingest.mixin']
     _description = 'Slow SQL Query Monitor'
     _order = 'duration desc, id desc'
+    _partition_column = 'detected_at'
 
     query_text = fields.Text(string='Query', readonly=True)
     duration = fields.Float(string='Duration (seconds)', readonly=True)
     database_user = fields.Char(string='Database User', readonly=True)
     query_state = fields.Char(string='State', readonly=True)
-    detected_at = fields.Datetime(string='Detected At', readonly=True, default=fields.Datetime.now)
+    detected_at = fields.Datetime(string='Detected At', readonly=True, default=fields.Datetime.now, index=True)
     pid = fields.Integer(string='Process ID', readonly=True)
+    query_start = fields.Datetime(string='Query Started', readonly=True)
+    family_id = fields.Many2one('erp.health.query.family', string='Query Family', readonly=True,
+                                ondelete='set null', index=True)
+
+    def init(self):
+        # Repeated sightings are matched on (pid, query_start)
+        tools.create_index(self.env.cr, 'erp_health_slow_query_pid_start_index',
+                           self._table, ['pid', 'query_start'])
 
     @api.model
     def refresh_slow_queries(self):
-        """Fetch slow queries from PostgreSQL and store them"""
+        """Fetch slow queries from PostgreSQL and store them, grouped by query family"""
         threshold = self.env['ir.config_parameter'].sudo().get_param(
             'odoo_erp_health_monitor.slow_query_threshold', '2.0'
         )
@@ -28,9 +41,11 @@ class ErpHealthSlowQuery(models.Model):
             SELECT 
                 pid,
                 usename as db_user,
+                datname,
                 state,
-                query,
-                EXTRACT(EPOCH FROM (now() - query_start)) as duration
+                LEFT(query, 5000) as query,
+                EXTRACT(EPOCH FROM (now() - query_start)) as duration,
+                query_start AT TIME ZONE 'UTC' as query_start
             FROM pg_stat_activity
             WHERE state = 'active'
               AND query NOT LIKE '%%pg_stat_activity%%'
@@ -39,26 +54,105 @@ class ErpHealthSlowQuery(models.Model):
             LIMIT 50
         """
 
-        try:
-            self.env.cr.execute(query, (threshold,))
-            results = self.env.cr.dictfetchall()
-
-            # Clear old records (keep last 1000)
-            old_records = self.search([], order='id desc', offset=1000)
-            if old_records:
-                old_records.unlink()
-
-            # Insert new slow queries
-            for row in results:
-                self.create({
-                    'pid': row['pid'],
-                    'database_user': row['db_user'],
-                    'query_state': row['state'],
-                    'query_text': row['query'][:5000],  # Trim to 5000 chars
-                    'duration': row['duration'],
-                })
-
-            _logger.info(f"Detected {len(results)} slow queries (threshold: {threshold}s)")
+        with self.env['erp.health.collector.run']._track('refresh_slow_queries') as run:
+            try:
+                self.env.cr.execute(query, (threshold,))
+                results = self.env.cr.dictfetchall()
+                stats = self._ingest_sightings(results)
+
+                # Clear old records (keep last 1000)
+                stats['pruned'] = self._prune_rows(1000)
+                run['rows_written'] = stats['ingested'] + stats['updated'] + stats['pruned']
+                self._notify_collected()
+
+                _logger.info(
+                    f"Detected {len(results)} slow queries (threshold: {threshold}s): "
+                    f"{stats['ingested']} new, {stats['updated']} still running, pruned {stats['pruned']}"
+                )
+                return stats
+
+            except Exception as e:
+                run['error'] = str(e)
+                _logger.error(f"Error fetching slow queries: {e}")
+                return False
+
+    @api.model
+    def _ingest_sightings(self, rows):
+        """Store pg_stat_activity rows, updating a query already seen under the same pid and query_start
+
+        Rows may carry their own `detected_at` when they were sampled earlier, e.g. by the agent.
+        """
+        if not rows:
+            return {'ingested': 0, 'updated': 0}
+
+        self.flush_model()
+        self.env.cr.execute(f"""
+            SELECT id, pid, query_start, duration FROM "{self._table}"
+            WHERE (pid, query_start) IN %s
+        """, (tuple((row['pid'], row['query_start']) for row in rows),))
+        seen = {(pid, start): (rec_id, duration) for rec_id, pid, start, duration in self.env.cr.fetchall()}
+
+        families = {}
+        fingerprints = []
+        for row in rows:
+            fp, normalized = sql_fingerprint.fingerprint(row['query'])
+            fingerprints.append(fp)
+            family = families.setdefault(fp, {
+                'normalized': normalized, 'sample': row['query'], 'database': row.get('datname'),
+                'count': 0, 'duration': 0.0, 'max': 0.0,
+            })
+            previous = seen.get((row['pid'], row['query_start']))
+            if previous:
+                # Same execution seen by an earlier run: only the extra time counts
+                family['duration'] += max(row['duration'] - (previous[1] or 0.0), 0.0)
+            else:
+                family['count'] += 1
+                family['duration'] += row['duration']
+            if row['duration'] >= family['max']:
+                family['max'] = row['duration']
+                family['sample'] = row['query']
+                family['database'] = row.get('datname')
 
+        family_ids = self.env['erp.health.query.family']._upsert_families(families)
+
+        try:
+            # Never let a plan capture abort the ingestion
+            with self.env.cr.savepoint():
+                self.env['erp.health.query.plan']._capture_for_sightings(families, family_ids)
         except Exception as e:
-            _logger.error(f"Error fetching slow queries: {e}")
\ No newline at end of file
+            _logger.warning(f"Could not capture query plans: {e}")
+
+        vals_list = []
+        updates = []
+        now = fields.Datetime.now()
+        for row, fp in zip(rows, fingerprints):
+            previous = seen.get((row['pid'], row['query_start']))
+            if previous:
+                updates.append((previous[0], row['duration'], now))
+                continue
+            vals_list.append({
+                'pid': row['pid'],
+                'database_user': row['db_user'],
+                'query_state': row['state'],
+                'query_text': row['query'],
+                'duration': row['duration'],
+                'query_start': row['query_start'],
+                'detected_at': row.get('detected_at') or now,
+                'family_id': family_ids.get(fp),
+            })
+        records = self._bulk_insert(vals_list)
+
+        if updates:
+            self.env.cr.execute(f"""
+                UPDATE "{self._table}" q
+                SET duration = GREATEST(q.duration, v.duration), detected_at = v.detected_at
+                FROM (VALUES {', '.join(['(%s, %s::float8, %s::timestamp)'] * len(updates))})
+                    AS v(id, duration, detected_at)
+                WHERE q.id = v.id
+            """, [value for update in updates for value in update])
+            self.invalidate_model(['duration', 'detected_at'])
+
+        self.env['erp.health.query.family']._record_pids(
+            (family_ids.get(fp), row['pid']) for row, fp in zip(rows, fingerprints)
+        )
+        return {'ingested': len(records), 'updated': len(updates)}
@@ -0,0 +1,213 @@
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Counters tracked per statement; the execution time column was renamed in PostgreSQL 13
+STATEMENT_COUNTERS = ['calls', 'total_time', 'rows', 'shared_blks_hit', 'shared_blks_read']
+
+
+class ErpHealthStatement(models.Model):
+    _name = 'erp.health.statement'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'pg_stat_statements Entry'
+    _order = 'total_time desc'
+    _rec_name = 'query_text'
+
+    queryid = fields.Char(string='Query ID', required=True, readonly=True, index=True)
+    userid = fields.Integer(string='Role OID', readonly=True)
+    query_text = fields.Text(string='Query', readonly=True)
+    # Last cumulative counters read from pg_stat_statements, used as delta base
+    calls = fields.Float(string='Calls (cumulative)', digits=(20, 0), readonly=True)
+    total_time = fields.Float(string='Exec Time ms (cumulative)', readonly=True)
+    rows = fields.Float(string='Rows (cumulative)', digits=(20, 0), readonly=True)
+    shared_blks_hit = fields.Float(string='Buffer Hits (cumulative)', digits=(20, 0), readonly=True)
+    shared_blks_read = fields.Float(string='Buffer Reads (cumulative)', digits=(20, 0), readonly=True)
+    last_snapshot = fields.Datetime(string='Last Snapshot', readonly=True)
+    interval_ids = fields.One2many('erp.health.statement.interval', 'statement_id', string='Intervals')
+
+    _sql_constraints = [
+        ('statement_unique', 'UNIQUE(queryid, userid)', 'A statement is tracked once per role.'),
+    ]
+
+    @api.model
+    def _get_statements_source(self):
+        """Return the SQL selecting this database's pg_stat_statements rows, None if unavailable"""
+        self.env.cr.execute("""
+            SELECT n.nspname
+            FROM pg_extension e
+            JOIN pg_namespace n ON n.oid = e.extnamespace
+            WHERE e.extname = 'pg_stat_statements'
+        """)
+        row = self.env.cr.fetchone()
+        if not row:
+            return None
+        schema = row[0]
+        self.env.cr.execute("""
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attname = 'total_exec_time'
+        """, (f'"{schema}".pg_stat_statements',))
+        time_column = 'total_exec_time' if self.env.cr.fetchone() else 'total_time'
+        # PostgreSQL 14+ may report a statement twice (top-level and nested), sum them
+        return f"""
+            SELECT queryid::text AS queryid, userid::int AS userid, LEFT(MIN(query), 5000) AS query,
+                   SUM(calls)::float8 AS calls, SUM({time_column})::float8 AS total_time,
+                   SUM(rows)::float8 AS rows, SUM(shared_blks_hit)::float8 AS shared_blks_hit,
+                   SUM(shared_blks_read)::float8 AS shared_blks_read
+            FROM "{schema}".pg_stat_statements
+            WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+              AND queryid IS NOT NULL
+            GROUP BY queryid, userid
+        """
+
+    @api.model
+    def collect_statement_stats(self):
+        """Snapshot pg_stat_statements and store the per-statement deltas since the previous snapshot"""
+        try:
+            with self.env.cr.savepoint():
+                source = self._get_statements_source()
+                if source:
+                    self.env.cr.execute(source)
+                    current = self.env.cr.dictfetchall()
+        except Exception as e:
+            # Extension created but not in shared_preload_libraries, or no permission
+            _logger.warning(f"pg_stat_statements unavailable: {e}")
+            source = None
+
+        if not source:
+            # The slow query sampler keeps running on its own cron
+            _logger.info("pg_stat_statements is not installed, no statement statistics collected")
+            return False
+
+        with self.env['erp.health.collector.run']._track('collect_statement_stats') as run:
+            now = fields.Datetime.now()
+            self.flush_model()
+            self.env.cr.execute(f"""
+                SELECT id, queryid, userid, last_snapshot, {', '.join(STATEMENT_COUNTERS)}
+                FROM "{self._table}"
+            """)
+            # Counters come back as numeric
+            baseline = {
+                (row['queryid'], row['userid']): dict(row, **{name: float(row[name]) for name in STATEMENT_COUNTERS})
+                for row in self.env.cr.dictfetchall()
+            }
+
+            interval_vals = []
+            new_vals = []
+            updates = []
+            for row in current:
+                previous = baseline.pop((row['queryid'], row['userid']), None)
+                if previous:
+                    if row['calls'] < previous['calls']:
+                        # Statistics were reset: the current counters are the delta
+                        delta = {name: row[name] for name in STATEMENT_COUNTERS}
+                    else:
+                        delta = {name: row[name] - previous[name] for name in STATEMENT_COUNTERS}
+                    delta['calls'] = int(delta['calls'])
+                    if delta['calls'] > 0:
+                        interval_vals.append(dict(
+                            delta,
+                            statement_id=previous['id'],
+                            interval_start=previous['last_snapshot'],
+                            interval_end=now,
+                        ))
+                    updates.append((previous['id'], row))
+                else:
+                    new_vals.append(dict(
+                        {name: row[name] for name in STATEMENT_COUNTERS},
+                        queryid=row['queryid'],
+                        userid=row['userid'],
+                        query_text=row['query'],
+                        last_snapshot=now,
+                    ))
+
+            # First sighting only sets the baseline; its counters cover an unknown period
+            self._bulk_insert(new_vals)
+            if updates:
+                columns = STATEMENT_COUNTERS
+                self.env.cr.execute(f"""
+                    UPDATE "{self._table}" s
+                    SET {', '.join(f'{name} = v.{name}' for name in columns)},
+                        last_snapshot = %s, write_date = now() AT TIME ZONE 'UTC'
+                    FROM (VALUES {', '.join(['(%s' + ', %s::float8' * len(columns) + ')'] * len(updates))})
+                        AS v(id, {', '.join(columns)})
+                    WHERE s.id = v.id
+                """, [now] + [value for rec_id, row in updates for value in [rec_id] + [row[name] for name in columns]])
+            evicted = self._forget_evicted([previous['id'] for previous in baseline.values()], now)
+            self.invalidate_model()
+
+            Interval = self.env['erp.health.statement.interval']
+            intervals = Interval._bulk_insert(interval_vals)
+            pruned = Interval._prune_rows()
+            run['rows_written'] = len(intervals) + len(new_vals) + len(updates) + evicted + pruned
+
+            _logger.info(
+                f"pg_stat_statements snapshot: {len(current)} statements, {len(intervals)} active, "
+                f"{len(baseline)} evicted"
+            )
+            self._notify_collected()
+            return {'ingested': len(intervals) + len(new_vals), 'pruned': pruned}
+
+    @api.model
+    def _forget_evicted(self, ids, now):
+        """Drop the baseline of statements evicted from pg_stat_statements; returns the rows written
+
+        Statements without history left are deleted. The others keep their intervals
+        until those are pruned, with counters back to zero: should the statement come
+        back, pg_stat_statements counts it from zero again.
+        """
+        if not ids:
+            return 0
+        self.env['erp.health.statement.interval'].flush_model()
+        self.env.cr.execute(f"""
+            DELETE FROM "{self._table}" s
+            WHERE s.id IN %s
+              AND NOT EXISTS (SELECT 1 FROM erp_health_statement_interval i WHERE i.statement_id = s.id)
+        """, (tuple(ids),))
+        written = self.env.cr.rowcount
+        self.env.cr.execute(f"""
+            UPDATE "{self._table}"
+            SET {', '.join(f'{name} = 0' for name in STATEMENT_COUNTERS)}, last_snapshot = %s,
+                write_date = now() AT TIME ZONE 'UTC'
+            WHERE id IN %s AND calls > 0
+        """, (now, tuple(ids)))
+        return written + self.env.cr.rowcount
+
+    def action_view_intervals(self):
+        """Open the per-interval history of this statement"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Statement History',
+            'res_model': 'erp.health.statement.interval',
+            'view_mode': 'list,graph',
+            'domain': [('statement_id', '=', self.id)],
+            'target': 'current',
+        }
+
+
+class ErpHealthStatementInterval(models.Model):
+    _name = 'erp.health.statement.interval'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'pg_stat_statements Interval Delta'
+    _order = 'interval_end desc, total_time desc'
+
+    # About a week of 5-minute snapshots for a few hundred active statements
+    _ingest_keep_rows = 200000
+
+    statement_id = fields.Many2one('erp.health.statement', string='Statement', required=True,
+                                   readonly=True, ondelete='cascade', index=True)
+    query_text = fields.Text(related='statement_id.query_text', string='Query')
+    interval_start = fields.Datetime(string='From', readonly=True)
+    interval_end = fields.Datetime(string='To', readonly=True, index=True)
+    calls = fields.Integer(string='Calls', readonly=True)
+    total_time = fields.Float(string='Exec Time (ms)', readonly=True)
+    mean_time = fields.Float(string='Mean Time (ms)', compute='_compute_mean_time', aggregator='avg')
+    rows = fields.Float(string='Rows', digits=(20, 0), readonly=True)
+    shared_blks_hit = fields.Float(string='Buffer Hits', digits=(20, 0), readonly=True)
+    shared_blks_read = fields.Float(string='Buffer Reads', digits=(20, 0), readonly=True)
+
+    @api.depends('calls', 'total_time')
+    def _compute_mean_time(self):
+        for rec in self:
+            rec.mean_time = rec.total_time / rec.calls if rec.calls else 0.0
@@ -0,0 +1,271 @@
+from odoo import models, fields, api, tools
+from datetime import timedelta
+import json
+import os
+import logging
+
+from ..tools import forecast, system_sampler
+
+_logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+
+# dbname -> PostgreSQL data directory, None when the server is remote or will not tell
+_DATA_DIRECTORIES = {}
+
+# Largest relations tracked per run
+TRACKED_TABLES = 20
+
+
+class ErpHealthStorage(models.Model):
+    _name = 'erp.health.storage'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'Storage Usage and Forecast'
+    _order = 'kind, size_gb desc'
+
+    name = fields.Char(string='Name', required=True, readonly=True,
+                       help='Mount point, database or table name')
+    kind = fields.Selection([
+        ('mount', 'Filesystem'),
+        ('database', 'Database'),
+        ('table', 'Table'),
+    ], string='Kind', required=True, readonly=True, index=True)
+    roles = fields.Char(string='Holds', readonly=True, help='What the monitor found on this filesystem')
+    device = fields.Char(string='Device', readonly=True)
+    fstype = fields.Char(string='Filesystem Type', readonly=True)
+    size_gb = fields.Float(string='Used (GB)', readonly=True, digits=(16, 3))
+    total_gb = fields.Float(string='Size (GB)', readonly=True, digits=(16, 3))
+    percent = fields.Float(string='Used (%)', readonly=True)
+    growth_gb_day = fields.Float(string='Growth (GB/day)', readonly=True, digits=(16, 3),
+                                 help='Robust (Theil-Sen) trend over the forecast window')
+    days_to_full = fields.Float(string='Days to Full', readonly=True, digits=(16, 1))
+    full_date = fields.Datetime(string='Projected Full', readonly=True,
+                                help='Empty while the filesystem is not growing or the history is too short')
+    read_mb_s = fields.Float(string='Read (MB/s)', readonly=True, digits=(16, 3))
+    write_mb_s = fields.Float(string='Write (MB/s)', readonly=True, digits=(16, 3))
+    read_iops = fields.Float(string='Read IOPS', readonly=True, digits=(16, 1))
+    write_iops = fields.Float(string='Write IOPS', readonly=True, digits=(16, 1))
+    io_snapshot = fields.Text(string='I/O Counters Snapshot', readonly=True)
+    last_update = fields.Datetime(string='Last Update', readonly=True)
+    sample_ids = fields.One2many('erp.health.storage.sample', 'storage_id', string='History', readonly=True)
+
+    _sql_constraints = [
+        ('kind_name_unique', 'UNIQUE(kind, name)', 'Storage items are unique per kind and name.'),
+    ]
+
+    @api.model
+    def _get_param(self, key, default):
+        return float(self.env['ir.config_parameter'].sudo().get_param(
+            f'odoo_erp_health_monitor.{key}', default
+        ))
+
+    @api.model
+    def _pg_data_directory(self):
+        """Data directory of the PostgreSQL server when it runs on this host and the role may read it"""
+        dbname = self.env.cr.dbname
+        if dbname not in _DATA_DIRECTORIES:
+            data_directory = None
+            if tools.config.get('db_host') in (False, None, '', 'localhost', '127.0.0.1', '::1'):
+                try:
+                    with self.env.cr.savepoint():
+                        # Superuser or pg_read_all_settings only
+                        self.env.cr.execute('SHOW data_directory')
+                        data_directory = self.env.cr.fetchone()[0]
+                except Exception as e:
+                    _logger.info(f"PostgreSQL data directory not readable, its disk is not monitored: {e}")
+            _DATA_DIRECTORIES[dbname] = data_directory
+        return _DATA_DIRECTORIES[dbname]
+
+    @api.model
+    def _monitored_paths(self):
+        """{role: path} of the directories whose filesystems are monitored"""
+        paths = {'filestore': tools.config.filestore(self.env.cr.dbname)}
+        data_directory = self._pg_data_directory()
+        if data_directory:
+            paths['postgresql'] = data_directory
+        if tools.config.get('logfile'):
+            paths['logs'] = os.path.dirname(os.path.abspath(tools.config['logfile']))
+        paths['root'] = os.path.abspath(os.sep)
+
+        existing = {}
+        for role, path in paths.items():
+            # The filestore of a database without attachments does not exist yet
+            while path and not os.path.exists(path) and os.path.dirname(path) != path:
+                path = os.path.dirname(path)
+            if os.path.exists(path):
+                existing[role] = path
+        return existing
+
+    @api.model
+    def _upsert(self, kind, items, now):
+        """Create or update the `kind` records of {name: vals}; returns them"""
+        existing = {s.name: s for s in self.search([('kind', '=', kind), ('name', 'in', list(items))])}
+        records = self.browse()
+        new_vals = []
+        for name, vals in items.items():
+            vals = dict(vals, last_update=now)
+            if name in existing:
+                existing[name].write(vals)
+                records |= existing[name]
+            else:
+                new_vals.append(dict(vals, kind=kind, name=name))
+        return records | self.create(new_vals)
+
+    @api.model
+    def _collect_mounts(self, psutil, now):
+        """Usage and I/O rates of the filesystems holding the filestore, the database and the logs"""
+        mounts = system_sampler.discover_mounts(psutil, self._monitored_paths())
+        previous = {
+            s.name: s.io_snapshot
+            for s in self.search([('kind', '=', 'mount'), ('name', 'in', list(mounts))])
+        }
+        items = {}
+        for mountpoint, mount in mounts.items():
+            try:
+                usage = psutil.disk_usage(mountpoint)
+            except Exception as e:
+                _logger.warning(f"Could not get disk usage of {mountpoint}: {e}")
+                continue
+            vals = {
+                'roles': ', '.join(mount['roles']),
+                'device': mount['device'],
+                'fstype': mount['fstype'],
+                'size_gb': usage.used / GB,
+                'total_gb': usage.total / GB,
+                'percent': usage.percent,
+            }
+            if mount['disk']:
+                snapshot = system_sampler.disk_io_snapshot(psutil, [mount['disk']])
+                try:
+                    before = json.loads(previous.get(mountpoint) or 'null')
+                except ValueError:
+                    before = None
+                # Averaged since the previous run
+                rates = system_sampler.disk_io_rates(before, snapshot, mount['disk'])
+                vals.update(rates or {}, io_snapshot=json.dumps(snapshot))
+            items[mountpoint] = vals
+        return self._upsert('mount', items, now)
+
+    @api.model
+    def _collect_database_sizes(self, now):
+        """Size of this database and of its largest tables, indexes and TOAST included"""
+        self.env.cr.execute('SELECT current_database(), pg_database_size(current_database())')
+        dbname, size = self.env.cr.fetchone()
+        records = self._upsert('database', {dbname: {'size_gb': size / GB}}, now)
+
+        self.env.cr.execute("""
+            SELECT c.oid::regclass::text, pg_total_relation_size(c.oid)
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind IN ('r', 'm')
+              AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+              AND n.nspname NOT LIKE 'pg_toast%%'
+            ORDER BY 2 DESC
+            LIMIT %s
+        """, (TRACKED_TABLES,))
+        tables = {name: {'size_gb': size / GB} for name, size in self.env.cr.fetchall()}
+        return records | self._upsert('table', tables, now)
+
+    @api.model
+    def _forecast(self, records, now):
+        """Growth and time to full of each record from its history over the forecast window"""
+        days = self._get_param('storage_forecast_days', '30')
+        Sample = self.env['erp.health.storage.sample']
+        Sample.flush_model()
+        self.env.cr.execute("""
+            SELECT storage_id, EXTRACT(EPOCH FROM timestamp) / 86400, size_gb
+            FROM erp_health_storage_sample
+            WHERE storage_id IN %s AND timestamp >= %s
+            ORDER BY storage_id, timestamp
+        """, (tuple(records.ids), now - timedelta(days=days)))
+        history = {}
+        for storage_id, day, size in self.env.cr.fetchall():
+            history.setdefault(storage_id, []).append((float(day), float(size)))
+
+        for record in records:
+            points = history.get(record.id, [])
+            fit = forecast.theil_sen(points)
+            vals = {'growth_gb_day': fit[0] if fit else 0.0, 'days_to_full': 0.0, 'full_date': False}
+            if record.kind == 'mount' and record.total_gb:
+                days_left = forecast.time_to_reach(points, record.total_gb)
+                if days_left is not None:
+                    vals['days_to_full'] = days_left
+                    vals['full_date'] = now + timedelta(days=min(days_left, 36500))
+            record.write(vals)
+
+    @api.model
+    def collect_storage(self):
+        """Hourly: filesystem usage and I/O, database and table sizes, and their time-to-full forecast"""
+        with self.env['erp.health.collector.run']._track('collect_storage') as run:
+            try:
+                now = fields.Datetime.now()
+                records = self.browse()
+                try:
+                    import psutil
+                    records |= self._collect_mounts(psutil, now)
+                except ImportError as e:
+                    _logger.error(f"psutil not installed, filesystems are not monitored: {e}")
+                records |= self._collect_database_sizes(now)
+
+                Sample = self.env['erp.health.storage.sample']
+                Sample._bulk_insert([{
+                    'storage_id': record.id,
+                    'timestamp': now,
+                    'size_gb': record.size_gb,
+                    'total_gb': record.total_gb,
+                } for record in records])
+                self._forecast(records, now)
+
+                Sample._prune_history(now - timedelta(days=self._get_param('storage_history_days', '180')))
+                run['rows_written'] = 2 * len(records)
+                self._notify_collected()
+
+                soonest = records.filtered('full_date').sorted('full_date')[:1]
+                if soonest:
+                    _logger.info(
+                        f"Storage collected: {len(records)} items, {soonest.name} full in "
+                        f"{soonest.days_to_full:.0f} days"
+                    )
+                return records
+
+            except Exception as e:
+                run['error'] = str(e)
+                _logger.error(f"Error collecting storage usage: {e}")
+                return False
+
+    def action_view_history(self):
+        """Open the size history of this item"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f'Size History: {self.name}',
+            'res_model': 'erp.health.storage.sample',
+            'view_mode': 'graph,list',
+            'domain': [('storage_id', '=', self.id)],
+            'target': 'current',
+        }
+
+
+class ErpHealthStorageSample(models.Model):
+    _name = 'erp.health.storage.sample'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'Storage Size History'
+    _order = 'timestamp desc'
+    _rec_name = 'timestamp'
+
+    storage_id = fields.Many2one('erp.health.storage', string='Item', required=True, readonly=True,
+                                 ondelete='cascade', index=True)
+    kind = fields.Selection(related='storage_id.kind')
+    timestamp = fields.Datetime(string='Timestamp', readonly=True, index=True)
+    size_gb = fields.Float(string='Used (GB)', readonly=True, digits=(16, 3), aggregator='max')
+    total_gb = fields.Float(string='Size (GB)', readonly=True, digits=(16, 3), aggregator='max')
+
+    @api.model
+    def _prune_history(self, cutoff):
+        """Drop samples older than `cutoff`"""
+        self.flush_model()
+        self.env.cr.execute(f'DELETE FROM "{self._table}" WHERE timestamp < %s', (cutoff,))
+        pruned = self.env.cr.rowcount
+        if pruned:
+            self.invalidate_model()
+        return pruned
@@ -0,0 +1,302 @@
+from odoo import models, fields, api
+import logging
+
+from ..tools import table_health
+
+_logger = logging.getLogger(__name__)
+
+MB = 1024 ** 2
+
+# Cumulative counters kept as delta base, reset together with the statistics
+TABLE_COUNTERS = ['seq_scan', 'seq_tup_read', 'idx_scan', 'n_tup_ins', 'n_tup_upd', 'n_tup_del',
+                  'heap_blks_read', 'heap_blks_hit', 'idx_blks_read', 'idx_blks_hit']
+INDEX_COUNTERS = ['idx_scan', 'idx_blks_read', 'idx_blks_hit']
+
+# Autovacuum triggers from the server settings; per-table storage parameters are not looked at
+TABLES_QUERY = """
+    SELECT
+        s.relid,
+        s.relid::regclass::text AS name,
+        s.seq_scan, s.seq_tup_read, COALESCE(s.idx_scan, 0) AS idx_scan,
+        s.n_tup_ins, s.n_tup_upd, s.n_tup_del,
+        s.n_live_tup, s.n_dead_tup, s.n_mod_since_analyze,
+        GREATEST(s.last_vacuum, s.last_autovacuum) AT TIME ZONE 'UTC' AS last_vacuum,
+        GREATEST(s.last_analyze, s.last_autoanalyze) AT TIME ZONE 'UTC' AS last_analyze,
+        COALESCE(io.heap_blks_read, 0) AS heap_blks_read, COALESCE(io.heap_blks_hit, 0) AS heap_blks_hit,
+        COALESCE(io.idx_blks_read, 0) AS idx_blks_read, COALESCE(io.idx_blks_hit, 0) AS idx_blks_hit,
+        pg_relation_size(s.relid) AS table_bytes,
+        pg_total_relation_size(s.relid) AS total_bytes,
+        current_setting('autovacuum_vacuum_threshold')::float8
+            + current_setting('autovacuum_vacuum_scale_factor')::float8 * GREATEST(c.reltuples, 0) AS vacuum_trigger,
+        current_setting('autovacuum_analyze_threshold')::float8
+            + current_setting('autovacuum_analyze_scale_factor')::float8 * GREATEST(c.reltuples, 0) AS analyze_trigger
+    FROM pg_stat_user_tables s
+    JOIN pg_class c ON c.oid = s.relid
+    LEFT JOIN pg_statio_user_tables io ON io.relid = s.relid
+"""
+
+INDEXES_QUERY = """
+    SELECT
+        s.indexrelid,
+        s.relid,
+        s.indexrelid::regclass::text AS name,
+        s.idx_scan,
+        COALESCE(io.idx_blks_read, 0) AS idx_blks_read, COALESCE(io.idx_blks_hit, 0) AS idx_blks_hit,
+        pg_relation_size(s.indexrelid) AS index_bytes,
+        i.indisunique AS is_unique,
+        i.indisprimary AS is_primary
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    LEFT JOIN pg_statio_user_indexes io ON io.indexrelid = s.indexrelid
+"""
+
+
+def _counter_deltas(previous, row, counters):
+    """Counter increments since `previous`; zero without a previous snapshot, the counters after a reset"""
+    if previous is None:
+        return {name: 0 for name in counters}
+    if any(row[name] < previous[name] for name in counters):
+        return {name: row[name] for name in counters}
+    return {name: row[name] - previous[name] for name in counters}
+
+
+def _percent(part, whole, empty=0.0):
+    value = table_health.ratio(part, whole)
+    return round(100 * value, 1) if value is not None else empty
+
+
+class ErpHealthTableStats(models.Model):
+    _name = 'erp.health.table.stats'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'Table Health'
+    _order = 'attention_score desc, total_size_mb desc'
+
+    relid = fields.Integer(string='Table OID', required=True, readonly=True, index=True)
+    name = fields.Char(string='Table', readonly=True)
+    snapshot_at = fields.Datetime(string='Snapshot', readonly=True)
+    window_hours = fields.Float(string='Window (h)', readonly=True, digits=(16, 1),
+                                help='Time covered by the deltas, since the previous snapshot')
+
+    # Last cumulative counters read from pg_stat_user_tables / pg_statio_user_tables, used as delta base
+    seq_scan = fields.Float(string='Seq Scans (cumulative)', digits=(20, 0), readonly=True)
+    seq_tup_read = fields.Float(string='Seq Rows Read (cumulative)', digits=(20, 0), readonly=True)
+    idx_scan = fields.Float(string='Index Scans (cumulative)', digits=(20, 0), readonly=True)
+    n_tup_ins = fields.Float(string='Inserts (cumulative)', digits=(20, 0), readonly=True)
+    n_tup_upd = fields.Float(string='Updates (cumulative)', digits=(20, 0), readonly=True)
+    n_tup_del = fields.Float(string='Deletes (cumulative)', digits=(20, 0), readonly=True)
+    heap_blks_read = fields.Float(string='Heap Reads (cumulative)', digits=(20, 0), readonly=True)
+    heap_blks_hit = fields.Float(string='Heap Hits (cumulative)', digits=(20, 0), readonly=True)
+    idx_blks_read = fields.Float(string='Index Reads (cumulative)', digits=(20, 0), readonly=True)
+    idx_blks_hit = fields.Float(string='Index Hits (cumulative)', digits=(20, 0), readonly=True)
+
+    # Over the window
+    seq_scan_delta = fields.Float(string='Seq Scans', readonly=True, digits=(20, 0))
+    idx_scan_delta = fields.Float(string='Index Scans', readonly=True, digits=(20, 0))
+    seq_tup_read_delta = fields.Float(string='Rows Read Sequentially', readonly=True, digits=(20, 0))
+    writes_delta = fields.Float(string='Rows Written', readonly=True, digits=(20, 0))
+    seq_scan_percent = fields.Float(string='Seq Scan %', readonly=True, aggregator='avg')
+    cache_hit_percent = fields.Float(string='Cache Hit %', readonly=True, aggregator='avg',
+                                     help='Heap and index buffer hits, 100 when nothing was read')
+
+    # As of the snapshot
+    n_live_tup = fields.Float(string='Live Rows', digits=(20, 0), readonly=True)
+    n_dead_tup = fields.Float(string='Dead Rows', digits=(20, 0), readonly=True)
+    dead_tuple_percent = fields.Float(string='Dead Rows %', readonly=True, aggregator='avg')
+    n_mod_since_analyze = fields.Float(string='Changed Since Analyze', digits=(20, 0), readonly=True)
+    last_vacuum = fields.Datetime(string='Last Vacuum', readonly=True, help='Manual or automatic')
+    last_analyze = fields.Datetime(string='Last Analyze', readonly=True, help='Manual or automatic')
+    vacuum_age_days = fields.Float(string='Days Since Vacuum', readonly=True, digits=(16, 1))
+    analyze_age_days = fields.Float(string='Days Since Analyze', readonly=True, digits=(16, 1))
+    table_size_mb = fields.Float(string='Table Size (MB)', readonly=True, digits=(16, 1), aggregator='sum')
+    total_size_mb = fields.Float(string='Total Size (MB)', readonly=True, digits=(16, 1), aggregator='sum',
+                                 help='Including indexes and TOAST')
+    unused_index_count = fields.Integer(string='Unused Indexes', readonly=True)
+
+    attention_score = fields.Float(string='Attention Score', readonly=True, digits=(16, 1), index=True)
+    issues = fields.Text(string='Issues', readonly=True)
+    index_ids = fields.One2many('erp.health.index.stats', 'table_id', string='Indexes', readonly=True)
+
+    _sql_constraints = [
+        ('relid_unique', 'UNIQUE(relid)', 'A table is tracked once.'),
+    ]
+
+    @api.model
+    def _table_vals(self, row, previous, indexes, now):
+        """Stored values of one pg_stat_user_tables row, with its deltas and its assessment"""
+        delta = _counter_deltas(previous, row, TABLE_COUNTERS)
+        unused = [index for index in indexes if index['is_unused']]
+        figures = {
+            'n_live_tup': row['n_live_tup'],
+            'n_dead_tup': row['n_dead_tup'],
+            'n_mod_since_analyze': row['n_mod_since_analyze'] or 0,
+            'vacuum_trigger': row['vacuum_trigger'],
+            'analyze_trigger': row['analyze_trigger'],
+            'table_bytes': row['table_bytes'],
+            'total_bytes': row['total_bytes'],
+            'vacuum_age_days': (now - row['last_vacuum']).total_seconds() / 86400 if row['last_vacuum'] else None,
+            'unused_indexes': len(unused),
+            'unused_index_bytes': sum(index['index_bytes'] for index in unused),
+            'seq_scan': delta['seq_scan'],
+            'idx_scan': delta['idx_scan'],
+            'writes': delta['n_tup_ins'] + delta['n_tup_upd'] + delta['n_tup_del'],
+            'blks_hit': delta['heap_blks_hit'] + delta['idx_blks_hit'],
+            'blks_read': delta['heap_blks_read'] + delta['idx_blks_read'],
+        }
+        score, issues = table_health.assess(figures)
+
+        vals = {name: row[name] for name in TABLE_COUNTERS}
+        vals.update({
+            'name': row['name'],
+            'snapshot_at': now,
+            'window_hours': (now - previous.snapshot_at).total_seconds() / 3600
+            if previous and previous.snapshot_at else 0.0,
+            'seq_scan_delta': delta['seq_scan'],
+            'idx_scan_delta': delta['idx_scan'],
+            'seq_tup_read_delta': delta['seq_tup_read'],
+            'writes_delta': figures['writes'],
+            'seq_scan_percent': _percent(delta['seq_scan'], delta['seq_scan'] + delta['idx_scan']),
+            'cache_hit_percent': _percent(figures['blks_hit'], figures['blks_hit'] + figures['blks_read'], 100.0),
+            'n_live_tup': row['n_live_tup'],
+            'n_dead_tup': row['n_dead_tup'],
+            'dead_tuple_percent': _percent(row['n_dead_tup'], row['n_live_tup'] + row['n_dead_tup']),
+            'n_mod_since_analyze': figures['n_mod_since_analyze'],
+            'last_vacuum': row['last_vacuum'],
+            'last_analyze': row['last_analyze'],
+            'vacuum_age_days': figures['vacuum_age_days'] or 0.0,
+            'analyze_age_days': (now - row['last_analyze']).total_seconds() / 86400 if row['last_analyze'] else 0.0,
+            'table_size_mb': row['table_bytes'] / MB,
+            'total_size_mb': row['total_bytes'] / MB,
+            'unused_index_count': len(unused),
+            'attention_score': score,
+            'issues': '\n'.join(issues) or False,
+        })
+        return vals
+
+    @api.model
+    def collect_table_health(self):
+        """Snapshot the table and index statistics, compute their deltas and rank the tables needing attention"""
+        with self.env['erp.health.collector.run']._track('collect_table_health') as run:
+            now = fields.Datetime.now()
+            self.env.cr.execute(TABLES_QUERY)
+            tables = self.env.cr.dictfetchall()
+            self.env.cr.execute(INDEXES_QUERY)
+            indexes = self.env.cr.dictfetchall()
+
+            # Unused since the statistics were reset; unique indexes enforce constraints whatever their scans
+            indexes_by_table = {}
+            for index in indexes:
+                index['is_unused'] = not index['idx_scan'] and not index['is_unique'] and not index['is_primary']
+                indexes_by_table.setdefault(index['relid'], []).append(index)
+
+            self.flush_model()
+            previous = {rec.relid: rec for rec in self.search([])}
+            table_ids = {}
+            new_vals = []
+            updates = []
+            for row in tables:
+                prev = previous.pop(row['relid'], None)
+                vals = self._table_vals(row, prev, indexes_by_table.get(row['relid'], []), now)
+                if prev:
+                    table_ids[row['relid']] = prev.id
+                    updates.append((prev.id, vals))
+                else:
+                    new_vals.append(dict(vals, relid=row['relid']))
+
+            created = self._bulk_insert(new_vals)
+            table_ids.update(zip((vals['relid'] for vals in new_vals), created.ids))
+            if updates:
+                self._bulk_update(updates, list(updates[0][1]))
+            # Dropped tables, their indexes cascade
+            dropped = self.browse([rec.id for rec in previous.values()])
+            dropped.unlink()
+
+            written = self.env['erp.health.index.stats']._store_snapshot(indexes, table_ids, now)
+            run['rows_written'] = len(new_vals) + len(updates) + len(dropped) + written
+
+            attention = self.search([('attention_score', '>', 0)])
+            _logger.info(
+                f"Table health snapshot: {len(tables)} tables, {len(indexes)} indexes, "
+                f"{len(attention)} needing attention" + (f", worst {attention[0].name}" if attention else '')
+            )
+            self._notify_collected()
+            return {'tables': len(tables), 'indexes': len(indexes)}
+
+    def action_view_indexes(self):
+        """Open the indexes of this table"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f'Indexes of {self.name}',
+            'res_model': 'erp.health.index.stats',
+            'view_mode': 'list',
+            'domain': [('table_id', '=', self.id)],
+            'target': 'current',
+        }
+
+
+class ErpHealthIndexStats(models.Model):
+    _name = 'erp.health.index.stats'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'Index Usage'
+    _order = 'is_unused desc, size_mb desc'
+
+    indexrelid = fields.Integer(string='Index OID', required=True, readonly=True, index=True)
+    table_id = fields.Many2one('erp.health.table.stats', string='Table', required=True, readonly=True,
+                               ondelete='cascade', index=True)
+    name = fields.Char(string='Index', readonly=True)
+    is_unique = fields.Boolean(string='Unique', readonly=True)
+    is_primary = fields.Boolean(string='Primary Key', readonly=True)
+    size_mb = fields.Float(string='Size (MB)', readonly=True, digits=(16, 1), aggregator='sum')
+    snapshot_at = fields.Datetime(string='Snapshot', readonly=True)
+
+    # Last cumulative counters read from pg_stat_user_indexes / pg_statio_user_indexes, used as delta base
+    idx_scan = fields.Float(string='Scans (cumulative)', digits=(20, 0), readonly=True)
+    idx_blks_read = fields.Float(string='Reads (cumulative)', digits=(20, 0), readonly=True)
+    idx_blks_hit = fields.Float(string='Hits (cumulative)', digits=(20, 0), readonly=True)
+
+    idx_scan_delta = fields.Float(string='Scans', digits=(20, 0), readonly=True,
+                                  help='Since the previous snapshot')
+    cache_hit_percent = fields.Float(string='Cache Hit %', readonly=True, aggregator='avg')
+    is_unused = fields.Boolean(string='Unused', readonly=True, index=True,
+                               help='Never scanned since the statistics were reset, and enforces no constraint')
+
+    _sql_constraints = [
+        ('indexrelid_unique', 'UNIQUE(indexrelid)', 'An index is tracked once.'),
+    ]
+
+    @api.model
+    def _store_snapshot(self, indexes, table_ids, now):
+        """Upsert the pg_stat_user_indexes rows, drop the indexes that no longer exist; returns rows written"""
+        self.flush_model()
+        previous = {rec.indexrelid: rec for rec in self.search([])}
+        new_vals = []
+        updates = []
+        for row in indexes:
+            if row['relid'] not in table_ids:
+                continue
+            prev = previous.pop(row['indexrelid'], None)
+            delta = _counter_deltas(prev, row, INDEX_COUNTERS)
+            vals = {name: row[name] for name in INDEX_COUNTERS}
+            vals.update({
+                'table_id': table_ids[row['relid']],
+                'name': row['name'],
+                'is_unique': row['is_unique'],
+                'is_primary': row['is_primary'],
+                'size_mb': row['index_bytes'] / MB,
+                'snapshot_at': now,
+                'idx_scan_delta': delta['idx_scan'],
+                'cache_hit_percent': _percent(delta['idx_blks_hit'],
+                                              delta['idx_blks_hit'] + delta['idx_blks_read'], 100.0),
+                'is_unused': row['is_unused'],
+            })
+            if prev:
+                updates.append((prev.id, vals))
+            else:
+                new_vals.append(dict(vals, indexrelid=row['indexrelid']))
+
+        self._bulk_insert(new_vals)
+        if updates:
+            self._bulk_update(updates, list(updates[0][1]))
+        dropped = self.browse([rec.id for rec in previous.values()])
+        dropped.unlink()
+        return len(new_vals) + len(updates) + len(dropped)
@@ -0,0 +1,132 @@
+from odoo import models, fields, api, tools
+import os
+import time
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class ErpHealthWorkerMetrics(models.Model):
+    _name = 'erp.health.worker.metrics'
+    _inherit = ['erp.health.ingest.mixin']
+    _description = 'Odoo Worker Process Metrics'
+    _order = 'timestamp desc, rss_mb desc'
+
+    # Plain id rather than a Many2one: server metrics may be partitioned, and a partitioned
+    # table cannot be referenced by a foreign key. Pruned samples take their rows along
+    # through _prune_orphans().
+    metrics_id = fields.Integer(string='Server Sample ID', readonly=True, required=True, index=True)
+    timestamp = fields.Datetime(string='Timestamp', readonly=True, index=True)
+    pid = fields.Integer(string='Process ID', readonly=True)
+    worker_type = fields.Selection([
+        ('master', 'Master'),
+        ('http', 'HTTP Worker'),
+        ('cron', 'Cron Worker'),
+        ('gevent', 'Gevent / Websocket'),
+        ('worker', 'Worker'),
+    ], string='Type', readonly=True)
+    rss_mb = fields.Float(string='RSS (MB)', readonly=True, aggregator='max')
+    memory_limit_percent = fields.Float(string='Soft Limit Used (%)', readonly=True, aggregator='max',
+                                        help='RSS as a share of limit_memory_soft; workers are recycled at 100%')
+    cpu_time = fields.Float(string='CPU Time (s)', readonly=True, aggregator='max',
+                            help='User + system CPU time since the process started')
+    cpu_time_delta = fields.Float(string='CPU Time Since Last Sample (s)', readonly=True)
+    num_fds = fields.Integer(string='Open Files', readonly=True)
+    num_threads = fields.Integer(string='Threads', readonly=True)
+    process_start = fields.Float(string='Process Start (epoch)', readonly=True)
+    age_seconds = fields.Float(string='Age (s)', readonly=True)
+
+    def init(self):
+        # Left over from when metrics_id was a Many2one
+        self.env.cr.execute(
+            f'ALTER TABLE "{self._table}" DROP CONSTRAINT IF EXISTS "{self._table}_metrics_id_fkey"'
+        )
+
+    @api.model
+    def _prune_orphans(self):
+        """Delete the rows of server metrics samples that no longer exist"""
+        self.env['erp.health.server.metrics'].flush_model()
+        self.flush_model()
+        # Samples are pruned oldest first, so the survivors all have ids above the smallest one
+        self.env.cr.execute(f"""
+            DELETE FROM "{self._table}"
+            WHERE metrics_id < (SELECT COALESCE(MIN(id), 2147483647) FROM erp_health_server_metrics)
+        """)
+        pruned = self.env.cr.rowcount
+        if pruned:
+            self.invalidate_model()
+        return pruned
+
+    @api.model
+    def _find_odoo_processes(self, psutil):
+        """Return (master, processes) for the Odoo server this worker belongs to"""
+        me = psutil.Process()
+        master = me
+        if tools.config.get('workers'):
+            # Prefork: HTTP/cron workers and the gevent process are children of the master
+            master = me.parent() or me
+        try:
+            children = master.children()
+        except psutil.Error:
+            children = []
+        return master, [master] + children
+
+    @api.model
+    def _classify_process(self, proc, master):
+        """Guess the worker type from the process title set by Odoo (needs setproctitle)"""
+        if proc.pid == master.pid:
+            return 'master'
+        title = ' '.join(proc.cmdline())
+        if 'gevent' in title:
+            return 'gevent'
+        if 'WorkerCron' in title:
+            return 'cron'
+        if 'WorkerHTTP' in title:
+            return 'http'
+        return 'worker'
+
+    @api.model
+    def _collect_worker_metrics(self, sample):
+        """Store one row per Odoo process for the given server metrics sample"""
+        import psutil
+
+        master, processes = self._find_odoo_processes(psutil)
+        limit_soft = tools.config.get('limit_memory_soft') or 0
+
+        # CPU time of each process at the previous sample, keyed by (pid, start time)
+        self.flush_model()
+        self.env.cr.execute(f"""
+            SELECT pid, process_start, cpu_time FROM "{self._table}"
+            WHERE metrics_id = (SELECT MAX(metrics_id) FROM "{self._table}")
+        """)
+        previous = {(pid, start): cpu for pid, start, cpu in self.env.cr.fetchall()}
+
+        now = time.time()
+        vals_list = []
+        for proc in processes:
+            try:
+                with proc.oneshot():
+                    memory = proc.memory_info()
+                    cpu_times = proc.cpu_times()
+                    start = proc.create_time()
+                    cpu_time = cpu_times.user + cpu_times.system
+                    num_fds = proc.num_fds() if os.name == 'posix' else proc.num_handles()
+                    vals_list.append({
+                        'metrics_id': sample.id,
+                        'timestamp': sample.timestamp,
+                        'pid': proc.pid,
+                        'worker_type': self._classify_process(proc, master),
+                        'rss_mb': memory.rss / (1024 ** 2),
+                        'memory_limit_percent': 100.0 * memory.rss / limit_soft if limit_soft else 0.0,
+                        'cpu_time': cpu_time,
+                        'cpu_time_delta': cpu_time - previous.get((proc.pid, start), cpu_time),
+                        'num_fds': num_fds,
+                        'num_threads': proc.num_threads(),
+                        'process_start': start,
+                        'age_seconds': now - start,
+                    })
+            except psutil.Error:
+                # Process exited (or is not ours to inspect) while we were looking
+                continue
+
+        return self._bulk_insert(vals_list)
@@ -0,0 +1,58 @@
+/** @odoo-module **/
+
+import { Component, onWillStart, onWillUnmount, useState } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+
+// Must match LIVE_CHANNEL in models/dashboard.py
+const CHANNEL = "erp_health_dashboard";
+const NOTIFICATION = "erp_health_stats";
+
+const STATUS_CLASSES = {
+    good: "text-success",
+    warning: "text-warning",
+    critical: "text-danger",
+};
+
+export class LiveDashboard extends Component {
+    static template = "odoo_erp_health_monitor.LiveDashboard";
+    static props = ["*"];
+
+    setup() {
+        this.orm = useService("orm");
+        this.action = useService("action");
+        this.busService = useService("bus_service");
+        this.state = useState({ stats: {}, receivedAt: null });
+        // Collectors only send the stats they changed: patch them in place
+        this.onStats = (payload) => this.applyStats(payload);
+
+        onWillStart(async () => {
+            this.applyStats(await this.orm.call("erp.health.dashboard", "get_live_stats", []));
+            this.busService.addChannel(CHANNEL);
+            this.busService.subscribe(NOTIFICATION, this.onStats);
+        });
+        onWillUnmount(() => {
+            this.busService.unsubscribe(NOTIFICATION, this.onStats);
+            this.busService.deleteChannel(CHANNEL);
+        });
+    }
+
+    applyStats(payload) {
+        Object.assign(this.state.stats, payload);
+        this.state.receivedAt = new Date().toLocaleTimeString();
+    }
+
+    statusClass(status) {
+        return STATUS_CLASSES[status] || "text-muted";
+    }
+
+    format(value, digits = 1) {
+        return (value || 0).toFixed(digits);
+    }
+
+    open(xmlId) {
+        this.action.doAction(`odoo_erp_health_monitor.${xmlId}`);
+    }
+}
+
+registry.category("actions").add("erp_health_live_dashboard", LiveDashboard);
@@ -0,0 +1,2 @@
+# Pure-Python helpers shared by the models and the standalone scripts.
+# Nothing in this package may import odoo.
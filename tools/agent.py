@@ -0,0 +1,157 @@
+"""Standalone ERP health collector, independent of Odoo workers
+
+Samples the host with psutil and, given a DSN, pg_stat_activity / pg_locks,
+and appends one record per tick to a local spool file. The "Import Agent
+Spool" cron of the module bulk-loads the spool into the monitoring models,
+so samples keep being taken while Odoo is too overloaded to run its crons.
+
+    python3 odoo_erp_health_monitor/tools/agent.py \\
+        --spool /var/lib/odoo/erp_health_agent.spool \\
+        --dsn "dbname=odoo user=odoo" --interval 60
+
+Only psutil is required; psycopg2 is needed for the PostgreSQL samples.
+"""
+import argparse
+import logging
+import signal
+import time
+from datetime import datetime, timezone
+
+try:
+    from . import spool, system_sampler
+except ImportError:
+    # Run as a script
+    import spool
+    import system_sampler
+
+_logger = logging.getLogger('erp_health_agent')
+
+SLOW_QUERIES_SQL = """
+    SELECT
+        pid,
+        usename AS db_user,
+        datname,
+        state,
+        LEFT(query, 5000) AS query,
+        EXTRACT(EPOCH FROM (now() - query_start))::float8 AS duration,
+        query_start AT TIME ZONE 'UTC' AS query_start
+    FROM pg_stat_activity
+    WHERE state = 'active'
+      AND pid <> pg_backend_pid()
+      AND EXTRACT(EPOCH FROM (now() - query_start)) > %s
+    ORDER BY duration DESC
+    LIMIT 50
+"""
+
+LOCKS_SQL = """
+    SELECT
+        l.pid,
+        l.locktype AS lock_type,
+        COALESCE(l.relation::regclass::text, 'N/A') AS relation,
+        l.mode,
+        LEFT(a.query, 5000) AS query,
+        COALESCE(EXTRACT(EPOCH FROM (now() - a.query_start)), 0)::float8 AS wait_time
+    FROM pg_locks l
+    LEFT JOIN pg_stat_activity a ON l.pid = a.pid
+    WHERE NOT l.granted
+      AND a.query IS NOT NULL
+    ORDER BY wait_time DESC
+    LIMIT 50
+"""
+
+
+class Agent:
+    def __init__(self, args):
+        import psutil
+        self.psutil = psutil
+        self.args = args
+        self.cpu_snapshot = None
+        self.connection = None
+        self.running = True
+
+    def _connect(self):
+        import psycopg2
+        connection = psycopg2.connect(self.args.dsn, application_name='erp_health_agent')
+        connection.autocommit = True
+        with connection.cursor() as cr:
+            # Never pile up on an overloaded server
+            cr.execute("SET statement_timeout = '5s'")
+        return connection
+
+    def _fetch(self, cr, query, params=()):
+        cr.execute(query, params)
+        columns = [column.name for column in cr.description]
+        return [dict(zip(columns, row)) for row in cr.fetchall()]
+
+    def sample_postgres(self):
+        """Slow queries and lock waits, or nothing when the database cannot be reached"""
+        try:
+            if self.connection is None or self.connection.closed:
+                self.connection = self._connect()
+            with self.connection.cursor() as cr:
+                slow_queries = self._fetch(cr, SLOW_QUERIES_SQL, (self.args.slow_query_threshold,))
+                locks = self._fetch(cr, LOCKS_SQL)
+            for row in slow_queries:
+                # Sightings are matched on (pid, query_start): keep the microseconds
+                row['query_start'] = row['query_start'].isoformat(sep=' ', timespec='microseconds')
+            return {'slow_queries': slow_queries, 'locks': locks}
+        except Exception as e:
+            _logger.warning(f"PostgreSQL sample failed: {e}")
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            return {}
+
+    def sample(self):
+        """One spool record for this tick"""
+        record = {'at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}
+        host, self.cpu_snapshot = system_sampler.host_sample(self.psutil, self.cpu_snapshot, self.args.disk)
+        record['server_metrics'] = host
+        if self.args.dsn:
+            record.update(self.sample_postgres())
+        return record
+
+    def run(self):
+        while self.running:
+            started = time.monotonic()
+            try:
+                record = self.sample()
+                if not spool.append(self.args.spool, [record], self.args.max_bytes):
+                    _logger.warning(f"Spool {self.args.spool} is full, sample dropped; is the import cron running?")
+            except Exception as e:
+                _logger.exception(f"Sample failed: {e}")
+            if self.args.once:
+                break
+            # Fixed rate, whatever the time spent sampling
+            deadline = started + self.args.interval
+            while self.running and time.monotonic() < deadline:
+                time.sleep(min(1.0, deadline - time.monotonic()))
+
+    def stop(self, *_args):
+        self.running = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ERP health monitor collector agent')
+    parser.add_argument('--spool', required=True, help='spool file read by the Import Agent Spool cron')
+    parser.add_argument('--dsn', help='libpq connection string of the Odoo database server')
+    parser.add_argument('--interval', type=float, default=60.0, help='seconds between samples')
+    parser.add_argument('--disk', action='append',
+                        help='path whose disk usage is sampled, repeat per mount; the fullest is reported (default /)')
+    parser.add_argument('--slow-query-threshold', type=float, default=2.0, help='seconds')
+    parser.add_argument('--max-bytes', type=int, default=64 * 1024 * 1024,
+                        help='stop appending when the spool reaches this size')
+    parser.add_argument('--once', action='store_true', help='take a single sample and exit')
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args(argv)
+    args.disk = tuple(args.disk or ('/',))
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    agent = Agent(args)
+    signal.signal(signal.SIGTERM, agent.stop)
+    signal.signal(signal.SIGINT, agent.stop)
+    agent.run()
+
+
+if __name__ == '__main__':
+    main()
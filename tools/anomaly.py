@@ -0,0 +1,54 @@
+"""Incremental robust baselines for metric streams
+
+A baseline is (count, mean, mad): an exponentially weighted mean and mean
+absolute deviation, updated in O(1) per sample. A sample is scored like a
+z-score against it, the MAD being scaled to a standard deviation. Once warm,
+samples are clipped before they update the baseline, so one spike barely
+moves it while a lasting shift is still learnt within tens of samples.
+"""
+
+# Mean absolute deviation times this is the standard deviation of a normal distribution
+MAD_SCALE = 1.2533
+# Weight of a new sample once warm
+DEFAULT_ALPHA = 0.05
+# Samples before a baseline is trusted
+MIN_SAMPLES = 30
+# Deviation (in scores) beyond which samples are clipped when updating
+CLIP = 4.0
+
+EMPTY = (0, 0.0, 0.0)
+
+
+def _scale(baseline, min_scale):
+    return max(baseline[2] * MAD_SCALE, min_scale)
+
+
+def is_warm(baseline):
+    return baseline[0] >= MIN_SAMPLES
+
+
+def score(baseline, value, min_scale=1.0):
+    """Deviation of `value` in standard deviations, None while the baseline is warming up
+
+    `min_scale` floors the deviation so a flat series does not flag noise.
+    """
+    if not is_warm(baseline):
+        return None
+    return (value - baseline[1]) / _scale(baseline, min_scale)
+
+
+def update(baseline, value, alpha=DEFAULT_ALPHA, min_scale=1.0):
+    """Baseline after observing `value`"""
+    count, mean, mad = baseline
+    if not count:
+        return 1, float(value), 0.0
+    if is_warm(baseline):
+        limit = CLIP * _scale(baseline, min_scale)
+        value = min(max(value, mean - limit), mean + limit)
+    else:
+        # Plain running averages while warming up
+        alpha = max(alpha, 1.0 / (count + 1))
+    deviation = abs(value - mean)
+    mean += alpha * (value - mean)
+    mad += alpha * (deviation - mad)
+    return count + 1, mean, mad
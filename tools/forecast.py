@@ -0,0 +1,49 @@
+"""Robust linear trends for capacity forecasting
+
+The Theil-Sen estimator takes the median of the slopes between every pair of
+points, so a one-off purge or a bulk import bends the trend far less than it
+would a least-squares fit.
+"""
+import statistics
+
+# Points are thinned evenly beyond this, the pairs grow with its square
+MAX_POINTS = 200
+# Fewer points give no trend worth projecting
+MIN_POINTS = 12
+
+
+def _thin(points):
+    if len(points) <= MAX_POINTS:
+        return points
+    step = (len(points) - 1) / (MAX_POINTS - 1)
+    return [points[round(i * step)] for i in range(MAX_POINTS)]
+
+
+def theil_sen(points):
+    """(slope, intercept) of [(x, y), ...] sorted by x, None without MIN_POINTS points over distinct x"""
+    if len(points) < MIN_POINTS:
+        return None
+    points = _thin(points)
+    slopes = [
+        (y2 - y1) / (x2 - x1)
+        for i, (x1, y1) in enumerate(points)
+        for x2, y2 in points[i + 1:]
+        if x2 != x1
+    ]
+    if not slopes:
+        return None
+    slope = statistics.median(slopes)
+    intercept = statistics.median(y - slope * x for x, y in points)
+    return slope, intercept
+
+
+def time_to_reach(points, limit):
+    """x distance from the last point until the trend reaches `limit`
+
+    None when there is no trend or it does not grow; 0 when the limit is already passed.
+    """
+    fit = theil_sen(points)
+    if fit is None or fit[0] <= 0:
+        return None
+    slope, intercept = fit
+    return max((limit - intercept) / slope - points[-1][0], 0.0)
@@ -0,0 +1,40 @@
+"""Health levels shared by the dashboard and the adaptive sampler
+
+Each signal has (warning, critical) thresholds: below the first it is good.
+Once a metric has a warm baseline its level comes from its anomaly score
+instead, so a server that always runs hot is not permanently critical.
+"""
+
+LEVELS = ('good', 'warning', 'critical')
+
+THRESHOLDS = {
+    'cpu': (60, 80),
+    'ram': (70, 85),
+    'disk': (75, 90),
+    # Ungranted locks seen in one sample
+    'lock_waits': (1, 5),
+    # Standard deviations above the metric's baseline for its hour of day
+    'anomaly': (3, 5),
+}
+
+
+def classify(signal, value):
+    warning, critical = THRESHOLDS[signal]
+    if value < warning:
+        return 'good'
+    if value < critical:
+        return 'warning'
+    return 'critical'
+
+
+def metric_level(signal, value, score=None):
+    """Level of a metric sample: from its anomaly score when there is one, else from the fixed thresholds"""
+    if score is not None:
+        # Only running above the usual level is a problem
+        return classify('anomaly', max(score, 0.0))
+    return classify(signal, value)
+
+
+def worst(levels):
+    """Most severe of the given levels, good when there are none"""
+    return max(levels, key=LEVELS.index, default='good')
@@ -0,0 +1,114 @@
+"""Analyse a lock wait graph given as (blocker, waiter) edges from pg_blocking_pids()
+
+Roots are blockers that are not waiting themselves: the sessions to act on.
+Depth is the longest chain from a root down to a waiter. Sessions waiting on
+each other in a loop form a cycle, which is treated as a root of its own.
+"""
+from collections import defaultdict
+
+
+def _strongly_connected(nodes, successors):
+    """Tarjan's algorithm, iterative so long chains cannot hit the recursion limit"""
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for start in nodes:
+        if start in index:
+            continue
+        work = [(start, iter(successors[start]))]
+        index[start] = lowlink[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors[child])))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def analyze(edges):
+    """Return {'nodes': {pid: {'root', 'depth', 'in_cycle'}}, 'roots': {root: blocked pids}, 'cycles': [...]}
+
+    `root` is the root at the top of the longest chain above a session; a
+    cycle nobody else blocks is its own root, named after its lowest pid.
+    """
+    blockers = defaultdict(set)
+    waiters = defaultdict(set)
+    nodes = []
+    for blocker, waiter in edges:
+        for pid in (blocker, waiter):
+            if pid not in blockers and pid not in waiters:
+                nodes.append(pid)
+        blockers[waiter].add(blocker)
+        waiters[blocker].add(waiter)
+
+    cycles = []
+    component_of = {}
+    for component in _strongly_connected(nodes, waiters):
+        if len(component) > 1 or component[0] in blockers[component[0]]:
+            cycles.append(sorted(component))
+        for pid in component:
+            component_of[pid] = min(component)
+    cyclic = {pid for cycle in cycles for pid in cycle}
+
+    # Condensed graph: each cycle collapsed into one node, which leaves a DAG
+    up = defaultdict(set)
+    down = defaultdict(set)
+    for waiter, pids in blockers.items():
+        for blocker in pids:
+            if component_of[blocker] != component_of[waiter]:
+                up[component_of[waiter]].add(component_of[blocker])
+                down[component_of[blocker]].add(component_of[waiter])
+
+    components = sorted(set(component_of.values()))
+    pending = {comp: len(up[comp]) for comp in components}
+    queue = [comp for comp in components if not pending[comp]]
+    depth = {comp: 0 for comp in queue}
+    root = {comp: comp for comp in queue}
+    while queue:
+        comp = queue.pop()
+        for child in down[comp]:
+            candidate = (depth[comp] + 1, -root[comp])
+            if child not in depth or candidate > (depth[child], -root[child]):
+                depth[child], root[child] = depth[comp] + 1, root[comp]
+            pending[child] -= 1
+            if not pending[child]:
+                queue.append(child)
+
+    info = {}
+    roots = {}
+    for pid in nodes:
+        comp = component_of[pid]
+        info[pid] = {'root': root[comp], 'depth': depth[comp], 'in_cycle': pid in cyclic}
+        blocked = roots.setdefault(root[comp], set())
+        if pid != root[comp]:
+            blocked.add(pid)
+
+    return {'nodes': info, 'roots': roots, 'cycles': cycles}
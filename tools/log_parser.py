@@ -0,0 +1,81 @@
+"""Parser for the Odoo server log format, folding tracebacks into their record
+
+Odoo writes ``%(asctime)s %(pid)s %(levelname)s %(dbname)s %(name)s: %(message)s``::
+
+    2026-01-18 21:05:42,573 8816 ERROR production odoo.http: Exception during request handling.
+    Traceback (most recent call last):
+      File "/opt/odoo/odoo/http.py", line 2375, in __call__
+    ...
+
+Lines that do not start with a header belong to the previous record.
+"""
+import re
+from datetime import datetime
+
+LEVELS = frozenset(('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'))
+
+HEADER_RE = re.compile(
+    r'(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),\d+ (\d+) ([A-Z_]+) (\S+) ([^\s:]+): ?(.*)'
+)
+
+
+class LogParser:
+    """Stateful parser; keeps the last timestamp so lines of the same second skip the conversion"""
+
+    __slots__ = ('_ts_text', '_ts')
+
+    def __init__(self):
+        self._ts_text = None
+        self._ts = None
+
+    def _timestamp(self, text):
+        if text != self._ts_text:
+            self._ts = datetime(
+                int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                int(text[11:13]), int(text[14:16]), int(text[17:19]),
+            )
+            self._ts_text = text
+        return self._ts
+
+    def parse_header(self, line):
+        """Parse a single header line, None if the line is a continuation"""
+        match = HEADER_RE.match(line)
+        if not match:
+            return None
+        ts_text, pid, level, dbname, logger, message = match.groups()
+        return {
+            'timestamp': self._timestamp(ts_text),
+            'pid': int(pid),
+            'level': level if level in LEVELS else 'INFO',
+            'database': None if dbname == '?' else dbname,
+            'logger': logger,
+            'message': message.rstrip(),
+        }
+
+    def parse_lines(self, lines):
+        """Group lines into records; returns (records, leading continuation lines)
+
+        Continuation lines found before the first header (e.g. the rest of a
+        traceback whose header was read by a previous call) are returned
+        separately so the caller can attach them to the record it already has.
+        """
+        records = []
+        orphans = []
+        current = None
+        continuation = []
+        for line in lines:
+            record = self.parse_header(line)
+            if record is None:
+                if current is None:
+                    orphans.append(line.rstrip())
+                else:
+                    continuation.append(line.rstrip())
+                continue
+            if continuation:
+                current['message'] = '\n'.join([current['message']] + continuation)
+                continuation = []
+            current = record
+            records.append(record)
+        if continuation:
+            current['message'] = '\n'.join([current['message']] + continuation)
+        return records, orphans
@@ -0,0 +1,95 @@
+"""Incremental tail of a growing log file, tracked by inode and byte offset"""
+import os
+
+BLOCK_SIZE = 64 * 1024
+
+
+def _tail_start(f, size, lines):
+    """Byte offset where the last `lines` complete lines of the file start"""
+    pos = size
+    newlines = 0
+    while pos > 0:
+        step = min(BLOCK_SIZE, pos)
+        pos -= step
+        f.seek(pos)
+        block = f.read(step)
+        newlines += block.count(b'\n')
+        # One extra newline marks the end of the line before the window
+        if newlines > lines:
+            idx = -1
+            for _ in range(newlines - lines):
+                idx = block.index(b'\n', idx + 1)
+            return pos + idx + 1
+    return 0
+
+
+def _find_rotated(path, inode):
+    """Locate the file logrotate moved `path` to, e.g. odoo.log.1"""
+    directory = os.path.dirname(path) or '.'
+    base = os.path.basename(path)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return None
+    for name in names:
+        if name != base and name.startswith(base):
+            candidate = os.path.join(directory, name)
+            try:
+                if str(os.stat(candidate).st_ino) == inode:
+                    return candidate
+            except OSError:
+                continue
+    return None
+
+
+def _read_complete_lines(path, start, max_bytes):
+    """Read whole lines from `start`; returns (lines, offset after the last one)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(max_bytes)
+    end = data.rfind(b'\n')
+    if end == -1:
+        if len(data) >= max_bytes:
+            # A single line longer than the read window, skip it
+            return [], start + len(data)
+        # Partial line only, wait for the writer to finish it
+        return [], start
+    lines = data[:end + 1].decode('utf-8', errors='ignore').splitlines()
+    return lines, start + end + 1
+
+
+def read_new_lines(path, inode=None, offset=None, initial_lines=500, max_bytes=8 * 1024 * 1024):
+    """Return (lines, inode, offset) for the lines appended to `path` since `offset`
+
+    On first run (no inode) only the last `initial_lines` lines are returned.
+    After a logrotate the rest of the rotated file is drained first, and a
+    truncated file is read again from the start. At most `max_bytes` are read
+    per call; the remaining backlog is picked up by the next call.
+    """
+    st = os.stat(path)
+    current_inode = str(st.st_ino)
+    lines = []
+
+    if inode is None or offset is None:
+        with open(path, 'rb') as f:
+            start = _tail_start(f, st.st_size, initial_lines)
+    elif inode != current_inode:
+        rotated = _find_rotated(path, inode)
+        if rotated:
+            lines, rotated_offset = _read_complete_lines(rotated, int(offset), max_bytes)
+            if os.stat(rotated).st_size - int(offset) > max_bytes:
+                # Backlog left in the rotated file, keep following it
+                return lines, inode, rotated_offset
+            max_bytes -= rotated_offset - int(offset)
+        start = 0
+    elif st.st_size < offset:
+        # Truncated in place (copytruncate)
+        start = 0
+    else:
+        start = int(offset)
+
+    if not max_bytes or start >= st.st_size:
+        return lines, current_inode, start
+
+    new_lines, new_offset = _read_complete_lines(path, start, max_bytes)
+    return lines + new_lines, current_inode, new_offset
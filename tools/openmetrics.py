@@ -0,0 +1,49 @@
+"""Minimal OpenMetrics text exposition writer
+
+A metric family is (name, type, help, samples) where each sample is
+(suffix, labels, value), e.g. ('_bucket', {'le': '0.5'}, 3).
+"""
+import math
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render(families):
+    lines = []
+    for name, metric_type, help_text, samples in families:
+        lines.append(f'# TYPE {name} {metric_type}')
+        lines.append(f'# HELP {name} {_escape(help_text)}')
+        for suffix, labels, value in samples:
+            label_text = ''
+            if labels:
+                label_text = '{' + ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items()) + '}'
+            lines.append(f'{name}{suffix}{label_text} {_format_value(value)}')
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def histogram_samples(labels, buckets, counts, total_sum, total_count):
+    """Samples of one histogram series from cumulative per-bucket counts (same order as `buckets`)"""
+    samples = []
+    for bound, count in zip(buckets, counts):
+        # Canonical float form, as Prometheus client libraries write it
+        samples.append(('_bucket', dict(labels, le=repr(float(bound))), count))
+    samples.append(('_bucket', dict(labels, le='+Inf'), total_count))
+    samples.append(('_count', labels, total_count))
+    samples.append(('_sum', labels, total_sum))
+    return samples
@@ -0,0 +1,177 @@
+"""What makes a query slow, read from its EXPLAIN (FORMAT JSON) plan
+
+Flags sequential scans on large tables, row estimates far from the actual
+rows (ANALYZE plans only) and sorts or hashes spilling to disk, or likely
+to when the plan was not executed.
+"""
+import re
+
+# Smaller tables are cheaper to read whole than through an index
+SEQ_SCAN_MIN_ROWS = 50000
+# Estimates off by this factor either way, on at least ESTIMATE_MIN_ROWS rows
+ESTIMATE_MISS_FACTOR = 10
+ESTIMATE_MIN_ROWS = 1000
+
+_EXPLAINABLE_RE = re.compile(r'^(select|with|values|table|insert|update|delete)\b')
+_READ_ONLY_RE = re.compile(r'^(select|with|values|table)\b')
+_WRITES_RE = re.compile(r'\b(insert|update|delete|merge|into|for (no key )?update|for (key )?share)\b')
+# Functions with effects a READ ONLY transaction does not prevent, never executed by ANALYZE
+_SIDE_EFFECTS_RE = re.compile(
+    r'\b(pg_terminate_backend|pg_cancel_backend|pg_reload_conf|pg_rotate_logfile|pg_switch_wal|pg_promote'
+    r'|pg_create_restore_point|pg_stat_reset\w*|pg_(try_)?advisory\w*|pg_notify|pg_sleep\w*'
+    r'|pg_log_backend_memory_contexts|pg_\w*replication_\w*|pg_file_\w+|lo_\w+|dblink\w*'
+    r'|set_config|nextval|setval|txid_current|pg_current_xact_id)\s*\('
+)
+# Server-side parameters cannot be explained without their values
+_PARAMS_RE = re.compile(r'\$\d+')
+_DOLLAR_TAG_RE = re.compile(r'\$([A-Za-z_][A-Za-z_0-9]*)?\$')
+
+
+def _code(query):
+    """The query with literals as ? and comments as spaces, or None when it cannot be read unambiguously
+
+    Lexes the way PostgreSQL does, so that what it runs as code is what the
+    guards below check: a ; in a comment or string is harmless, one outside
+    them would start a second statement. Backslashes in plain strings depend
+    on standard_conforming_strings and are refused, as are unterminated
+    strings or comments, typically texts cut at 5000 characters.
+    """
+    out = []
+    i, n = 0, len(query)
+    while i < n:
+        char = query[i]
+        if query.startswith('--', i):
+            end = query.find('\n', i)
+            i = n if end < 0 else end
+            out.append(' ')
+        elif query.startswith('/*', i):
+            # Block comments nest
+            depth, i = 1, i + 2
+            while depth and i < n:
+                if query.startswith('/*', i):
+                    depth, i = depth + 1, i + 2
+                elif query.startswith('*/', i):
+                    depth, i = depth - 1, i + 2
+                else:
+                    i += 1
+            if depth:
+                return None
+            out.append(' ')
+        elif char == "'":
+            escapes = i > 0 and query[i - 1] in 'Ee' and (i == 1 or not (query[i - 2].isalnum() or query[i - 2] == '_'))
+            i += 1
+            while True:
+                if i >= n:
+                    return None
+                if query[i] == '\\':
+                    if not escapes:
+                        return None
+                    i += 2
+                elif query.startswith("''", i):
+                    i += 2
+                elif query[i] == "'":
+                    i += 1
+                    break
+                else:
+                    i += 1
+            out.append('?')
+        elif char == '"':
+            end = i + 1
+            while True:
+                end = query.find('"', end)
+                if end < 0:
+                    return None
+                if not query.startswith('""', end):
+                    break
+                end += 2
+            # Identifiers stay code: "pg_sleep"(1) still calls pg_sleep
+            out.append(query[i + 1:end].replace('""', '"').lower())
+            i = end + 1
+        elif char == '$' and not (i and (query[i - 1].isalnum() or query[i - 1] == '_')) \
+                and _DOLLAR_TAG_RE.match(query, i):
+            tag = _DOLLAR_TAG_RE.match(query, i).group()
+            end = query.find(tag, i + len(tag))
+            if end < 0:
+                return None
+            out.append('?')
+            i = end + len(tag)
+        else:
+            out.append(char.lower())
+            i += 1
+    return ' '.join(''.join(out).split())
+
+
+def is_explainable(query):
+    """Whether EXPLAIN can plan the query text as captured, as a single statement"""
+    if not query or _PARAMS_RE.search(query):
+        return False
+    code = _code(query)
+    return code is not None and ';' not in code and bool(_EXPLAINABLE_RE.match(code))
+
+
+def is_read_only(query):
+    """Whether the query only reads, so EXPLAIN ANALYZE may execute it"""
+    if not is_explainable(query):
+        return False
+    code = _code(query)
+    return bool(_READ_ONLY_RE.match(code)) and not _WRITES_RE.search(code) \
+        and not _SIDE_EFFECTS_RE.search(code)
+
+
+def nodes(plan):
+    """Every node of a plan, depth first"""
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from nodes(child)
+
+
+def relations(plan):
+    """Names of the relations the plan scans"""
+    return {node['Relation Name'] for node in nodes(plan) if node.get('Relation Name')}
+
+
+def _label(node):
+    relation = node.get('Relation Name')
+    return f"{node['Node Type']} on {relation}" if relation else node['Node Type']
+
+
+def _mb(num_bytes):
+    return f'{num_bytes / 1024 ** 2:.1f} MB'
+
+
+def findings(plan, table_rows, work_mem):
+    """[(kind, description)] of a plan; kind is 'seq_scan', 'estimate_miss' or 'spill'
+
+    `table_rows` maps relation names to their row count, `work_mem` is in bytes.
+    """
+    result = []
+    for node in nodes(plan):
+        node_type = node['Node Type']
+
+        rows = table_rows.get(node.get('Relation Name'), 0)
+        if node_type == 'Seq Scan' and rows >= SEQ_SCAN_MIN_ROWS:
+            condition = f", filter {node['Filter']}" if node.get('Filter') else ''
+            result.append(('seq_scan', f"{_label(node)} ({rows:.0f} rows){condition}"))
+
+        if node.get('Actual Loops'):
+            estimated, actual = node['Plan Rows'], node['Actual Rows']
+            if max(estimated, actual) >= ESTIMATE_MIN_ROWS \
+                    and max(estimated, actual) >= ESTIMATE_MISS_FACTOR * max(min(estimated, actual), 1):
+                result.append(('estimate_miss', f"{_label(node)}: estimated {estimated:.0f} rows, got {actual:.0f}"))
+
+        # Size the planner expects to hold in memory
+        expected = node.get('Plan Rows', 0) * node.get('Plan Width', 0)
+        if node_type == 'Sort':
+            if node.get('Sort Space Type') == 'Disk':
+                result.append(('spill', f"Sort spilled {node.get('Sort Space Used', 0)} kB to disk "
+                                        f"({node.get('Sort Method')})"))
+            elif 'Actual Loops' not in node and expected > work_mem:
+                result.append(('spill', f"Sort of about {_mb(expected)} likely spills (work_mem {_mb(work_mem)})"))
+        elif node_type == 'Hash':
+            if node.get('Hash Batches', 1) > 1:
+                result.append(('spill', f"Hash spilled to disk in {node['Hash Batches']} batches"))
+            elif 'Actual Loops' not in node and expected > work_mem:
+                result.append(('spill', f"Hash of about {_mb(expected)} likely spills (work_mem {_mb(work_mem)})"))
+        elif node_type == 'Aggregate' and node.get('HashAgg Batches', 1) > 1:
+            result.append(('spill', f"Hash aggregate spilled to disk in {node['HashAgg Batches']} batches"))
+    return result
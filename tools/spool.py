@@ -0,0 +1,72 @@
+"""Append-only spool of JSON records shared by the standalone agent and the importer cron
+
+Each record is framed as a 4-byte big-endian payload length, a 4-byte CRC32
+of the payload and the UTF-8 JSON payload. A record torn by a crash fails
+its length or CRC check and ends the readable part of the file.
+
+The writer opens, appends and closes the file for every record, so the
+importer can take the spool over with an atomic rename: records appended
+afterwards start a new spool file.
+"""
+import json
+import os
+import struct
+import zlib
+
+HEADER = struct.Struct('>II')
+CLAIM_SUFFIX = '.importing'
+
+
+def encode(record):
+    payload = json.dumps(record, separators=(',', ':'), default=str).encode('utf-8')
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def append(path, records, max_bytes=None):
+    """Append records with a single write; returns False when the spool is full"""
+    data = b''.join(encode(record) for record in records)
+    if max_bytes:
+        try:
+            if os.path.getsize(path) + len(data) > max_bytes:
+                return False
+        except OSError:
+            pass
+    # O_APPEND keeps concurrent writers from interleaving inside a record
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    return True
+
+
+def read(path):
+    """Return (records, bytes read up to the last intact record)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    records = []
+    pos = 0
+    while pos + HEADER.size <= len(data):
+        length, crc = HEADER.unpack_from(data, pos)
+        start = pos + HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append(json.loads(payload))
+        pos = start + length
+    return records, pos
+
+
+def claim(path):
+    """Take the spool over for import; returns the claimed path or None when there is nothing to import
+
+    A claim left behind by an import that failed is returned again first.
+    """
+    claimed = path + CLAIM_SUFFIX
+    if os.path.exists(claimed):
+        return claimed
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return None
+    return claimed
@@ -0,0 +1,44 @@
+"""Normalise SQL text into a literal-free shape and a short stable fingerprint
+
+    SELECT * FROM res_partner WHERE id IN (1, 2, 3) AND name = 'x'
+    -> select * from res_partner where id in (?) and name = ?
+"""
+import hashlib
+import re
+
+_COMMENTS_RE = re.compile(r'/\*.*?\*/|--[^\n]*', re.DOTALL)
+_DOLLAR_QUOTED_RE = re.compile(r'\$([A-Za-z_]*)\$.*?\$\1\$', re.DOTALL)
+_STRINGS_RE = re.compile(r"[EeBbXxNn]?'(?:[^']|'')*'")
+_PARAMS_RE = re.compile(r'\$\d+|%\(\w+\)s|%s')
+_NUMBERS_RE = re.compile(r'(?<![\w."])[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b')
+_ARRAYS_RE = re.compile(r'array\s*\[[^\]]*\]')
+_LISTS_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_ROWS_RE = re.compile(r'(\([^()]*\))(?:\s*,\s*\1)+')
+_SPACES_RE = re.compile(r'\s+')
+_COMMAS_RE = re.compile(r'\s*,\s*')
+_PARENS_RE = re.compile(r'\(\s+|\s+\)')
+_OPERATORS_RE = re.compile(r'\s*(<=|>=|<>|!=|=|<|>)\s*')
+
+
+def normalize(query):
+    """Strip comments and literals and collapse lists so queries of the same shape compare equal"""
+    text = _COMMENTS_RE.sub(' ', query or '')
+    text = _DOLLAR_QUOTED_RE.sub('?', text)
+    text = _STRINGS_RE.sub('?', text)
+    text = _PARAMS_RE.sub('?', text)
+    text = _NUMBERS_RE.sub('?', text)
+    text = _SPACES_RE.sub(' ', text).strip().lower()
+    text = _COMMAS_RE.sub(', ', text)
+    text = _PARENS_RE.sub(lambda m: m.group().strip(), text)
+    text = _OPERATORS_RE.sub(r' \1 ', text)
+    text = _ARRAYS_RE.sub('array[?]', text)
+    text = _LISTS_RE.sub('(?)', text)
+    # Multi-row VALUES (?), (?) -> VALUES (?)
+    text = _ROWS_RE.sub(r'\1', text)
+    return text
+
+
+def fingerprint(query):
+    """Return (fingerprint, normalised query)"""
+    normalized = normalize(query)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16], normalized
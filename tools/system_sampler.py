@@ -0,0 +1,203 @@
+"""Non-blocking host CPU sampling from cumulative psutil.cpu_times() snapshots
+
+A snapshot is cheap to take; utilisation is the delta between two snapshots,
+so nothing ever sleeps the way psutil.cpu_percent(interval=1) does. Disk I/O
+throughput and IOPS come from psutil.disk_io_counters() the same way.
+"""
+import logging
+import os
+import time
+
+_logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+
+
+def cpu_snapshot(psutil):
+    """Cumulative per-core counters: {'at', 'boot', 'cores': [[total, idle, iowait, steal], ...]}"""
+    cores = []
+    for times in psutil.cpu_times(percpu=True):
+        values = times._asdict()
+        # Like psutil, guest time is already part of user/nice on Linux
+        total = sum(values.values()) - values.get('guest', 0.0) - values.get('guest_nice', 0.0)
+        cores.append([
+            total,
+            values.get('idle', 0.0),
+            values.get('iowait', 0.0),
+            values.get('steal', 0.0),
+        ])
+    return {'at': time.time(), 'boot': psutil.boot_time(), 'cores': cores}
+
+
+def _is_valid_base(previous, current):
+    if not previous or previous.get('boot') != current['boot']:
+        return False
+    if len(previous.get('cores', ())) != len(current['cores']):
+        return False
+    return all(cur[0] > prev[0] for prev, cur in zip(previous['cores'], current['cores']))
+
+
+def cpu_usage(previous, current):
+    """Utilisation between two snapshots; since boot when `previous` is missing or stale
+
+    Returns {'cpu_percent', 'iowait_percent', 'steal_percent', 'per_core', 'window'}.
+    """
+    if _is_valid_base(previous, current):
+        base = previous['cores']
+        window = current['at'] - previous['at']
+    else:
+        base = [[0.0, 0.0, 0.0, 0.0]] * len(current['cores'])
+        window = current['at'] - current['boot']
+
+    per_core = []
+    sums = [0.0, 0.0, 0.0, 0.0]
+    for prev, cur in zip(base, current['cores']):
+        delta = [max(c - p, 0.0) for p, c in zip(prev, cur)]
+        for i, value in enumerate(delta):
+            sums[i] += value
+        per_core.append(_busy_percent(delta))
+
+    total = sums[0] or 1.0
+    return {
+        'cpu_percent': _busy_percent(sums),
+        'iowait_percent': round(100.0 * sums[2] / total, 1),
+        'steal_percent': round(100.0 * sums[3] / total, 1),
+        'per_core': per_core,
+        'window': window,
+    }
+
+
+def _busy_percent(delta):
+    total, idle, iowait = delta[0], delta[1], delta[2]
+    if total <= 0:
+        return 0.0
+    busy = total - idle - iowait
+    return round(min(max(100.0 * busy / total, 0.0), 100.0), 1)
+
+
+def _io_counters(counters):
+    return [counters.read_bytes, counters.write_bytes, counters.read_count, counters.write_count]
+
+
+def disk_io_snapshot(psutil, devices=None):
+    """Cumulative I/O counters: {'at', 'boot', 'disks': {name: [read bytes, write bytes, reads, writes]}}
+
+    Host-wide under 'total', or per device for the given device names (as in /proc/diskstats).
+    """
+    disks = {}
+    try:
+        if devices is None:
+            total = psutil.disk_io_counters()
+            if total:
+                disks['total'] = _io_counters(total)
+        else:
+            per_disk = psutil.disk_io_counters(perdisk=True) or {}
+            disks = {name: _io_counters(per_disk[name]) for name in devices if name in per_disk}
+    except (AttributeError, OSError, RuntimeError) as e:
+        # No I/O counters in some containers
+        _logger.debug(f"Disk I/O counters not available: {e}")
+    return {'at': time.time(), 'boot': psutil.boot_time(), 'disks': disks}
+
+
+def disk_io_rates(previous, current, name='total'):
+    """{'read_mb_s', 'write_mb_s', 'read_iops', 'write_iops'} of one disk between two snapshots
+
+    None when there is no usable previous snapshot (first sample, reboot, counter reset).
+    """
+    if not previous or previous.get('boot') != current['boot']:
+        return None
+    before = previous.get('disks', {}).get(name)
+    after = current['disks'].get(name)
+    window = current['at'] - previous['at']
+    if not before or not after or window <= 0 or any(a < b for a, b in zip(after, before)):
+        return None
+    delta = [(a - b) / window for a, b in zip(after, before)]
+    mb = 1024 ** 2
+    return {
+        'read_mb_s': round(delta[0] / mb, 3),
+        'write_mb_s': round(delta[1] / mb, 3),
+        'read_iops': round(delta[2], 1),
+        'write_iops': round(delta[3], 1),
+    }
+
+
+def discover_mounts(psutil, paths):
+    """Filesystems holding the given {role: path}: {mountpoint: {'device', 'disk', 'fstype', 'roles'}}
+
+    `disk` is the device name of the I/O counters, None for filesystems without one (network, overlay).
+    """
+    try:
+        partitions = sorted(psutil.disk_partitions(all=True), key=lambda p: len(p.mountpoint), reverse=True)
+    except (OSError, RuntimeError) as e:
+        _logger.warning(f"Could not list mounted filesystems: {e}")
+        partitions = []
+
+    mounts = {}
+    for role, path in paths.items():
+        path = os.path.realpath(path)
+        partition = next((
+            p for p in partitions
+            if path == p.mountpoint or path.startswith(p.mountpoint.rstrip(os.sep) + os.sep)
+        ), None)
+        if partition:
+            device = partition.device
+            disk = os.path.basename(os.path.realpath(device)) if device.startswith('/dev/') else None
+            mount = mounts.setdefault(partition.mountpoint, {
+                'device': device, 'disk': disk, 'fstype': partition.fstype, 'roles': [],
+            })
+        else:
+            mount = mounts.setdefault(path, {'device': None, 'disk': None, 'fstype': None, 'roles': []})
+        mount['roles'].append(role)
+    return mounts
+
+
+def host_sample(psutil, previous, disk_paths=('/',)):
+    """One host sample as server metrics values, plus the CPU snapshot to pass as `previous` next time
+
+    Disk usage is that of the fullest of `disk_paths`.
+    """
+    snapshot = cpu_snapshot(psutil)
+    cpu = cpu_usage(previous, snapshot)
+    ram = psutil.virtual_memory()
+    # Kept in the same snapshot so one stored value carries both deltas
+    snapshot['disk_io'] = disk_io_snapshot(psutil)
+    io = disk_io_rates((previous or {}).get('disk_io'), snapshot['disk_io']) or {}
+
+    disk = None
+    for path in disk_paths:
+        try:
+            usage = psutil.disk_usage(path)
+        except Exception as e:
+            _logger.warning(f"Could not get disk usage of {path}: {e}")
+            continue
+        if disk is None or usage.percent > disk.percent:
+            disk = usage
+
+    # Not available on every platform (Windows performance counters)
+    try:
+        load_1m, load_5m, load_15m = psutil.getloadavg()
+    except (AttributeError, OSError, RuntimeError) as e:
+        _logger.debug(f"Load average not available: {e}")
+        load_1m = load_5m = load_15m = 0.0
+
+    values = {
+        'cpu_percent': cpu['cpu_percent'],
+        'cpu_iowait_percent': cpu['iowait_percent'],
+        'cpu_steal_percent': cpu['steal_percent'],
+        'cpu_per_core': ', '.join(str(value) for value in cpu['per_core']),
+        'cpu_window': cpu['window'],
+        'ram_percent': ram.percent,
+        'ram_used_gb': ram.used / GB,
+        'ram_total_gb': ram.total / GB,
+        'disk_percent': disk.percent if disk else 0.0,
+        'disk_used_gb': disk.used / GB if disk else 0.0,
+        'disk_total_gb': disk.total / GB if disk else 0.0,
+        'disk_read_mb_s': io.get('read_mb_s', 0.0),
+        'disk_write_mb_s': io.get('write_mb_s', 0.0),
+        'disk_read_iops': io.get('read_iops', 0.0),
+        'disk_write_iops': io.get('write_iops', 0.0),
+        'load_average_1m': load_1m,
+        'load_average_5m': load_5m,
+        'load_average_15m': load_15m,
+    }
+    return values, snapshot
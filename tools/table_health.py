@@ -0,0 +1,80 @@
+"""Which tables need attention, from pg_stat_user_tables / pg_statio figures
+
+Every check yields a severity from 0 to 100 and a reason. A table's score is
+the sum of its severities weighted by the log of its size, so a bloated
+account_move_line ranks above a small table with the same dead row ratio.
+"""
+import math
+
+MB = 1024 ** 2
+
+# Rows below which dead tuples or pending analyzes are not worth a mention
+MIN_ROWS = 1000
+# Dead tuples past autovacuum's own trigger by this factor mean it is falling behind
+VACUUM_LAG_FACTOR = 2
+DEAD_RATIO_WARNING = 0.2
+# Smaller tables are cheaper to read whole than through an index
+SEQ_SCAN_MIN_BYTES = 10 * MB
+SEQ_SCAN_RATIO_WARNING = 0.5
+# Buffer reads between snapshots below which the cache hit ratio means little
+CACHE_MIN_READS = 1000
+CACHE_HIT_WARNING = 0.9
+STALE_VACUUM_DAYS = 7
+
+
+def ratio(part, whole):
+    """part / whole, None when whole is empty"""
+    return part / whole if whole else None
+
+
+def _size(num_bytes):
+    if num_bytes >= 1024 * MB:
+        return f'{num_bytes / (1024 * MB):.1f} GB'
+    return f'{num_bytes / MB:.0f} MB'
+
+
+def assess(t):
+    """(score, reasons) of one table
+
+    `t` holds the snapshot figures (n_live_tup, n_dead_tup, n_mod_since_analyze, vacuum_trigger,
+    analyze_trigger, table_bytes, total_bytes, vacuum_age_days or None when never vacuumed,
+    unused_indexes, unused_index_bytes) and the deltas since the previous snapshot
+    (seq_scan, idx_scan, writes, blks_hit, blks_read).
+    """
+    checks = []
+
+    dead = t['n_dead_tup']
+    dead_ratio = ratio(dead, t['n_live_tup'] + dead) or 0.0
+    if dead >= MIN_ROWS and dead > VACUUM_LAG_FACTOR * t['vacuum_trigger']:
+        checks.append((min(100.0, 50 + 100 * dead_ratio),
+                       f'autovacuum behind: {dead} dead rows ({dead_ratio:.0%})'))
+    elif dead >= MIN_ROWS and dead_ratio >= DEAD_RATIO_WARNING:
+        checks.append((100 * dead_ratio, f'{dead_ratio:.0%} dead rows'))
+
+    changed = t['n_mod_since_analyze']
+    if changed >= MIN_ROWS and changed > VACUUM_LAG_FACTOR * t['analyze_trigger']:
+        checks.append((30.0, f'planner statistics stale: {changed} rows changed since the last analyze'))
+
+    scans = t['seq_scan'] + t['idx_scan']
+    seq_ratio = ratio(t['seq_scan'], scans)
+    if t['table_bytes'] >= SEQ_SCAN_MIN_BYTES and seq_ratio is not None and seq_ratio >= SEQ_SCAN_RATIO_WARNING:
+        checks.append((100 * seq_ratio,
+                       f'{seq_ratio:.0%} of {scans} scans sequential on {_size(t["table_bytes"])}, missing index?'))
+
+    reads = t['blks_read']
+    hit_ratio = ratio(t['blks_hit'], t['blks_hit'] + reads)
+    if reads >= CACHE_MIN_READS and hit_ratio is not None and hit_ratio < CACHE_HIT_WARNING:
+        checks.append((min(100.0, 500 * (CACHE_HIT_WARNING - hit_ratio)), f'cache hit {hit_ratio:.0%}'))
+
+    age = t['vacuum_age_days']
+    if t['writes'] > 0 and age is not None and age > STALE_VACUUM_DAYS:
+        checks.append((20.0, f'written to but not vacuumed for {age:.0f} days'))
+
+    if t['unused_indexes'] and t['writes'] > 0:
+        checks.append((min(50.0, 10.0 * t['unused_indexes']),
+                       f'{t["unused_indexes"]} unused indexes ({_size(t["unused_index_bytes"])}) slow its writes'))
+
+    if not checks:
+        return 0.0, []
+    weight = 1 + math.log10(1 + t['total_bytes'] / MB)
+    return round(sum(severity for severity, _reason in checks) * weight, 1), [reason for _s, reason in checks]